@@ -1,6 +1,7 @@
 """API路由模块"""
 from fastapi import APIRouter
 from app.api.endpoints.chat import router as chat_router
+from app.api.endpoints.metrics import router as metrics_router
 
 router = APIRouter()
 
@@ -9,3 +10,5 @@ router = APIRouter()
 # chat
 router.include_router(chat_router, prefix="/chat", tags=["chat"])
 
+# metrics
+router.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
-from schema.request.chat import ChatRequest
+from schema.request.chat import ChatBatchRequest, ChatRequest
 from service.chat.chat_service import get_chat_service, ChatService
+from service.chat.admission import get_client_id
 
 router = APIRouter()
 
@@ -50,10 +51,84 @@ async def chat_endpoint(
       }' \
       --no-buffer
     ```
+
+    Example continuing a conversation (history is restored from the checkpointer,
+    only the new message is sent; thread_id comes from the first `thread` event):
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/chat/stream" \
+      -H "Content-Type: application/json" \
+      -d '{
+        "thread_id": "2b0e6f0e-5d43-4a57-9f61-3f7f0d0c9a51",
+        "messages": [
+          {
+            "role": "user",
+            "content": "继续上面的话题"
+          }
+        ]
+      }' \
+      --no-buffer
+    ```
+
+    Example streaming only model tokens (filters are pushed down into astream_events,
+    so chain start/end events and state snapshots are never built):
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/chat/stream" \
+      -H "Content-Type: application/json" \
+      -d '{
+        "projection": "tokens",
+        "messages": [
+          {
+            "role": "user",
+            "content": "你好"
+          }
+        ]
+      }' \
+      --no-buffer
+    ```
     """
     try:
         # 从 app.state 获取 graph
-        graph = request.app.state.graph
-        return await chat_service.chat(req, graph=graph)
+        # 按请求选择图，不常用的图在第一次请求时编译
+        graph = await request.app.state.graph_registry.get(req.graph)
+        return await chat_service.chat(req, graph=graph, request=request)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch")
+async def chat_batch_endpoint(
+    req: ChatBatchRequest,
+    request: Request,
+    chat_service: ChatService = Depends(get_chat_service)
+):
+    """
+    批量对话端点，并发运行多个对话并只返回最终输出，适用于离线评测和批处理任务
+
+    Example curl request:
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/chat/batch" \
+      -H "Content-Type: application/json" \
+      -d '{
+        "concurrency": 4,
+        "requests": [
+          {"messages": [{"role": "user", "content": "你好"}]},
+          {"messages": [{"role": "user", "content": "介绍一下你自己"}]}
+        ]
+      }'
+    ```
+
+    With `"stream": true` the results are returned as NDJSON, one line per
+    conversation in completion order; each line carries its `index` in `requests`.
+    """
+    try:
+        return await chat_service.batch(
+            req,
+            graphs=request.app.state.graph_registry,
+            client_id=get_client_id(request),
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
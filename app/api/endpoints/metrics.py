@@ -0,0 +1,83 @@
+from dataclasses import asdict
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from service.chat.admission import admission_controller
+from service.chat.chat_service import chat_metrics
+from utils.llm_cache import llm_response_cache
+from utils.prompt_cache import prompt_cache_stats
+from utils.startup_timing import startup_timer
+
+router = APIRouter()
+
+
+@router.get("/retention")
+async def retention_metrics(request: Request):
+    """checkpoint 保留策略的清理进度"""
+    worker = getattr(request.app.state, "retention_worker", None)
+    if worker is None:
+        return {"enabled": False}
+    return {"enabled": True, **asdict(worker.engine.stats)}
+
+
+@router.get("/pool")
+async def pool_metrics(request: Request):
+    """checkpointer 连接池统计：等待中的请求、获取连接耗时、连接错误等"""
+    checkpointer = request.app.state.graph_registry.checkpointer
+    return {
+        **checkpointer.pool.get_stats(),
+        "write_behind_pending": checkpointer.write_buffer.pending if checkpointer.write_buffer else 0,
+        "write_behind_dropped": checkpointer.write_buffer.dropped if checkpointer.write_buffer else 0,
+    }
+
+
+@router.get("/checkpoint-cache")
+async def checkpoint_cache_metrics(request: Request):
+    """最新 checkpoint 缓存的命中、淘汰和失效统计"""
+    stats = request.app.state.graph_registry.checkpointer.cache_stats()
+    if stats is None:
+        return {"enabled": False}
+    return {"enabled": True, **asdict(stats)}
+
+
+@router.get("/chat")
+async def chat_metrics_endpoint():
+    """对话运行统计，包括被客户端断开而取消的运行数"""
+    return asdict(chat_metrics)
+
+
+@router.get("/admission")
+async def admission_metrics():
+    """准入控制：运行中的对话数、等待队列深度、累计拒绝数"""
+    return admission_controller.stats()
+
+
+@router.get("/llm-cache")
+async def llm_cache_metrics():
+    """LLM 响应缓存各层的命中统计"""
+    if llm_response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "size": llm_response_cache.size, **asdict(llm_response_cache.stats)}
+
+
+@router.get("/prompt-cache")
+async def prompt_cache_metrics(thread_id: Optional[str] = None):
+    """提供方 prompt 缓存命中率：总体和输入 token 最多的线程，或指定线程"""
+    if thread_id is None:
+        return prompt_cache_stats.snapshot()
+    usage = prompt_cache_stats.get(thread_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"No usage recorded for thread {thread_id}")
+    return {"thread_id": thread_id, **usage.to_dict()}
+
+
+@router.get("/graphs")
+async def graph_metrics(request: Request):
+    """已注册的图，以及已经编译的图"""
+    registry = request.app.state.graph_registry
+    return {"default": registry.default, "registered": registry.names, "compiled": registry.compiled}
+
+
+@router.get("/startup")
+async def startup_metrics():
+    """本 worker 的启动耗时：模块导入和 lifespan 各阶段"""
+    return startup_timer.snapshot()
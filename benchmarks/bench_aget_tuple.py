@@ -0,0 +1,109 @@
+"""
+aget_tuple 往返次数基准测试
+
+对比单条预编译语句（single_query_get=True）与事务内两次查询两种实现，
+需要 .env 中的 POSTGRES_CONN_STRING 指向一个本地 PostgreSQL。
+
+往返次数通过 libpq 的协议跟踪统计：服务端每完成一次请求回复一条 ReadyForQuery，
+因此包括 psycopg 隐式发送的 BEGIN / COMMIT 在内，所有往返都会被计入。
+连接池与应用一致开启 autocommit，--no-autocommit 可以对比未开启时的往返次数。
+
+运行方式:
+    uv run python -m benchmarks.bench_aget_tuple --iterations 500 --writes 8
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import uuid
+
+from langgraph.checkpoint.base import empty_checkpoint
+from psycopg_pool import AsyncConnectionPool
+
+from config.env import POSTGRES_CONN_STRING
+from db.pg.pg_checkpointer import AsyncCompatiblePostgresSaver
+
+
+class ProtocolTrace:
+    """跟踪连接上的协议消息，统计往返次数（服务端发出的 ReadyForQuery 数量）"""
+
+    def __init__(self, pool: AsyncConnectionPool):
+        self.pool = pool
+        self._file = None
+
+    async def __aenter__(self):
+        self._file = tempfile.TemporaryFile(mode="w+")
+        # 连接池只有一个连接，之后的调用都复用这个连接
+        async with self.pool.connection() as conn:
+            conn.pgconn.trace(self._file.fileno())
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self.pool.connection() as conn:
+            conn.pgconn.untrace()
+
+    @property
+    def round_trips(self) -> int:
+        self._file.seek(0)
+        return sum(1 for line in self._file if "\tB\t" in line and "ReadyForQuery" in line)
+
+
+async def seed(saver: AsyncCompatiblePostgresSaver, writes: int) -> dict:
+    thread_id = f"bench-{uuid.uuid4()}"
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": [f"message {i}" for i in range(20)]}
+    config = await saver.aput(config, checkpoint, {"source": "loop", "step": 1}, {})
+    await saver.aput_writes(
+        config, [(f"channel_{i}", f"value {i}") for i in range(writes)], task_id="bench-task"
+    )
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+async def measure(saver: AsyncCompatiblePostgresSaver, config: dict, iterations: int) -> tuple[float, float]:
+    # 预热，保证预编译语句已经在连接上准备好
+    for _ in range(10):
+        await saver.aget_tuple(config)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await saver.aget_tuple(config)
+    elapsed = time.perf_counter() - start
+    # 延迟和往返次数分开测量，避免协议跟踪的开销计入延迟
+    async with ProtocolTrace(saver.pool) as trace:
+        for _ in range(iterations):
+            await saver.aget_tuple(config)
+    return elapsed / iterations * 1000, trace.round_trips / iterations
+
+
+async def main(iterations: int, writes: int, autocommit: bool):
+    pool = AsyncConnectionPool(
+        conninfo=POSTGRES_CONN_STRING,
+        min_size=1,
+        max_size=1,
+        kwargs={"autocommit": autocommit},
+        open=False,
+    )
+    await pool.open()
+    try:
+        saver = AsyncCompatiblePostgresSaver(pool)
+        await saver.setup()
+        config = await seed(saver, writes)
+        try:
+            for single_query_get in (False, True):
+                saver.single_query_get = single_query_get
+                latency_ms, round_trips = await measure(saver, config, iterations)
+                label = "single query" if single_query_get else "two queries"
+                print(f"{label:>12}: {latency_ms:.3f} ms/call, {round_trips:.1f} round-trips/call")
+        finally:
+            await saver.adelete_thread(config["configurable"]["thread_id"])
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=8, help="最新 checkpoint 上的 pending writes 数量")
+    parser.add_argument("--no-autocommit", dest="autocommit", action="store_false", help="连接不开启 autocommit")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.writes, args.autocommit))
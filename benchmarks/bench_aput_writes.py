@@ -0,0 +1,60 @@
+"""
+aput_writes 批量写入基准测试
+
+对比单条 unnest 语句批量写入（bulk_writes=True）与逐行 executemany 两种实现，
+需要 .env 中的 POSTGRES_CONN_STRING 指向一个本地 PostgreSQL。
+
+运行方式:
+    uv run python -m benchmarks.bench_aput_writes --sizes 1 10 100
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from psycopg_pool import AsyncConnectionPool
+
+from config.env import POSTGRES_CONN_STRING
+from db.pg.pg_checkpointer import AsyncCompatiblePostgresSaver
+
+
+async def measure(saver: AsyncCompatiblePostgresSaver, thread_id: str, size: int, iterations: int) -> float:
+    writes = [(f"channel_{i}", {"tool": f"tool_{i}", "output": "x" * 200}) for i in range(size)]
+    start = time.perf_counter()
+    for i in range(iterations):
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": str(uuid.uuid4())}}
+        await saver.aput_writes(config, writes, task_id=f"task-{i}")
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+async def main(sizes: list[int], iterations: int):
+    # 与应用一致开启 autocommit，批量写入的单条语句不会再被包在 BEGIN / COMMIT 中
+    pool = AsyncConnectionPool(
+        conninfo=POSTGRES_CONN_STRING, min_size=1, max_size=1, kwargs={"autocommit": True}, open=False
+    )
+    await pool.open()
+    try:
+        saver = AsyncCompatiblePostgresSaver(pool)
+        await saver.setup()
+        thread_id = f"bench-{uuid.uuid4()}"
+        try:
+            print(f"{'writes':>6} {'executemany ms':>15} {'bulk ms':>10} {'speedup':>8}")
+            for size in sizes:
+                results = {}
+                for bulk_writes in (False, True):
+                    saver.bulk_writes = bulk_writes
+                    await measure(saver, thread_id, size, 5)  # 预热
+                    results[bulk_writes] = await measure(saver, thread_id, size, iterations)
+                print(f"{size:>6} {results[False]:>15.3f} {results[True]:>10.3f} {results[False] / results[True]:>8.2f}")
+        finally:
+            await saver.adelete_thread(thread_id)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.iterations))
@@ -0,0 +1,71 @@
+"""
+Checkpoint 负载压缩基准测试
+
+用合成的多轮对话构造 checkpoint，比较不同 codec 的压缩率与编解码 CPU 开销，不需要数据库。
+
+运行方式:
+    uv run python -m benchmarks.bench_codec --turns 10 50 200
+"""
+import argparse
+import random
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from db.pg.codec import CODECS, CompressedSerializer
+
+WORDS = (
+    "checkpoint thread message graph node state stream token model user assistant "
+    "请 帮我 总结 一下 这个 问题 的 原因 以及 可能 的 解决 方案 谢谢"
+).split()
+
+
+def synthetic_checkpoint(turns: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=" ".join(rng.choices(WORDS, k=30)), name="user_query"))
+        messages.append(AIMessage(content=" ".join(rng.choices(WORDS, k=120)), id=f"run-{i}"))
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": messages}
+    return checkpoint
+
+
+def measure(serde, checkpoint: dict, iterations: int) -> tuple[int, float, float]:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        typed = serde.dumps_typed(checkpoint)
+    encode_ms = (time.perf_counter() - start) / iterations * 1000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        serde.loads_typed(typed)
+    decode_ms = (time.perf_counter() - start) / iterations * 1000
+    return len(typed[1]), encode_ms, decode_ms
+
+
+def main(turns_list: list[int], iterations: int):
+    base = JsonPlusSerializer()
+    serdes = {"raw": base}
+    for codec in CODECS:
+        try:
+            serdes[codec] = CompressedSerializer(base, codec, threshold=0)
+        except ImportError as e:
+            print(f"skip {codec}: {e}")
+    print(f"{'turns':>6} {'codec':>6} {'bytes':>10} {'ratio':>7} {'encode ms':>10} {'decode ms':>10}")
+    for turns in turns_list:
+        checkpoint = synthetic_checkpoint(turns)
+        raw_size = None
+        for name, serde in serdes.items():
+            size, encode_ms, decode_ms = measure(serde, checkpoint, iterations)
+            raw_size = raw_size or size
+            print(f"{turns:>6} {name:>6} {size:>10} {raw_size / size:>7.2f} {encode_ms:>10.3f} {decode_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    main(args.turns, args.iterations)
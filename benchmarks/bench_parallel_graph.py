@@ -0,0 +1,45 @@
+"""
+并行分支延迟基准测试
+
+对比示例图（graph/parallelgraph/ParallelGraph.py）并行扇出与顺序执行同样三个步骤的端到端耗时，
+节点的 I/O 延迟是模拟的，不需要 LLM 或数据库。
+
+运行方式:
+    uv run python -m benchmarks.bench_parallel_graph --iterations 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+from graph.parallelgraph.ParallelGraph import ParallelGraphBuilder
+
+
+async def measure(parallel: bool, iterations: int) -> list[float]:
+    graph = ParallelGraphBuilder(parallel=parallel).compile()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await graph.ainvoke({"messages": [HumanMessage(content="怎么重置密码？")]})
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main(iterations: int):
+    print(f"{'mode':>10} {'mean ms':>9} {'p50 ms':>9}")
+    results = {}
+    for parallel in (False, True):
+        timings = await measure(parallel, iterations)
+        results[parallel] = statistics.mean(timings)
+        mode = "parallel" if parallel else "sequential"
+        print(f"{mode:>10} {results[parallel]:>9.1f} {statistics.median(timings):>9.1f}")
+    print(f"speedup: {results[False] / results[True]:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
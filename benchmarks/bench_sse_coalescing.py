@@ -0,0 +1,63 @@
+"""
+SSE token 合并基准测试
+
+以固定速率向事件队列写入模拟的 on_chat_model_stream 事件，对比不同 coalesce_ms 下
+每个响应的帧数、发送字节数以及 event_generator 消耗的 CPU 时间，不需要 LLM 或数据库。
+
+运行方式:
+    uv run python -m benchmarks.bench_sse_coalescing --tokens 500 --rate 200 --intervals 0 20 50
+"""
+import argparse
+import asyncio
+import time
+
+from sse_starlette.sse import ServerSentEvent
+
+from service.chat.chat_service import ChatService
+
+
+async def produce(event_queue: asyncio.Queue, tokens: int, rate: float):
+    interval = 1 / rate
+    for i in range(tokens):
+        await event_queue.put({
+            "kind": "on_chat_model_stream",
+            "event": "ChatOpenAI",
+            "data": {"chunk": {"type": "AIMessageChunk", "content": "token ", "name": None, "id": "run-bench"}},
+        })
+        await asyncio.sleep(interval)
+    await event_queue.put({"kind": "end", "event": "completed", "data": {"message": "Stream completed"}})
+    await event_queue.put(None)
+
+
+async def measure(tokens: int, rate: float, coalesce_ms: int, stream_mode: str) -> tuple[int, int, float]:
+    event_queue = asyncio.Queue()
+    producer = asyncio.create_task(produce(event_queue, tokens, rate))
+    frames = 0
+    sent_bytes = 0
+    cpu_start = time.process_time()
+    async for frame in ChatService().event_generator(
+        event_queue, asyncio.Event(), stream_mode=stream_mode, coalesce_ms=coalesce_ms
+    ):
+        frames += 1
+        sent_bytes += len(ServerSentEvent(**frame, sep="\n").encode())
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+    await producer
+    return frames, sent_bytes, cpu_ms
+
+
+async def main(tokens: int, rate: float, intervals: list[int], stream_mode: str):
+    print(f"{tokens} tokens at {rate:.0f} tokens/s, stream_mode={stream_mode}")
+    print(f"{'coalesce ms':>11} {'frames':>7} {'bytes':>8} {'cpu ms':>8}")
+    for coalesce_ms in intervals:
+        frames, sent_bytes, cpu_ms = await measure(tokens, rate, coalesce_ms, stream_mode)
+        print(f"{coalesce_ms:>11} {frames:>7} {sent_bytes:>8} {cpu_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200, help="每秒产生的 token 数")
+    parser.add_argument("--intervals", type=int, nargs="+", default=[0, 20, 50])
+    parser.add_argument("--stream-mode", choices=["full", "compact"], default="full")
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.rate, args.intervals, args.stream_mode))
@@ -0,0 +1,92 @@
+"""
+冷启动导入耗时基准测试
+
+在子进程中以 python -X importtime 导入 main，汇总导入总耗时和累计耗时最高的模块，
+并检查应当延迟到 lifespan 或首次使用时才导入的重量级依赖是否被提前加载。
+超出 --max-import-ms 或有依赖被提前加载时以非零状态退出，可以放进 CI 防止启动变慢。
+lifespan 各阶段的耗时见 /api/v1/metrics/startup。不需要 LLM 或数据库。
+
+运行方式:
+    uv run python -m benchmarks.bench_startup --top 15 --max-import-ms 2000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# 导入 main 时不应加载的模块：分别由 checkpointer 迁移、LLM 客户端创建、连接池创建、
+# 语义缓存加载 embedding 模型时按需导入
+DEFERRED_MODULES = [
+    "sqlalchemy",
+    "langchain_openai",
+    "openai",
+    "langgraph.checkpoint.sqlite",
+    "aiosqlite",
+    "psycopg",
+    "psycopg_pool",
+    "graph.maingraph.TriageNode",
+    "langchain_community",
+    "fastembed",
+]
+
+# 开启默认关闭、但会在启动时加载重量级依赖的功能，确保它们也不会在导入时加载
+PROFILE_ENV = {
+    "LLM_CACHE_ENABLED": "true",
+    "LLM_CACHE_SEMANTIC_THRESHOLD": "0.95",
+}
+
+
+def import_profile(module: str) -> tuple[dict[str, tuple[int, int]], list[str]]:
+    """返回 ({模块: (自身耗时 us, 累计耗时 us)}, 提前加载的延迟模块)"""
+    # 被导入的模块自身也可能输出到 stdout，结果用前缀区分
+    check = f"import sys, {module}; print('deferred:', *(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, **PROFILE_ENV},
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    loaded = next(line.split()[1:] for line in reversed(result.stdout.splitlines()) if line.startswith("deferred:"))
+    return timings, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3, help="重复导入次数，取中位数")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-import-ms", type=float, default=0, help="导入耗时上限，0 表示不检查")
+    args = parser.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [timings[args.module][1] / 1000 for timings, _ in runs]
+    timings, loaded = runs[-1]
+    total_ms = statistics.median(totals)
+
+    print(f"import {args.module}: {total_ms:.0f}ms (median of {args.runs}, min {min(totals):.0f}ms)")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module (top {args.top})")
+    top = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in top[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    failed = False
+    if loaded:
+        failed = True
+        print(f"\n应延迟导入的模块被提前加载: {', '.join(loaded)}")
+    if args.max_import_ms and total_ms > args.max_import_ms:
+        failed = True
+        print(f"\n导入耗时 {total_ms:.0f}ms 超过上限 {args.max_import_ms:.0f}ms")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,4 +17,83 @@ GEMINI_2_5_FLASH_API_KEY = os.getenv("GEMINI_2_5_FLASH_API_KEY")
 GEMINI_2_5_FLASH_BASE_URL = os.getenv("GEMINI_2_5_FLASH_BASE_URL")
 GEMINI_2_5_FLASH_MODEL = os.getenv("GEMINI_2_5_FLASH_MODEL")
 
-POSTGRES_CONN_STRING = os.getenv("POSTGRES_CONN_STRING")
\ No newline at end of file
+POSTGRES_CONN_STRING = os.getenv("POSTGRES_CONN_STRING")
+
+# PG 连接池，按并发 SSE 流数量调整 MAX_SIZE
+POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1"))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", "30"))
+POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "30"))  # 获取连接的最长等待时间（秒）
+POSTGRES_POOL_MAX_LIFETIME = float(os.getenv("POSTGRES_POOL_MAX_LIFETIME", "3600"))  # 连接最长存活时间（秒）
+POSTGRES_POOL_MAX_IDLE = float(os.getenv("POSTGRES_POOL_MAX_IDLE", "600"))  # 空闲连接回收时间（秒）
+POSTGRES_STATEMENT_TIMEOUT_MS = int(os.getenv("POSTGRES_STATEMENT_TIMEOUT_MS", "0"))  # 0 表示不限制
+
+# Checkpointer 最新 checkpoint 缓存，CHECKPOINT_CACHE_SIZE 为 0 时不启用
+CHECKPOINT_CACHE_SIZE = int(os.getenv("CHECKPOINT_CACHE_SIZE", "0"))
+CHECKPOINT_CACHE_TTL = float(os.getenv("CHECKPOINT_CACHE_TTL", "300"))
+
+# Checkpointer 增量存储：只保存版本变化的 channel，而不是每一步的完整状态
+CHECKPOINT_DELTA_STORAGE = os.getenv("CHECKPOINT_DELTA_STORAGE", "false").lower() in ("1", "true", "yes")
+
+# Checkpointer 负载压缩：zlib / zstd，留空表示不压缩
+CHECKPOINT_CODEC = os.getenv("CHECKPOINT_CODEC") or None
+CHECKPOINT_COMPRESS_THRESHOLD = int(os.getenv("CHECKPOINT_COMPRESS_THRESHOLD", "1024"))
+
+# Checkpoint 保留策略，均为 0 时不启动后台清理任务
+CHECKPOINT_RETENTION_KEEP_LAST = int(os.getenv("CHECKPOINT_RETENTION_KEEP_LAST", "0"))
+CHECKPOINT_RETENTION_MAX_IDLE_HOURS = float(os.getenv("CHECKPOINT_RETENTION_MAX_IDLE_HOURS", "0"))
+CHECKPOINT_RETENTION_INTERVAL = float(os.getenv("CHECKPOINT_RETENTION_INTERVAL", "3600"))
+CHECKPOINT_RETENTION_BATCH_SIZE = int(os.getenv("CHECKPOINT_RETENTION_BATCH_SIZE", "500"))
+
+# Checkpointer write-behind：异步批量提交 checkpoint，进程异常退出时可能丢失 MAX_LAG 内的写入
+CHECKPOINT_WRITE_BEHIND = os.getenv("CHECKPOINT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+CHECKPOINT_WRITE_BEHIND_MAX_LAG = float(os.getenv("CHECKPOINT_WRITE_BEHIND_MAX_LAG", "0.05"))
+CHECKPOINT_WRITE_BEHIND_MAX_QUEUE = int(os.getenv("CHECKPOINT_WRITE_BEHIND_MAX_QUEUE", "1000"))
+# 同一线程的写入连续失败的重试次数，超过后丢弃该线程排队中的写入并向其报错，避免阻塞其他线程
+CHECKPOINT_WRITE_BEHIND_MAX_RETRIES = int(os.getenv("CHECKPOINT_WRITE_BEHIND_MAX_RETRIES", "3"))
+
+# Chat SSE 事件队列上限，达到后 token chunk 合并发送、其他事件等待消费
+CHAT_EVENT_QUEUE_MAXSIZE = int(os.getenv("CHAT_EVENT_QUEUE_MAXSIZE", "256"))
+# 等待事件时检查客户端是否断开的间隔（秒）
+CHAT_DISCONNECT_POLL_INTERVAL = float(os.getenv("CHAT_DISCONNECT_POLL_INTERVAL", "1.0"))
+# SSE 事件的 JSON 编码器：auto（安装了 orjson 时使用 orjson）/ json
+CHAT_JSON_BACKEND = os.getenv("CHAT_JSON_BACKEND", "auto").lower()
+# SSE token 合并：同一次模型调用的连续 chunk 最多等待该毫秒数后合并为一帧发送，0 表示不合并
+CHAT_COALESCE_INTERVAL_MS = int(os.getenv("CHAT_COALESCE_INTERVAL_MS", "0"))
+# 合并中的 token 累计达到该字符数时立即发送
+CHAT_COALESCE_MAX_CHARS = int(os.getenv("CHAT_COALESCE_MAX_CHARS", "256"))
+# /chat/batch 默认的并发对话数，以及客户端可以请求的上限
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+CHAT_BATCH_MAX_CONCURRENCY = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", "32"))
+# /chat/batch 单次请求最多包含的对话数
+CHAT_BATCH_MAX_REQUESTS = int(os.getenv("CHAT_BATCH_MAX_REQUESTS", "100"))
+
+# 对话准入控制：同时运行的 workflow 上限（0 表示不限制），按连接池大小和 LLM 限流调整
+CHAT_MAX_CONCURRENT_RUNS = int(os.getenv("CHAT_MAX_CONCURRENT_RUNS", "20"))
+# 每个客户端（X-Client-ID 请求头或客户端地址）同时运行的上限，0 表示不限制
+CHAT_MAX_RUNS_PER_CLIENT = int(os.getenv("CHAT_MAX_RUNS_PER_CLIENT", "0"))
+# 超过上限的请求最多排队的数量和等待时间（秒），超出后返回 429
+CHAT_ADMISSION_QUEUE_SIZE = int(os.getenv("CHAT_ADMISSION_QUEUE_SIZE", "50"))
+CHAT_ADMISSION_QUEUE_TIMEOUT = float(os.getenv("CHAT_ADMISSION_QUEUE_TIMEOUT", "5"))
+# 429 响应的 Retry-After（秒）
+CHAT_ADMISSION_RETRY_AFTER = int(os.getenv("CHAT_ADMISSION_RETRY_AFTER", "1"))
+
+# LLM 响应缓存：消息与模型参数完全相同时直接返回缓存的回复（仍以流式事件发送）
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))  # 内存中最多缓存的回复数
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))  # 有效期（秒），<= 0 表示不过期
+# 是否持久化到 PostgreSQL llm_cache 表（复用 checkpointer 连接池），多个 worker 之间共享
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+# 语义相似度层：余弦相似度阈值，0 表示不启用；需要安装 langchain-community 和 fastembed
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0"))
+LLM_CACHE_EMBEDDING_MODEL = os.getenv("LLM_CACHE_EMBEDDING_MODEL", "BAAI/bge-small-zh-v1.5")
+
+# 模型 HTTP 客户端：所有 ChatOpenAI 实例共用一个 httpx.AsyncClient
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30"))  # 空闲连接保留时间（秒）
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))  # 读取超时（秒）
+# 启用 HTTP/2 需要安装 h2：uv add "httpx[http2]"
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# 对话历史的 token 预算：超出后较早的消息折叠为滚动摘要，0 表示不压缩
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
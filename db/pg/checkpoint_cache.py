@@ -0,0 +1,102 @@
+"""
+进程内最新 checkpoint 缓存
+
+按 (thread_id, checkpoint_ns) 缓存每个线程最新的 CheckpointTuple，
+同一 worker 上的连续对话轮次可以跳过数据库查询和反序列化。
+缓存只在本进程内有效，跨进程的写入依靠 TTL 限制读到旧数据的时间窗口。
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from langgraph.checkpoint.base import CheckpointTuple, copy_checkpoint
+
+
+@dataclass
+class CheckpointCacheStats:
+    """缓存命中统计，用于调整 size / ttl"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+
+class CheckpointCache:
+    """基于 OrderedDict 的 LRU + TTL 缓存"""
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        Args:
+            max_size: 最多缓存的线程数，超出后淘汰最久未使用的条目。
+            ttl: 条目的有效期（秒），<= 0 表示不过期。
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str], tuple[float, CheckpointTuple]] = OrderedDict()
+        self._stats = CheckpointCacheStats()
+
+    def get(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str] = None) -> Optional[CheckpointTuple]:
+        """读取线程最新的 checkpoint；指定 checkpoint_id 时只有与缓存的最新 checkpoint 一致才命中"""
+        key = (thread_id, checkpoint_ns)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return None
+        stored_at, checkpoint_tuple = entry
+        if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self._stats.expirations += 1
+            self._stats.misses += 1
+            return None
+        if checkpoint_id and checkpoint_tuple.config["configurable"]["checkpoint_id"] != checkpoint_id:
+            self._stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return self._copy(checkpoint_tuple)
+
+    def put(self, checkpoint_tuple: CheckpointTuple) -> None:
+        """写入（或替换）线程最新的 checkpoint"""
+        configurable = checkpoint_tuple.config["configurable"]
+        key = (str(configurable["thread_id"]), configurable.get("checkpoint_ns", ""))
+        self._entries[key] = (time.monotonic(), self._copy(checkpoint_tuple))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def invalidate(self, thread_id: str, checkpoint_ns: Optional[str] = None) -> None:
+        """使线程的缓存失效；不指定 checkpoint_ns 时清除该线程所有命名空间"""
+        if checkpoint_ns is not None:
+            keys = [(thread_id, checkpoint_ns)] if (thread_id, checkpoint_ns) in self._entries else []
+        else:
+            keys = [key for key in self._entries if key[0] == thread_id]
+        for key in keys:
+            del self._entries[key]
+            self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @property
+    def stats(self) -> CheckpointCacheStats:
+        return CheckpointCacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            expirations=self._stats.expirations,
+            invalidations=self._stats.invalidations,
+            size=len(self._entries),
+        )
+
+    @staticmethod
+    def _copy(checkpoint_tuple: CheckpointTuple) -> CheckpointTuple:
+        # LangGraph 会在读取后修改 checkpoint 中的 channel_values / versions，
+        # 缓存内外各持有一份浅拷贝，避免调用方的修改污染缓存
+        return checkpoint_tuple._replace(
+            checkpoint=copy_checkpoint(checkpoint_tuple.checkpoint),
+            pending_writes=list(checkpoint_tuple.pending_writes or []),
+        )
@@ -0,0 +1,89 @@
+"""
+Checkpoint 负载压缩
+
+CompressedSerializer 包装 checkpointer 的序列化器，对超过阈值的负载进行压缩，
+并把压缩算法以 "<type>+<codec>" 的形式记录在 type 列中（与 langgraph 的
+EncryptedSerializer 约定一致）。读取时按 type 后缀解压，未压缩的旧数据原样读取。
+codec 为 None 时只解压不压缩，关闭压缩后仍能读取之前压缩写入的数据。
+"""
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+# (compress, decompress)
+Codec = Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+
+def _zlib_codec(level: Optional[int]) -> Codec:
+    level = 6 if level is None else level
+    return (lambda data: zlib.compress(data, level)), zlib.decompress
+
+
+def _zstd_codec(level: Optional[int]) -> Codec:
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstandard is not installed. Please install it with `uv add zstandard`."
+        ) from None
+    compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+    decompressor = zstandard.ZstdDecompressor()
+    return compressor.compress, decompressor.decompress
+
+
+# codec 名称 -> 构造函数，名称会写入 type 列，发布后不能修改
+CODECS: Dict[str, Callable[[Optional[int]], Codec]] = {
+    "zlib": _zlib_codec,
+    "zstd": _zstd_codec,
+}
+
+
+class CompressedSerializer(SerializerProtocol):
+    """对序列化结果进行压缩的序列化器"""
+
+    def __init__(
+        self,
+        serde: SerializerProtocol,
+        codec: Optional[str],
+        threshold: int = 1024,
+        level: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            serde: 被包装的序列化器。
+            codec: 写入时使用的压缩算法，见 CODECS；None 表示写入时不压缩，只负责读取时解压。
+            threshold: 小于该字节数的负载不压缩，避免小对象的额外 CPU 开销。
+            level: 压缩级别，None 使用各算法的默认值。
+        """
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unsupported codec: {codec}")
+        self.serde = serde
+        self.codec = codec
+        self.threshold = threshold
+        self.level = level
+        self._compress = CODECS[codec](level)[0] if codec is not None else None
+        self._decompressors: Dict[str, Callable[[bytes], bytes]] = {}
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        typ, data = self.serde.dumps_typed(obj)
+        if self._compress is None or data is None or len(data) < self.threshold:
+            return typ, data
+        compressed = self._compress(data)
+        # 压缩收益不明显时保存原始数据，读取时省去解压
+        if len(compressed) >= len(data):
+            return typ, data
+        return f"{typ}+{self.codec}", compressed
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        typ, payload = data
+        inner_typ, _, codec = typ.rpartition("+")
+        if not inner_typ or codec not in CODECS:
+            return self.serde.loads_typed(data)
+        return self.serde.loads_typed((inner_typ, self._decompressor(codec)(payload)))
+
+    def _decompressor(self, codec: str) -> Callable[[bytes], bytes]:
+        # 按需创建解压器，切换 codec 后仍能读取用其他 codec 写入的数据
+        if codec not in self._decompressors:
+            _, self._decompressors[codec] = CODECS[codec](None)
+        return self._decompressors[codec]
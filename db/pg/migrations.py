@@ -0,0 +1,159 @@
+"""
+Checkpointer 表结构迁移
+
+v0 是引入迁移之前由 create_all 建出的表结构，以固定的 DDL 保存；之后的迁移由
+db/pg/models.py 中的 ORM 模型编译为 PostgreSQL DDL，通过已有的 psycopg 连接池执行，
+不再为建表单独创建 SQLAlchemy 引擎。
+已应用的版本记录在 checkpoint_migrations 表中，重复执行是幂等的。
+
+SQLAlchemy 只在确实需要执行迁移时才导入：表结构已是最新版本时（常见的 worker 重启），
+只查询一次 checkpoint_migrations 就返回。
+"""
+import logging
+from typing import TYPE_CHECKING, Callable, List
+
+if TYPE_CHECKING:
+    from psycopg import AsyncConnection
+    from sqlalchemy import Table
+    from sqlalchemy.schema import Index
+
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock 使用的锁 key，避免多个 worker 同时启动时并发迁移
+MIGRATION_LOCK_KEY = 0x6D79_6772_6170_68
+
+
+def _add_column_statement(table: "Table", column_name: str) -> str:
+    """生成 ADD COLUMN IF NOT EXISTS 语句，用于给已有表补充模型中新增的列"""
+    from sqlalchemy.dialects import postgresql
+
+    dialect = postgresql.dialect()
+    column_spec = dialect.ddl_compiler(dialect, None).get_column_specification(table.columns[column_name])
+    return f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {column_spec}"
+
+
+def _create_index_statement(index: "Index") -> str:
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateIndex
+
+    return str(CreateIndex(index, if_not_exists=True).compile(dialect=postgresql.dialect()))
+
+
+def _create_statements(*tables: "Table") -> List[str]:
+    """将表及其索引编译为 IF NOT EXISTS 形式的 DDL"""
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateTable
+
+    dialect = postgresql.dialect()
+    statements = []
+    for table in tables:
+        statements.append(str(CreateTable(table, if_not_exists=True).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            statements.append(_create_index_statement(index))
+    return statements
+
+
+def _index(table: "Table", name: str) -> "Index":
+    return next(index for index in table.indexes if index.name == name)
+
+
+# 基线表结构（引入迁移前 create_all 建出的表），不能从当前模型生成：
+# 模型之后新增的列和索引（如 created_at）只能由对应版本的迁移添加，
+# 否则已有的基线数据库在 v0 上就会因为索引引用不存在的列而失败
+_BASELINE_DDL = [
+    """CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT DEFAULT '' NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BYTEA,
+    metadata BYTEA,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+)""",
+    "CREATE INDEX IF NOT EXISTS idx_checkpoints_thread_id ON checkpoints (thread_id)",
+    "CREATE INDEX IF NOT EXISTS idx_checkpoints_thread_ns ON checkpoints (thread_id, checkpoint_ns)",
+    """CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT DEFAULT '' NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx BIGINT NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BYTEA,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+)""",
+    "CREATE INDEX IF NOT EXISTS idx_writes_checkpoint_id ON writes (checkpoint_id)",
+    "CREATE INDEX IF NOT EXISTS idx_writes_thread_id ON writes (thread_id)",
+    "CREATE INDEX IF NOT EXISTS idx_writes_thread_ns ON writes (thread_id, checkpoint_ns)",
+]
+
+
+def _v0() -> List[str]:
+    return list(_BASELINE_DDL)
+
+
+def _v1() -> List[str]:
+    """增量 checkpoint 存储"""
+    from db.pg.models import Checkpoint, CheckpointBlob
+    return [
+        _add_column_statement(Checkpoint.__table__, "channel_versions"),
+        *_create_statements(CheckpointBlob.__table__),
+    ]
+
+
+def _v2() -> List[str]:
+    """记录 checkpoint 写入时间，供保留策略判断线程是否空闲"""
+    from db.pg.models import Checkpoint
+    return [
+        _add_column_statement(Checkpoint.__table__, "created_at"),
+        _create_index_statement(_index(Checkpoint.__table__, "idx_checkpoints_thread_created_at")),
+    ]
+
+
+def _v3() -> List[str]:
+    """LLM 响应缓存"""
+    from db.pg.models import LLMCacheEntry
+    return _create_statements(LLMCacheEntry.__table__)
+
+
+# 迁移列表，下标即版本号；只能追加，不能修改已发布的迁移。
+# 迁移只能引用在该版本就已存在的列和索引，不能整表编译当前模型（CREATE TABLE 之外的索引会引用之后新增的列）
+MIGRATIONS: List[Callable[[], List[str]]] = [_v0, _v1, _v2, _v3]
+
+SCHEMA_VERSION = len(MIGRATIONS) - 1
+
+
+async def _current_version(conn: "AsyncConnection") -> int:
+    """当前已应用的最高版本，checkpoint_migrations 表不存在时返回 -1"""
+    cur = await conn.execute("SELECT to_regclass('checkpoint_migrations') IS NOT NULL")
+    row = await cur.fetchone()
+    if not row[0]:
+        return -1
+    cur = await conn.execute("SELECT v FROM checkpoint_migrations ORDER BY v DESC LIMIT 1")
+    row = await cur.fetchone()
+    return row[0] if row is not None else -1
+
+
+async def run_migrations(conn: "AsyncConnection") -> int:
+    """在单个事务中应用所有未执行的迁移，返回当前的表结构版本"""
+    # 不加锁先检查一次，表结构已是最新时不导入 SQLAlchemy，也不占用 advisory 锁
+    if await _current_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+
+    from db.pg.models import CheckpointMigration
+
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+        for statement in _create_statements(CheckpointMigration.__table__):
+            await conn.execute(statement)
+
+        current = await _current_version(conn)
+        for version in range(current + 1, len(MIGRATIONS)):
+            logger.info(f"正在应用 checkpoint 表结构迁移 v{version}...")
+            for statement in MIGRATIONS[version]():
+                await conn.execute(statement)
+            await conn.execute("INSERT INTO checkpoint_migrations (v) VALUES (%s)", (version,))
+    return SCHEMA_VERSION
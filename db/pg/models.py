@@ -3,9 +3,10 @@ PostgreSQL 数据库模型定义
 使用 SQLAlchemy ORM
 """
 from sqlalchemy import (
-    Column, String, LargeBinary, BigInteger, Index, 
-    PrimaryKeyConstraint, Text
+    Column, String, LargeBinary, BigInteger, Integer, Index, 
+    PrimaryKeyConstraint, Text, DateTime, func
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -26,11 +27,16 @@ class Checkpoint(Base):
     checkpoint = Column(LargeBinary, nullable=True)  # BYTEA in PostgreSQL
     # 使用 name 参数将 Python 属性名映射到数据库列名 'metadata'
     checkpoint_metadata = Column("metadata", LargeBinary, nullable=True)  # BYTEA in PostgreSQL
+    # 增量存储时记录 channel -> version，channel_values 存放在 checkpoint_blobs；
+    # 为 NULL 表示 channel_values 完整保存在 checkpoint 列中
+    channel_versions = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     
     __table_args__ = (
         PrimaryKeyConstraint("thread_id", "checkpoint_ns", "checkpoint_id"),
         Index("idx_checkpoints_thread_id", "thread_id"),
         Index("idx_checkpoints_thread_ns", "thread_id", "checkpoint_ns"),
+        Index("idx_checkpoints_thread_created_at", "thread_id", "created_at"),
     )
 
 
@@ -54,3 +60,41 @@ class Write(Base):
         Index("idx_writes_checkpoint_id", "checkpoint_id"),
     )
 
+
+class CheckpointBlob(Base):
+    """Checkpoint blobs 表模型，增量存储时每个 channel 的每个版本保存一行"""
+    __tablename__ = "checkpoint_blobs"
+
+    thread_id = Column(Text, nullable=False)
+    checkpoint_ns = Column(Text, nullable=False, default="", server_default="")
+    channel = Column(Text, nullable=False)
+    version = Column(Text, nullable=False)
+    type = Column(Text, nullable=False)
+    blob = Column(LargeBinary, nullable=True)  # BYTEA in PostgreSQL
+
+    __table_args__ = (
+        PrimaryKeyConstraint("thread_id", "checkpoint_ns", "channel", "version"),
+        Index("idx_checkpoint_blobs_thread_id", "thread_id"),
+    )
+
+
+class CheckpointMigration(Base):
+    """Checkpoint 表结构版本记录，每应用一个迁移写入一行"""
+    __tablename__ = "checkpoint_migrations"
+
+    v = Column(Integer, primary_key=True, autoincrement=False)
+
+
+class LLMCacheEntry(Base):
+    """LLM 响应缓存表模型，key 为规范化消息与模型参数的哈希"""
+    __tablename__ = "llm_cache"
+
+    key = Column(Text, primary_key=True)
+    llm_string = Column(Text, nullable=False)
+    response = Column(Text, nullable=False)  # langchain_core.load.dumps 序列化的 generations
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=True)  # NULL 表示不过期
+
+    __table_args__ = (
+        Index("idx_llm_cache_expires_at", "expires_at"),
+    )
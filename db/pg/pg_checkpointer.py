@@ -1,14 +1,18 @@
 import logging
 import sys
 import asyncio
+import json
+import random
+from collections import OrderedDict
+from functools import partial
 from typing import cast, Any, Optional, AsyncIterator, Sequence
 
 # Windows事件循环策略设置 - 解决psycopg兼容性问题
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
     CheckpointTuple,
     CheckpointMetadata,
     Checkpoint,
@@ -17,61 +21,222 @@ from langgraph.checkpoint.base import (
     get_checkpoint_metadata,
     WRITES_IDX_MAP,
 )
-from langgraph.checkpoint.sqlite.utils import search_where
 from langchain_core.runnables import RunnableConfig
 
 import psycopg
+from psycopg.types.json import Jsonb
 from psycopg_pool import AsyncConnectionPool
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
 
-from db.pg.models import Base, Checkpoint, Write
-from config.env import POSTGRES_CONN_STRING
+from db.pg.codec import CompressedSerializer
+from db.pg.checkpoint_cache import CheckpointCache, CheckpointCacheStats
+from db.pg.migrations import run_migrations
+from db.pg.write_behind import WriteBehindBuffer
 
 
 logger = logging.getLogger(__name__)
 
+# alist 每页从服务端游标读取的 checkpoint 数量
+LIST_PAGE_SIZE = 100
 
-class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
+# 记录已确认 checkpoint_blobs 完整的线程数量上限，超出后淘汰最久未写入的线程
+DELTA_BASE_CACHE_SIZE = 10000
+
+# aget_tuple 单次往返查询：子查询定位 checkpoint，LATERAL 聚合其 pending writes，
+# 增量存储的 checkpoint 再按 channel_versions 聚合对应的 channel blobs
+_GET_TUPLE_SQL = """SELECT c.thread_id, c.checkpoint_id, c.parent_checkpoint_id, c.type, c.checkpoint, c.metadata,
+       c.channel_versions IS NOT NULL AS is_delta,
+       b.channels, b.types, b.blobs,
+       w.task_ids, w.channels, w.types, w.write_values
+FROM (
+    SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata, channel_versions
+    FROM checkpoints
+    WHERE thread_id = %s AND checkpoint_ns = %s{checkpoint_filter}
+    ORDER BY checkpoint_id DESC
+    LIMIT 1
+) c
+LEFT JOIN LATERAL (
+    SELECT array_agg(bl.channel) AS channels,
+           array_agg(bl.type) AS types,
+           array_agg(bl.blob) AS blobs
+    FROM jsonb_each_text(c.channel_versions) AS v(channel, version)
+    JOIN checkpoint_blobs bl
+      ON bl.thread_id = c.thread_id
+     AND bl.checkpoint_ns = c.checkpoint_ns
+     AND bl.channel = v.channel
+     AND bl.version = v.version
+) b ON TRUE
+LEFT JOIN LATERAL (
+    SELECT array_agg(task_id ORDER BY task_id, idx) AS task_ids,
+           array_agg(channel ORDER BY task_id, idx) AS channels,
+           array_agg(type ORDER BY task_id, idx) AS types,
+           array_agg(value ORDER BY task_id, idx) AS write_values
+    FROM writes
+    WHERE writes.thread_id = c.thread_id
+      AND writes.checkpoint_ns = c.checkpoint_ns
+      AND writes.checkpoint_id = c.checkpoint_id
+) w ON TRUE"""
+GET_LATEST_TUPLE_SQL = _GET_TUPLE_SQL.format(checkpoint_filter="")
+GET_TUPLE_BY_ID_SQL = _GET_TUPLE_SQL.format(checkpoint_filter=" AND checkpoint_id = %s")
+
+# 按 checkpoint 的 channel_versions 读取增量存储的 channel blobs
+SELECT_BLOBS_SQL = """SELECT c.thread_id, c.checkpoint_ns, c.checkpoint_id, bl.channel, bl.type, bl.blob
+FROM checkpoints c
+JOIN unnest(%s::text[], %s::text[], %s::text[]) AS k(thread_id, checkpoint_ns, checkpoint_id)
+  ON c.thread_id = k.thread_id
+ AND c.checkpoint_ns = k.checkpoint_ns
+ AND c.checkpoint_id = k.checkpoint_id
+CROSS JOIN LATERAL jsonb_each_text(c.channel_versions) AS v(channel, version)
+JOIN checkpoint_blobs bl
+  ON bl.thread_id = c.thread_id
+ AND bl.checkpoint_ns = c.checkpoint_ns
+ AND bl.channel = v.channel
+ AND bl.version = v.version"""
+
+UPSERT_CHECKPOINT_SQL = """INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata, channel_versions)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id)
+DO UPDATE SET
+    parent_checkpoint_id = EXCLUDED.parent_checkpoint_id,
+    type = EXCLUDED.type,
+    checkpoint = EXCLUDED.checkpoint,
+    metadata = EXCLUDED.metadata,
+    channel_versions = EXCLUDED.channel_versions"""
+
+_INSERT_WRITES_SQL = """INSERT INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value)
+{source}
+ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+{action}"""
+_VALUES = "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+_UNNEST = "SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::bigint[], %s::text[], %s::text[], %s::bytea[])"
+_DO_UPDATE = """DO UPDATE SET
+    channel = EXCLUDED.channel,
+    type = EXCLUDED.type,
+    value = EXCLUDED.value"""
+_DO_NOTHING = "DO NOTHING"
+# 特殊 channel（WRITES_IDX_MAP）的写入覆盖旧值，普通 channel 的写入只保留第一次
+UPSERT_WRITES_SQL = _INSERT_WRITES_SQL.format(source=_VALUES, action=_DO_UPDATE)
+INSERT_WRITES_SQL = _INSERT_WRITES_SQL.format(source=_VALUES, action=_DO_NOTHING)
+BULK_UPSERT_WRITES_SQL = _INSERT_WRITES_SQL.format(source=_UNNEST, action=_DO_UPDATE)
+BULK_INSERT_WRITES_SQL = _INSERT_WRITES_SQL.format(source=_UNNEST, action=_DO_NOTHING)
+
+# channel_versions 中在 checkpoint_blobs 里没有对应版本的 channel，
+# 例如开启增量存储前写入的父 checkpoint 的 channel_values 只保存在 checkpoints 行内
+SELECT_MISSING_BLOBS_SQL = """SELECT v.channel
+FROM jsonb_each_text(%s::jsonb) AS v(channel, version)
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM checkpoint_blobs bl
+    WHERE bl.thread_id = %s
+      AND bl.checkpoint_ns = %s
+      AND bl.channel = v.channel
+      AND bl.version = v.version
+)"""
+
+UPSERT_BLOBS_SQL = """INSERT INTO checkpoint_blobs (thread_id, checkpoint_ns, channel, version, type, blob)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (thread_id, checkpoint_ns, channel, version) DO NOTHING"""
+
+
+class AsyncCompatiblePostgresSaver(BaseCheckpointSaver[str]):
     """精简版兼容 PostgreSQL 的 checkpointer
     
-    保持与 AsyncSqliteSaver 的接口和序列化兼容性，
-    底层使用 PostgreSQL 存储。
+    保持与 AsyncSqliteSaver 的接口和序列化兼容性（字符串版本号、JSON 元数据），
+    底层使用 PostgreSQL 存储。不再继承 AsyncSqliteSaver，导入时无需加载 sqlite 相关模块；
+    只提供异步接口。
     """
 
-    def __init__(self, pool: AsyncConnectionPool, **kwargs):
-        super().__init__(None, **kwargs)
+    lock: asyncio.Lock
+    is_setup: bool
+
+    # 本进程内已完成迁移的连接串，多个 saver 实例共享同一数据库时只迁移一次
+    _migrated_conninfos: set[str] = set()
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        *,
+        single_query_get: bool = True,
+        cache_size: int = 0,
+        cache_ttl: float = 0,
+        delta_storage: bool = False,
+        codec: Optional[str] = None,
+        compress_threshold: int = 1024,
+        bulk_writes: bool = True,
+        write_behind: bool = False,
+        write_behind_max_lag: float = 0.05,
+        write_behind_max_queue: int = 1000,
+        write_behind_max_retries: int = 3,
+        **kwargs,
+    ):
+        """
+        Args:
+            pool: psycopg 异步连接池，连接应开启 autocommit（见 GraphBuilder.setup_checkpointer）。
+                多条语句的操作都显式开启事务；单条语句的读写不开事务，非 autocommit 连接上
+                psycopg 会为其额外发送 BEGIN / COMMIT。
+            single_query_get: aget_tuple 是否使用单条预编译语句同时读取 checkpoint 和 pending writes，
+                关闭后回退到事务内先查 checkpoint 再查 writes 的两次查询。
+            cache_size: 进程内缓存最新 checkpoint 的线程数，0 表示不启用缓存。
+            cache_ttl: 缓存条目的有效期（秒），0 表示不过期。
+            delta_storage: 是否使用增量存储。开启后 aput 只把 new_versions 中变化的 channel
+                写入 checkpoint_blobs，checkpoints 行不再包含 channel_values；
+                读取时两种格式的行都能识别。线程在本进程第一次增量写入时会检查未变化的 channel
+                是否已有 blob（开启前写入的父 checkpoint 没有），缺少的 channel 一并写入。已有线程在开启后写入的增量 checkpoint
+                依赖之前的 blobs，因此应在部署层面固定该选项，不要对进行中的线程来回切换。
+            codec: checkpoint、writes 和 channel blobs 负载的压缩算法（zlib / zstd），None 表示不压缩。
+                压缩算法记录在 type 列中，未压缩的旧数据和关闭压缩前写入的压缩数据都能正常读取。
+            compress_threshold: 小于该字节数的负载不压缩。
+            bulk_writes: aput_writes 是否用单条 unnest 语句批量写入，关闭后回退到逐行 executemany。
+            write_behind: 是否异步提交 aput / aput_writes，见 db/pg/write_behind.py。
+                进程异常退出时可能丢失最近 write_behind_max_lag 秒内的写入。
+            write_behind_max_lag: 写入最多延迟多久提交（秒）。
+            write_behind_max_queue: 未提交写操作的上限，达到后写入方等待。
+            write_behind_max_retries: 同一线程的写入连续失败的重试次数，超过后丢弃并在该线程
+                下一次读写时抛出 WriteBehindError。
+        """
+        super().__init__(**kwargs)
+        self.lock = asyncio.Lock()
+        self.is_setup = False
+        # 始终包装序列化器：未设置 codec 时只解压，关闭压缩后仍能读取之前压缩写入的行
+        self.serde = CompressedSerializer(self.serde, codec or None, threshold=compress_threshold)
         self.pool = pool
+        self.single_query_get = single_query_get
+        self.delta_storage = delta_storage
+        self.bulk_writes = bulk_writes
+        self.write_buffer = (
+            WriteBehindBuffer(
+                pool,
+                max_lag=write_behind_max_lag,
+                max_queue_size=write_behind_max_queue,
+                max_retries=write_behind_max_retries,
+            )
+            if write_behind
+            else None
+        )
+        self.cache = CheckpointCache(cache_size, cache_ttl) if cache_size > 0 else None
+        # 增量存储：本进程已确认 checkpoint_blobs 包含最新 checkpoint 全部 channel 的线程
+        self._delta_bases: OrderedDict[tuple[str, str], None] = OrderedDict()
 
     async def setup(self):
-        """使用 SQLAlchemy ORM 设置数据库表结构"""
-        if not POSTGRES_CONN_STRING:
-            raise ValueError("POSTGRES_CONN_STRING 未设置")
-        
-        # 将 postgresql:// 转换为 postgresql+psycopg:// 以便 SQLAlchemy 使用 psycopg 驱动
-        sqlalchemy_url = POSTGRES_CONN_STRING.replace(
-            "postgresql://", "postgresql+psycopg://", 1
-        ).replace(
-            "postgres://", "postgresql+psycopg://", 1
-        )
-        
-        # 创建 SQLAlchemy 异步引擎
-        engine = create_async_engine(
-            sqlalchemy_url,
-            echo=False,  # 设置为 True 可以查看生成的 SQL
-        )
-        
-        try:
-            # 使用 create_all 创建所有表（如果不存在）
-            # 这会自动创建表、主键和索引
-            async with engine.begin() as conn:
-                logger.info("正在检查并创建数据库表结构...")
-                await conn.run_sync(Base.metadata.create_all)
-                logger.info("✅ 数据库表结构检查完成（表已存在或已创建）")
-        finally:
-            # 关闭引擎
-            await engine.dispose()
-    
+        """初始化数据库表结构（每个进程只执行一次）
+
+        复用已有的连接池执行 db/pg/migrations.py 中尚未应用的迁移，并记录表结构版本。
+        由 GraphBuilder.setup_checkpointer 在启动时调用；之后的读写路径只检查
+        is_setup 标记，不会再访问数据库目录。
+        """
+        if self.is_setup:
+            return
+        async with self.lock:
+            if self.is_setup:
+                return
+            conninfo = self.pool.conninfo
+            if conninfo not in self._migrated_conninfos:
+                logger.info("正在检查并迁移数据库表结构...")
+                async with self.pool.connection() as conn:
+                    version = await run_migrations(conn)
+                self._migrated_conninfos.add(conninfo)
+                logger.info(f"✅ 数据库表结构检查完成（schema version: {version}）")
+            self.is_setup = True
+
     async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
         """Get a checkpoint tuple from the database asynchronously.
 
@@ -86,7 +251,30 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
         Returns:
             Optional[CheckpointTuple]: The retrieved checkpoint tuple, or None if no matching checkpoint was found.
         """
-        await self.setup()
+        if not self.is_setup:
+            await self.setup()
+        checkpoint_id = get_checkpoint_id(config)
+        if self.cache is not None:
+            cached = self.cache.get(
+                str(config["configurable"]["thread_id"]),
+                config["configurable"].get("checkpoint_ns", ""),
+                checkpoint_id,
+            )
+            if cached is not None:
+                return cached
+        if self.write_buffer is not None:
+            # read-your-writes：先提交该线程尚在缓冲区中的写入
+            await self.write_buffer.flush(str(config["configurable"]["thread_id"]))
+        if self.single_query_get:
+            checkpoint_tuple = await self._aget_tuple_single_query(config)
+        else:
+            checkpoint_tuple = await self._aget_tuple_two_queries(config)
+        if self.cache is not None and checkpoint_tuple is not None and not checkpoint_id:
+            self.cache.put(checkpoint_tuple)
+        return checkpoint_tuple
+
+    async def _aget_tuple_two_queries(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """aget_tuple 的原始实现：在事务内先查询 checkpoint，再查询其 pending writes"""
         checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
         async with self.pool.connection() as conn:
             async with conn.transaction():
@@ -94,7 +282,7 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
                     # find the latest checkpoint for the thread_id
                     if checkpoint_id := get_checkpoint_id(config):
                         await cur.execute(
-                            "SELECT thread_id, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s",
+                            "SELECT thread_id, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata, channel_versions IS NOT NULL FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s",
                             (
                                 str(config["configurable"]["thread_id"]),
                                 checkpoint_ns,
@@ -103,7 +291,7 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
                         )
                     else:
                         await cur.execute(
-                            "SELECT thread_id, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s ORDER BY checkpoint_id DESC LIMIT 1",
+                            "SELECT thread_id, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata, channel_versions IS NOT NULL FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s ORDER BY checkpoint_id DESC LIMIT 1",
                             (str(config["configurable"]["thread_id"]), checkpoint_ns),
                         )
                     # if a checkpoint is found, return it
@@ -115,6 +303,7 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
                             type,
                             checkpoint,
                             metadata,
+                            is_delta,
                         ) = value
                         if not get_checkpoint_id(config):
                             config = {
@@ -124,6 +313,16 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
                                     "checkpoint_id": checkpoint_id,
                                 }
                             }
+                        # load channel blobs of delta checkpoints
+                        channel_values = None
+                        if is_delta:
+                            await cur.execute(
+                                SELECT_BLOBS_SQL,
+                                ([thread_id], [checkpoint_ns], [checkpoint_id]),
+                            )
+                            channel_values = self._decode_blobs(
+                                [(channel, blob_type, blob) async for *_, channel, blob_type, blob in cur]
+                            )
                         # find any pending writes
                         await cur.execute(
                             "SELECT task_id, channel, type, value FROM writes WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s ORDER BY task_id, idx",
@@ -136,10 +335,10 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
                         # deserialize the checkpoint and metadata
                         return CheckpointTuple(
                             config,
-                            self.serde.loads_typed((type, checkpoint)),
+                            self._load_checkpoint(type, checkpoint, channel_values),
                             cast(
                                 CheckpointMetadata,
-                                self.jsonplus_serde.loads(metadata)
+                                json.loads(metadata)
                                 if metadata is not None
                                 else {},
                             ),
@@ -160,6 +359,84 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
                             ],
                         )
 
+    async def _aget_tuple_single_query(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """aget_tuple 的单次往返实现
+
+        先在子查询中定位目标 checkpoint，再通过 LATERAL 子查询把它的 pending writes
+        聚合为数组，一条语句返回一行结果；语句通过 psycopg 的 prepare 在连接上预编译。
+        只有在 autocommit 连接上才是一次往返，否则 psycopg 会在前后各多一次 BEGIN / COMMIT。
+        """
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        if checkpoint_id := get_checkpoint_id(config):
+            query = GET_TUPLE_BY_ID_SQL
+            params = (thread_id, checkpoint_ns, checkpoint_id)
+        else:
+            query = GET_LATEST_TUPLE_SQL
+            params = (thread_id, checkpoint_ns)
+        async with self.pool.connection() as conn:
+            cur = await conn.execute(query, params, prepare=True)
+            value = await cur.fetchone()
+        if value is None:
+            return None
+        (
+            thread_id,
+            checkpoint_id,
+            parent_checkpoint_id,
+            type,
+            checkpoint,
+            metadata,
+            is_delta,
+            blob_channels,
+            blob_types,
+            blobs,
+            write_task_ids,
+            write_channels,
+            write_types,
+            write_values,
+        ) = value
+        if not get_checkpoint_id(config):
+            config = {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            }
+        return CheckpointTuple(
+            config,
+            self._load_checkpoint(
+                type,
+                checkpoint,
+                self._decode_blobs(zip(blob_channels or (), blob_types or (), blobs or ()))
+                if is_delta
+                else None,
+            ),
+            cast(
+                CheckpointMetadata,
+                json.loads(metadata)
+                if metadata is not None
+                else {},
+            ),
+            (
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            [
+                (task_id, channel, self.serde.loads_typed((write_type, write_value)))
+                for task_id, channel, write_type, write_value in zip(
+                    write_task_ids or (), write_channels or (), write_types or (), write_values or ()
+                )
+            ],
+        )
+
     async def alist(
         self,
         config: Optional[RunnableConfig],
@@ -182,9 +459,18 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
         Yields:
             AsyncIterator[CheckpointTuple]: An asynchronous iterator of matching checkpoint tuples.
         """
-        await self.setup()
+        if not self.is_setup:
+            await self.setup()
+        if self.write_buffer is not None:
+            await self.write_buffer.flush(str(config["configurable"]["thread_id"]) if config else None)
+        # 只有 alist 用到，按需导入，避免启动时加载 sqlite saver
+        from langgraph.checkpoint.sqlite.utils import search_where
+
         where, params = search_where(config, filter, before)
-        query = f"""SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata
+        # search_where 生成的是 SQLite 风格的 ? 占位符，转换为 psycopg 的 %s
+        where = where.replace("?", "%s")
+        query = f"""SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata,
+            channel_versions IS NOT NULL
         FROM checkpoints
         {where}
         ORDER BY checkpoint_id DESC"""
@@ -192,52 +478,185 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
             query += f" LIMIT {limit}"
         async with self.pool.connection() as conn:
             async with conn.transaction():
-                async with conn.cursor() as cur, conn.cursor() as wcur:
+                # 使用服务端游标按页读取 checkpoints，每页只额外执行一次 writes 查询，
+                # 查询次数与页数成正比，而不是与 checkpoint 数量成正比
+                async with conn.cursor(name="alist_checkpoints") as cur, conn.cursor() as wcur:
                     await cur.execute(query, params)
-                    async for (
-                        thread_id,
-                        checkpoint_ns,
-                        checkpoint_id,
-                        parent_checkpoint_id,
-                        type,
-                        checkpoint,
-                        metadata,
-                    ) in cur:
-                        await wcur.execute(
-                            "SELECT task_id, channel, type, value FROM writes WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s ORDER BY task_id, idx",
-                            (thread_id, checkpoint_ns, checkpoint_id),
+                    while rows := await cur.fetchmany(LIST_PAGE_SIZE):
+                        pending_writes = await self._load_pending_writes(wcur, rows)
+                        page_channel_values = await self._load_page_channel_values(
+                            wcur, [row for row in rows if row[7]]
                         )
-                        yield CheckpointTuple(
-                            {
-                                "configurable": {
-                                    "thread_id": thread_id,
-                                    "checkpoint_ns": checkpoint_ns,
-                                    "checkpoint_id": checkpoint_id,
-                                }
-                            },
-                            self.serde.loads_typed((type, checkpoint)),
-                            cast(
-                                CheckpointMetadata,
-                                self.jsonplus_serde.loads(metadata)
-                                if metadata is not None
-                                else {},
-                            ),
-                            (
+                        for (
+                            thread_id,
+                            checkpoint_ns,
+                            checkpoint_id,
+                            parent_checkpoint_id,
+                            type,
+                            checkpoint,
+                            metadata,
+                            is_delta,
+                        ) in rows:
+                            yield CheckpointTuple(
                                 {
                                     "configurable": {
                                         "thread_id": thread_id,
                                         "checkpoint_ns": checkpoint_ns,
-                                        "checkpoint_id": parent_checkpoint_id,
+                                        "checkpoint_id": checkpoint_id,
                                     }
-                                }
-                                if parent_checkpoint_id
-                                else None
-                            ),
-                            [
-                                (task_id, channel, self.serde.loads_typed((type, value)))
-                                async for task_id, channel, type, value in wcur
-                            ],
-                        )
+                                },
+                                self._load_checkpoint(
+                                    type,
+                                    checkpoint,
+                                    page_channel_values.get((thread_id, checkpoint_ns, checkpoint_id), {})
+                                    if is_delta
+                                    else None,
+                                ),
+                                cast(
+                                    CheckpointMetadata,
+                                    json.loads(metadata)
+                                    if metadata is not None
+                                    else {},
+                                ),
+                                (
+                                    {
+                                        "configurable": {
+                                            "thread_id": thread_id,
+                                            "checkpoint_ns": checkpoint_ns,
+                                            "checkpoint_id": parent_checkpoint_id,
+                                        }
+                                    }
+                                    if parent_checkpoint_id
+                                    else None
+                                ),
+                                pending_writes.get((thread_id, checkpoint_ns, checkpoint_id), []),
+                            )
+
+    async def _load_pending_writes(
+        self,
+        cur: psycopg.AsyncCursor,
+        rows: Sequence[tuple],
+    ) -> dict[tuple[str, str, str], list[tuple[str, str, Any]]]:
+        """一次查询加载一页 checkpoint 的 pending writes，并按 checkpoint 分组
+
+        Args:
+            cur: 用于执行 writes 查询的游标。
+            rows: checkpoints 查询结果，前三列为 thread_id, checkpoint_ns, checkpoint_id。
+
+        Returns:
+            以 (thread_id, checkpoint_ns, checkpoint_id) 为 key 的 pending writes。
+        """
+        thread_ids, checkpoint_nss, checkpoint_ids = [], [], []
+        for row in rows:
+            thread_ids.append(row[0])
+            checkpoint_nss.append(row[1])
+            checkpoint_ids.append(row[2])
+        await cur.execute(
+            """SELECT w.thread_id, w.checkpoint_ns, w.checkpoint_id, w.task_id, w.channel, w.type, w.value
+               FROM writes w
+               JOIN unnest(%s::text[], %s::text[], %s::text[]) AS c(thread_id, checkpoint_ns, checkpoint_id)
+                 ON w.thread_id = c.thread_id
+                AND w.checkpoint_ns = c.checkpoint_ns
+                AND w.checkpoint_id = c.checkpoint_id
+               ORDER BY w.thread_id, w.checkpoint_ns, w.checkpoint_id, w.task_id, w.idx""",
+            (thread_ids, checkpoint_nss, checkpoint_ids),
+        )
+        pending_writes: dict[tuple[str, str, str], list[tuple[str, str, Any]]] = {}
+        async for thread_id, checkpoint_ns, checkpoint_id, task_id, channel, type, value in cur:
+            pending_writes.setdefault((thread_id, checkpoint_ns, checkpoint_id), []).append(
+                (task_id, channel, self.serde.loads_typed((type, value)))
+            )
+        return pending_writes
+
+    async def _load_page_channel_values(
+        self,
+        cur: psycopg.AsyncCursor,
+        rows: Sequence[tuple],
+    ) -> dict[tuple[str, str, str], dict[str, Any]]:
+        """一次查询加载一页增量存储 checkpoint 的 channel_values，没有增量行时不查询数据库"""
+        if not rows:
+            return {}
+        await cur.execute(
+            SELECT_BLOBS_SQL,
+            ([row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows]),
+        )
+        grouped: dict[tuple[str, str, str], list[tuple[str, str, Optional[bytes]]]] = {}
+        async for thread_id, checkpoint_ns, checkpoint_id, channel, type, blob in cur:
+            grouped.setdefault((thread_id, checkpoint_ns, checkpoint_id), []).append((channel, type, blob))
+        return {key: self._decode_blobs(blobs) for key, blobs in grouped.items()}
+
+    def _decode_blobs(self, blobs) -> dict[str, Any]:
+        """将 (channel, type, blob) 反序列化为 channel_values，跳过标记为 empty 的 channel"""
+        return {
+            channel: self.serde.loads_typed((type, blob))
+            for channel, type, blob in blobs
+            if type != "empty"
+        }
+
+    def _load_checkpoint(
+        self,
+        type: str,
+        checkpoint: bytes,
+        channel_values: Optional[dict[str, Any]],
+    ) -> Checkpoint:
+        """反序列化 checkpoint；增量存储的行传入从 checkpoint_blobs 重组的 channel_values"""
+        loaded = self.serde.loads_typed((type, checkpoint))
+        if channel_values is not None:
+            loaded["channel_values"] = channel_values
+        return loaded
+
+    def _dump_blobs(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        values: dict[str, Any],
+        versions: ChannelVersions,
+    ) -> list[tuple[str, str, str, str, str, Optional[bytes]]]:
+        """序列化本次变化的 channel，channel 已被清空时写入 empty 标记"""
+        return [
+            (
+                thread_id,
+                checkpoint_ns,
+                channel,
+                str(version),
+                *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)),
+            )
+            for channel, version in versions.items()
+        ]
+
+    async def _delta_versions(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint: Checkpoint,
+        new_versions: ChannelVersions,
+    ) -> ChannelVersions:
+        """增量写入的 channel 版本：new_versions，加上 checkpoint_blobs 中缺少的未变化 channel
+
+        开启增量存储前写入的父 checkpoint 只在行内保存 channel_values，读取增量行时
+        channel_values 只从 checkpoint_blobs 重组，只写入变化的 channel 会丢失其余 channel。
+        每个线程在本进程第一次增量写入时查询一次，之后 blobs 已经完整，不再查询。
+        """
+        unchanged = {
+            channel: version
+            for channel, version in checkpoint["channel_versions"].items()
+            if channel not in new_versions
+        }
+        if not unchanged or (thread_id, checkpoint_ns) in self._delta_bases:
+            return new_versions
+        async with self.pool.connection() as conn:
+            cur = await conn.execute(
+                SELECT_MISSING_BLOBS_SQL,
+                (Jsonb({channel: str(version) for channel, version in unchanged.items()}), thread_id, checkpoint_ns),
+            )
+            missing = [row[0] for row in await cur.fetchall()]
+        return {**new_versions, **{channel: unchanged[channel] for channel in missing}}
+
+    def _mark_delta_base(self, thread_id: str, checkpoint_ns: str) -> None:
+        self._delta_bases[(thread_id, checkpoint_ns)] = None
+        self._delta_bases.move_to_end((thread_id, checkpoint_ns))
+        while len(self._delta_bases) > DELTA_BASE_CACHE_SIZE:
+            self._delta_bases.popitem(last=False)
 
     async def aput(
         self,
@@ -260,42 +679,78 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
         Returns:
             RunnableConfig: Updated configuration after storing the checkpoint.
         """
-        await self.setup()
+        if not self.is_setup:
+            await self.setup()
         thread_id = config["configurable"]["thread_id"]
         checkpoint_ns = config["configurable"]["checkpoint_ns"]
-        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
-        serialized_metadata = self.jsonplus_serde.dumps(
-            get_checkpoint_metadata(config, metadata)
+        if self.delta_storage:
+            # 增量存储：channel_values 拆到 checkpoint_blobs，只写入本次版本变化的 channel
+            # 以及 checkpoint_blobs 中还没有的 channel
+            stored_checkpoint = {**checkpoint, "channel_values": {}}
+            versions = await self._delta_versions(str(thread_id), checkpoint_ns, checkpoint, new_versions)
+            blobs = self._dump_blobs(
+                str(thread_id), checkpoint_ns, checkpoint["channel_values"], versions
+            )
+            channel_versions = Jsonb(checkpoint["channel_versions"])
+        else:
+            stored_checkpoint = checkpoint
+            blobs = []
+            channel_versions = None
+        type_, serialized_checkpoint = self.serde.dumps_typed(stored_checkpoint)
+        # 与 AsyncSqliteSaver 相同，元数据以 UTF-8 JSON 保存（JsonPlusSerializer 在 langgraph-checkpoint 3.x 中已没有 dumps/loads）
+        serialized_metadata = json.dumps(
+            get_checkpoint_metadata(config, metadata), ensure_ascii=False
+        ).encode("utf-8", "ignore")
+        checkpoint_row = (
+            str(config["configurable"]["thread_id"]),
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            type_,
+            serialized_checkpoint,
+            serialized_metadata,
+            channel_versions,
         )
-        async with self.pool.connection() as conn:
-            async with conn.transaction():
-                async with conn.cursor() as cur:
-                    await cur.execute(
-                        """INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) 
-                           VALUES (%s, %s, %s, %s, %s, %s, %s)
-                           ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id)
-                           DO UPDATE SET 
-                               parent_checkpoint_id = EXCLUDED.parent_checkpoint_id,
-                               type = EXCLUDED.type,
-                               checkpoint = EXCLUDED.checkpoint,
-                               metadata = EXCLUDED.metadata""",
-                        (
-                            str(config["configurable"]["thread_id"]),
-                            checkpoint_ns,
-                            checkpoint["id"],
-                            config["configurable"].get("checkpoint_id"),
-                            type_,
-                            serialized_checkpoint,
-                            serialized_metadata,
-                        ),
-                    )
-        return {
+        if self.write_buffer is not None:
+            await self.write_buffer.enqueue(
+                str(thread_id), partial(self._write_checkpoint, checkpoint_row=checkpoint_row, blobs=blobs)
+            )
+        else:
+            async with self.pool.connection() as conn:
+                async with conn.transaction():
+                    await self._write_checkpoint(conn, checkpoint_row, blobs)
+        if self.delta_storage:
+            self._mark_delta_base(str(thread_id), checkpoint_ns)
+        next_config = {
             "configurable": {
                 "thread_id": thread_id,
                 "checkpoint_ns": checkpoint_ns,
                 "checkpoint_id": checkpoint["id"],
             }
         }
+        if self.cache is not None:
+            # write-through：刚写入的 checkpoint 就是该线程最新的 checkpoint
+            parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+            self.cache.put(
+                CheckpointTuple(
+                    next_config,
+                    checkpoint,
+                    get_checkpoint_metadata(config, metadata),
+                    (
+                        {
+                            "configurable": {
+                                "thread_id": thread_id,
+                                "checkpoint_ns": checkpoint_ns,
+                                "checkpoint_id": parent_checkpoint_id,
+                            }
+                        }
+                        if parent_checkpoint_id
+                        else None
+                    ),
+                    [],
+                )
+            )
+        return next_config
 
     async def aput_writes(
         self,
@@ -314,39 +769,91 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
             task_id: Identifier for the task creating the writes.
             task_path: Path of the task creating the writes.
         """
-        query = (
-            """INSERT INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) 
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-               ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
-               DO UPDATE SET 
-                   channel = EXCLUDED.channel,
-                   type = EXCLUDED.type,
-                   value = EXCLUDED.value"""
-            if all(w[0] in WRITES_IDX_MAP for w in writes)
-            else """INSERT INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
-                    DO NOTHING"""
-        )
-        await self.setup()
+        upsert = all(w[0] in WRITES_IDX_MAP for w in writes)
+        if not self.is_setup:
+            await self.setup()
+        if self.cache is not None:
+            self.cache.invalidate(
+                str(config["configurable"]["thread_id"]),
+                str(config["configurable"]["checkpoint_ns"]),
+            )
+        # 在获取连接之前完成序列化，缩短占用连接的时间
+        rows = [
+            (
+                str(config["configurable"]["thread_id"]),
+                str(config["configurable"]["checkpoint_ns"]),
+                str(config["configurable"]["checkpoint_id"]),
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        if not rows:
+            return
+        if self.write_buffer is not None:
+            await self.write_buffer.enqueue(
+                str(config["configurable"]["thread_id"]),
+                partial(self._write_writes, rows=rows, upsert=upsert),
+            )
+            return
         async with self.pool.connection() as conn:
-            async with conn.transaction():
-                async with conn.cursor() as cur:
-                    await cur.executemany(
-                        query,
-                        [
-                            (
-                                str(config["configurable"]["thread_id"]),
-                                str(config["configurable"]["checkpoint_ns"]),
-                                str(config["configurable"]["checkpoint_id"]),
-                                task_id,
-                                WRITES_IDX_MAP.get(channel, idx),
-                                channel,
-                                *self.serde.dumps_typed(value),
-                            )
-                            for idx, (channel, value) in enumerate(writes)
-                        ],
-                    )
+            if self.bulk_writes:
+                await self._write_writes(conn, rows, upsert)
+            else:
+                async with conn.transaction():
+                    await self._write_writes(conn, rows, upsert)
+
+    async def _write_checkpoint(
+        self,
+        conn: psycopg.AsyncConnection,
+        checkpoint_row: tuple,
+        blobs: list[tuple],
+    ) -> None:
+        """在调用方的事务中写入 checkpoint 行及其增量 blobs"""
+        async with conn.cursor() as cur:
+            if blobs:
+                await cur.executemany(UPSERT_BLOBS_SQL, blobs)
+            await cur.execute(UPSERT_CHECKPOINT_SQL, checkpoint_row)
+
+    async def _write_writes(
+        self,
+        conn: psycopg.AsyncConnection,
+        rows: list[tuple],
+        upsert: bool,
+    ) -> None:
+        """在调用方提供的连接上写入 pending writes"""
+        if self.bulk_writes:
+            await self._insert_writes_bulk(conn, rows, upsert)
+        else:
+            async with conn.cursor() as cur:
+                await cur.executemany(UPSERT_WRITES_SQL if upsert else INSERT_WRITES_SQL, rows)
+
+    async def _insert_writes_bulk(
+        self,
+        conn: psycopg.AsyncConnection,
+        rows: list[tuple],
+        upsert: bool,
+    ) -> None:
+        """用一条 INSERT ... SELECT FROM unnest(...) 写入全部 writes
+
+        单条语句本身是原子的，不需要显式事务；在 autocommit 连接上写入多少行都只有一次往返
+        （非 autocommit 连接上 psycopg 会隐式加上 BEGIN / COMMIT，共三次往返）。
+        同一条 INSERT 不能两次命中同一个冲突 key，因此先按主键去重：
+        upsert 时保留最后一次写入，否则保留第一次，与逐行执行的结果一致。
+        """
+        unique_rows: dict[tuple, tuple] = {}
+        for row in rows:
+            key = row[:5]
+            if upsert or key not in unique_rows:
+                unique_rows[key] = row
+        columns = [list(column) for column in zip(*unique_rows.values())]
+        await conn.execute(
+            BULK_UPSERT_WRITES_SQL if upsert else BULK_INSERT_WRITES_SQL,
+            columns,
+            prepare=True,
+        )
 
     async def adelete_thread(self, thread_id: str) -> None:
         """Delete all checkpoints and writes associated with a thread ID.
@@ -357,6 +864,12 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
         Returns:
             None
         """
+        if self.cache is not None:
+            self.cache.invalidate(str(thread_id))
+        for key in [key for key in self._delta_bases if key[0] == str(thread_id)]:
+            del self._delta_bases[key]
+        if self.write_buffer is not None:
+            await self.write_buffer.discard(str(thread_id))
         async with self.pool.connection() as conn:
             async with conn.transaction():
                 async with conn.cursor() as cur:
@@ -368,9 +881,35 @@ class AsyncCompatiblePostgresSaver(AsyncSqliteSaver):
                         "DELETE FROM writes WHERE thread_id = %s",
                         (str(thread_id),),
                     )
+                    await cur.execute(
+                        "DELETE FROM checkpoint_blobs WHERE thread_id = %s",
+                        (str(thread_id),),
+                    )
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """生成 channel 的下一个版本号，格式与 AsyncSqliteSaver 一致，已有线程的版本号可以继续递增"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        next_v = current_v + 1
+        next_h = random.random()
+        return f"{next_v:032}.{next_h:016}"
+
+    def cache_stats(self) -> Optional[CheckpointCacheStats]:
+        """返回最新 checkpoint 缓存的命中统计，未启用缓存时返回 None"""
+        return self.cache.stats if self.cache is not None else None
+
+    async def flush(self) -> None:
+        """提交 write-behind 缓冲中的全部写入，未开启 write-behind 时不做任何事"""
+        if self.write_buffer is not None:
+            await self.write_buffer.aclose()
 
     async def aclose(self) -> None:
-        """Close the underlying connection pool."""
+        """Flush pending writes and close the underlying connection pool."""
+        await self.flush()
         try:
             await self.pool.close()
         except Exception:
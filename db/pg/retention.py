@@ -0,0 +1,315 @@
+"""
+Checkpoint 保留策略与清理
+
+支持两种策略，可以同时启用：
+- keep_last: 每个 (thread_id, checkpoint_ns) 只保留最新的 N 个 checkpoint
+- max_idle: 删除最后一次写入早于 max_idle 的整个线程
+
+清理按主键顺序用 keyset 分页：线程按 (thread_id, checkpoint_ns) 顺序逐页查找，每页从上一页
+结束的位置继续扫描；keep_last 对每页线程只定位一次各自第 N 新的 checkpoint，再分批删除更早的行。
+一轮清理对 checkpoints 表只扫描一遍，每批在独立的短事务中删除，避免长时间持有锁。
+多个 worker 同时运行时，每轮清理先获取 advisory 锁，锁已被其他 worker 持有时跳过本轮；
+整轮清理都在持有锁的连接上执行，连接需要开启 autocommit，否则各批次会合并为一个长事务。
+既可以由 RetentionWorker 在应用生命周期内周期性运行，也可以通过命令行执行：
+
+    uv run python -m db.pg.retention --keep-last 20 --max-idle-hours 720
+"""
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Optional
+
+from db.pg.migrations import run_migrations
+
+if TYPE_CHECKING:
+    from psycopg import AsyncConnection
+    from psycopg_pool import AsyncConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_lock 使用的锁 key，同一时间只有一个 worker 执行清理
+RETENTION_LOCK_KEY = 0x7265_7465_6E74_69
+
+
+@dataclass
+class RetentionPolicy:
+    """保留策略，keep_last / max_idle 为 None 表示不启用对应规则"""
+    keep_last: Optional[int] = None
+    max_idle: Optional[timedelta] = None
+    batch_size: int = 500
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.keep_last) or bool(self.max_idle)
+
+
+@dataclass
+class RetentionStats:
+    """累计的清理进度"""
+    runs: int = 0
+    skipped: int = 0
+    threads_deleted: int = 0
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    blobs_deleted: int = 0
+    batches: int = 0
+    last_run_at: Optional[datetime] = None
+    last_run_seconds: float = 0.0
+    last_error: Optional[str] = None
+
+
+# checkpoint 数量超过保留数量的一页线程，按 (thread_id, checkpoint_ns) 顺序从上一页结束的位置继续，
+# 同时定位每个线程中第 N 新的 checkpoint，早于它的 checkpoint 都超出保留数量
+_SELECT_EXCESS_THREADS_SQL = """SELECT g.thread_id, g.checkpoint_ns, k.checkpoint_id
+FROM (
+    SELECT thread_id, checkpoint_ns
+    FROM checkpoints
+    {after}
+    GROUP BY thread_id, checkpoint_ns
+    HAVING count(*) > %s
+    ORDER BY thread_id, checkpoint_ns
+    LIMIT %s
+) g
+CROSS JOIN LATERAL (
+    SELECT checkpoint_id
+    FROM checkpoints c
+    WHERE c.thread_id = g.thread_id AND c.checkpoint_ns = g.checkpoint_ns
+    ORDER BY checkpoint_id DESC
+    OFFSET %s
+    LIMIT 1
+) k
+ORDER BY g.thread_id, g.checkpoint_ns"""
+
+# 一页线程中超出保留数量的一批 checkpoint，每个线程沿主键索引从最早的开始取
+_SELECT_EXCESS_CHECKPOINTS_SQL = """SELECT k.thread_id, k.checkpoint_ns, c.checkpoint_id
+FROM unnest(%s::text[], %s::text[], %s::text[]) AS k(thread_id, checkpoint_ns, oldest_kept)
+CROSS JOIN LATERAL (
+    SELECT checkpoint_id
+    FROM checkpoints c
+    WHERE c.thread_id = k.thread_id AND c.checkpoint_ns = k.checkpoint_ns AND c.checkpoint_id < k.oldest_kept
+    ORDER BY checkpoint_id
+    LIMIT %s
+) c
+LIMIT %s"""
+
+_DELETE_CHECKPOINTS_SQL = """DELETE FROM checkpoints c
+USING unnest(%s::text[], %s::text[], %s::text[]) AS k(thread_id, checkpoint_ns, checkpoint_id)
+WHERE c.thread_id = k.thread_id AND c.checkpoint_ns = k.checkpoint_ns AND c.checkpoint_id = k.checkpoint_id"""
+
+_DELETE_WRITES_SQL = """DELETE FROM writes w
+USING unnest(%s::text[], %s::text[], %s::text[]) AS k(thread_id, checkpoint_ns, checkpoint_id)
+WHERE w.thread_id = k.thread_id AND w.checkpoint_ns = k.checkpoint_ns AND w.checkpoint_id = k.checkpoint_id"""
+
+# 删除不再被线程中任何剩余 checkpoint 引用的增量 blobs
+_DELETE_UNREFERENCED_BLOBS_SQL = """DELETE FROM checkpoint_blobs bl
+USING unnest(%s::text[], %s::text[]) AS k(thread_id, checkpoint_ns)
+WHERE bl.thread_id = k.thread_id
+  AND bl.checkpoint_ns = k.checkpoint_ns
+  AND NOT EXISTS (
+      SELECT 1
+      FROM checkpoints c
+      CROSS JOIN LATERAL jsonb_each_text(c.channel_versions) AS v(channel, version)
+      WHERE c.thread_id = bl.thread_id
+        AND c.checkpoint_ns = bl.checkpoint_ns
+        AND v.channel = bl.channel
+        AND v.version = bl.version
+  )"""
+
+# 最后一次写入早于截止时间的线程，按 thread_id 顺序从上一页结束的位置继续取一页
+_SELECT_IDLE_THREADS_SQL = """SELECT thread_id
+FROM checkpoints
+{after}
+GROUP BY thread_id
+HAVING max(created_at) < %s
+ORDER BY thread_id
+LIMIT %s"""
+
+
+class RetentionEngine:
+    """按保留策略分批删除 checkpoints / writes / checkpoint_blobs"""
+
+    def __init__(self, pool: "AsyncConnectionPool", policy: RetentionPolicy):
+        self.pool = pool
+        self.policy = policy
+        self.stats = RetentionStats()
+
+    async def run_once(self) -> RetentionStats:
+        """执行一轮完整清理，直到没有符合条件的数据；其他 worker 正在清理时跳过"""
+        async with self.pool.connection() as conn:
+            cur = await conn.execute("SELECT pg_try_advisory_lock(%s)", (RETENTION_LOCK_KEY,))
+            if not (await cur.fetchone())[0]:
+                self.stats.skipped += 1
+                logger.info("Checkpoint retention skipped: another worker holds the lock")
+                return self.stats
+            try:
+                await self._run(conn)
+            finally:
+                try:
+                    await conn.execute("SELECT pg_advisory_unlock(%s)", (RETENTION_LOCK_KEY,))
+                except Exception as e:
+                    # 连接已断开时会话级锁随连接一起释放
+                    logger.warning(f"Failed to release checkpoint retention lock: {e}")
+        return self.stats
+
+    async def _run(self, conn: "AsyncConnection") -> None:
+        started = time.monotonic()
+        self.stats.runs += 1
+        self.stats.last_run_at = datetime.now(timezone.utc)
+        try:
+            if self.policy.max_idle:
+                await self._prune_idle_threads(conn)
+            if self.policy.keep_last:
+                await self._prune_excess_checkpoints(conn)
+            self.stats.last_error = None
+        except Exception as e:
+            self.stats.last_error = str(e)
+            raise
+        finally:
+            self.stats.last_run_seconds = time.monotonic() - started
+            logger.info(
+                f"Checkpoint retention run finished in {self.stats.last_run_seconds:.2f}s: "
+                f"threads={self.stats.threads_deleted}, checkpoints={self.stats.checkpoints_deleted}, "
+                f"writes={self.stats.writes_deleted}, blobs={self.stats.blobs_deleted}"
+            )
+
+    async def _prune_idle_threads(self, conn: "AsyncConnection") -> None:
+        cutoff = datetime.now(timezone.utc) - self.policy.max_idle
+        last_thread_id = None
+        while True:
+            async with conn.transaction():
+                if last_thread_id is None:
+                    query = _SELECT_IDLE_THREADS_SQL.format(after="")
+                    params = (cutoff, self.policy.batch_size)
+                else:
+                    query = _SELECT_IDLE_THREADS_SQL.format(after="WHERE thread_id > %s")
+                    params = (last_thread_id, cutoff, self.policy.batch_size)
+                cur = await conn.execute(query, params)
+                thread_ids = [row[0] for row in await cur.fetchall()]
+                if not thread_ids:
+                    return
+                await self._delete_threads(conn, thread_ids)
+            last_thread_id = thread_ids[-1]
+            self.stats.batches += 1
+            logger.debug(f"Pruned {len(thread_ids)} idle threads")
+
+    async def _delete_threads(self, conn: "AsyncConnection", thread_ids: list[str]) -> None:
+        cur = await conn.execute("DELETE FROM writes WHERE thread_id = ANY(%s)", (thread_ids,))
+        self.stats.writes_deleted += cur.rowcount
+        cur = await conn.execute("DELETE FROM checkpoint_blobs WHERE thread_id = ANY(%s)", (thread_ids,))
+        self.stats.blobs_deleted += cur.rowcount
+        cur = await conn.execute("DELETE FROM checkpoints WHERE thread_id = ANY(%s)", (thread_ids,))
+        self.stats.checkpoints_deleted += cur.rowcount
+        self.stats.threads_deleted += len(thread_ids)
+
+    async def _prune_excess_checkpoints(self, conn: "AsyncConnection") -> None:
+        last = None
+        while True:
+            if last is None:
+                query = _SELECT_EXCESS_THREADS_SQL.format(after="")
+                params = (self.policy.keep_last, self.policy.batch_size, self.policy.keep_last - 1)
+            else:
+                query = _SELECT_EXCESS_THREADS_SQL.format(after="WHERE (thread_id, checkpoint_ns) > (%s, %s)")
+                params = (*last, self.policy.keep_last, self.policy.batch_size, self.policy.keep_last - 1)
+            cur = await conn.execute(query, params)
+            threads = await cur.fetchall()
+            if not threads:
+                return
+            await self._prune_threads(conn, threads)
+            last = threads[-1][:2]
+
+    async def _prune_threads(self, conn: "AsyncConnection", threads: list[tuple[str, str, str]]) -> None:
+        """分批删除一页线程中早于 oldest_kept 的 checkpoint，最后清理不再被引用的 blobs"""
+        thread_ids = [t[0] for t in threads]
+        checkpoint_nss = [t[1] for t in threads]
+        oldest_kept = [t[2] for t in threads]
+        while True:
+            async with conn.transaction():
+                cur = await conn.execute(
+                    _SELECT_EXCESS_CHECKPOINTS_SQL,
+                    (thread_ids, checkpoint_nss, oldest_kept, self.policy.batch_size, self.policy.batch_size),
+                )
+                rows = await cur.fetchall()
+                if not rows:
+                    break
+                keys = ([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows])
+                cur = await conn.execute(_DELETE_WRITES_SQL, keys)
+                self.stats.writes_deleted += cur.rowcount
+                cur = await conn.execute(_DELETE_CHECKPOINTS_SQL, keys)
+                self.stats.checkpoints_deleted += cur.rowcount
+            self.stats.batches += 1
+            logger.debug(f"Pruned {len(rows)} checkpoints beyond keep_last={self.policy.keep_last}")
+        # blobs 在这页线程删除完成后清理一次；中途失败留下的 blobs 在线程下次超出保留数量时清理
+        cur = await conn.execute(_DELETE_UNREFERENCED_BLOBS_SQL, (thread_ids, checkpoint_nss))
+        self.stats.blobs_deleted += cur.rowcount
+
+
+class RetentionWorker:
+    """在后台周期性执行 RetentionEngine.run_once"""
+
+    def __init__(self, engine: RetentionEngine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="checkpoint-retention")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.engine.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Checkpoint retention error: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from psycopg_pool import AsyncConnectionPool
+
+    from config.env import POSTGRES_CONN_STRING
+
+    policy = RetentionPolicy(
+        keep_last=args.keep_last or None,
+        max_idle=timedelta(hours=args.max_idle_hours) if args.max_idle_hours else None,
+        batch_size=args.batch_size,
+    )
+    if not policy.enabled:
+        raise SystemExit("至少需要指定 --keep-last 或 --max-idle-hours")
+    # 清理在持有 advisory 锁的连接上分批提交，连接需要开启 autocommit
+    async with AsyncConnectionPool(
+        conninfo=POSTGRES_CONN_STRING, min_size=1, max_size=1, kwargs={"autocommit": True}, open=False
+    ) as pool:
+        # 确保 created_at 等保留策略依赖的列已经存在
+        async with pool.connection() as conn:
+            await run_migrations(conn)
+        stats = await RetentionEngine(pool, policy).run_once()
+    print(stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="按保留策略清理 checkpoints / writes / checkpoint_blobs")
+    parser.add_argument("--keep-last", type=int, default=0, help="每个线程保留的最新 checkpoint 数量")
+    parser.add_argument("--max-idle-hours", type=float, default=0, help="删除空闲超过该小时数的线程")
+    parser.add_argument("--batch-size", type=int, default=500)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Checkpoint write-behind 缓冲
+
+开启后 aput / aput_writes 不再同步提交，而是把写操作按线程放入内存中的有序队列，
+由后台任务在 max_lag 内合并为一个事务批量提交，流式输出不再等待 PostgreSQL 的提交延迟。
+每个线程的写操作在事务内各自的 savepoint 中执行，单个线程的写入失败不会影响其他线程提交。
+
+一致性与持久性约定：
+- 同一线程的写操作按入队顺序提交；读取某个线程前先 flush 该线程，保证读到自己的写入
+- 队列中的写操作数量达到 max_queue_size 时，新的写入会等待，形成背压
+- 进程异常退出时最多丢失 max_lag 内尚未提交的写入，正常关闭时由 lifespan 调用 flush
+- 某个线程的写操作执行失败时放回队首，在之后的批次中重试；连续失败超过 max_retries 次后
+  丢弃该线程排队中的写操作，并在该线程下一次 enqueue / flush 时抛出 WriteBehindError
+- 获取连接或提交事务失败（数据库不可用）时整批放回，不计入重试次数
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# 在调用方提供的连接（及事务）中执行的写操作
+WriteOp = Callable[[AsyncConnection], Awaitable[None]]
+
+
+class WriteBehindError(Exception):
+    """线程的写操作多次提交失败，已被丢弃"""
+
+    def __init__(self, thread_id: str, error: BaseException):
+        super().__init__(f"Checkpoint writes for thread {thread_id} were dropped after repeated failures: {error!r}")
+        self.thread_id = thread_id
+        self.error = error
+
+
+class WriteBehindBuffer:
+    """按线程排队、由后台任务批量提交的写缓冲"""
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        max_lag: float = 0.05,
+        max_queue_size: int = 1000,
+        max_retries: int = 3,
+    ):
+        """
+        Args:
+            pool: 用于提交的连接池。
+            max_lag: 写操作入队后最多等待多久被提交（秒）。
+            max_queue_size: 队列中最多积压的写操作数量，超过后 enqueue 等待。
+            max_retries: 同一线程的写操作连续执行失败的重试次数，超过后丢弃并报告给该线程。
+        """
+        self.pool = pool
+        self.max_lag = max_lag
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        # 被丢弃的写操作总数
+        self.dropped = 0
+        self._queues: dict[str, deque[WriteOp]] = {}
+        self._attempts: dict[str, int] = {}
+        self._failed: dict[str, BaseException] = {}
+        self._pending = 0
+        self._space = asyncio.Condition()
+        self._not_empty = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def enqueue(self, thread_id: str, op: WriteOp) -> None:
+        """追加一个写操作，队列已满时等待后台任务腾出空间
+
+        该线程之前的写操作已被丢弃时抛出 WriteBehindError，不在缺失的 checkpoint 之上继续写入。
+        """
+        self._raise_if_failed(thread_id)
+        async with self._space:
+            while self._pending >= self.max_queue_size:
+                self._not_empty.set()
+                await self._space.wait()
+            self._queues.setdefault(thread_id, deque()).append(op)
+            self._pending += 1
+        self._not_empty.set()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="checkpoint-write-behind")
+
+    async def discard(self, thread_id: str) -> None:
+        """丢弃线程尚未提交的写操作（线程被删除时使用）"""
+        async with self._flush_lock:
+            self._failed.pop(thread_id, None)
+            self._attempts.pop(thread_id, None)
+            ops = self._queues.pop(thread_id, None)
+            if not ops:
+                return
+            self._pending -= len(ops)
+        await self._release()
+
+    async def flush(self, thread_id: Optional[str] = None) -> None:
+        """提交指定线程（或全部线程）已入队的写操作
+
+        持有 flush 锁执行，保证与后台任务的提交不会交错，调用返回时这些写入已经提交。
+        指定线程时，该线程的写入失败会抛出异常（已被丢弃时为 WriteBehindError）；
+        提交全部线程时只记录日志，失败的线程留待重试，不影响其他线程。
+        """
+        async with self._flush_lock:
+            if thread_id is None:
+                batch = self._queues
+                self._queues = {}
+            elif thread_id in self._queues:
+                batch = {thread_id: self._queues.pop(thread_id)}
+            else:
+                self._raise_if_failed(thread_id)
+                return
+            count = sum(len(ops) for ops in batch.values())
+            if not count:
+                return
+            errors: dict[str, Exception] = {}
+            try:
+                async with self.pool.connection() as conn:
+                    async with conn.transaction():
+                        for tid, ops in batch.items():
+                            try:
+                                # 每个线程一个 savepoint，失败时只回滚该线程的写入
+                                async with conn.transaction():
+                                    for op in ops:
+                                        await op(conn)
+                            except Exception as e:
+                                errors[tid] = e
+            except BaseException:
+                # 连接或提交失败：整批放回队首，保持每个线程内的顺序，等待下次重试
+                self._requeue(batch)
+                raise
+            self._pending -= count
+            for tid in batch.keys() - errors.keys():
+                self._attempts.pop(tid, None)
+            for tid, e in errors.items():
+                self._handle_failure(tid, batch[tid], e)
+            if len(errors) < len(batch):
+                logger.debug(f"Flushed {count} checkpoint writes for {len(batch) - len(errors)} threads")
+        await self._release()
+        if thread_id is not None:
+            self._raise_if_failed(thread_id)
+            if thread_id in errors:
+                raise errors[thread_id]
+
+    async def aclose(self) -> None:
+        """提交全部剩余写操作并停止后台任务"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # 失败的线程会被放回队列，最多重试 max_retries 次后丢弃
+        for _ in range(self.max_retries + 1):
+            await self.flush()
+            if not self._queues:
+                break
+
+    def _requeue(self, batch: dict[str, deque[WriteOp]]) -> None:
+        for tid, ops in batch.items():
+            ops.extend(self._queues.pop(tid, ()))
+            self._queues[tid] = ops
+        self._not_empty.set()
+
+    def _handle_failure(self, thread_id: str, ops: deque[WriteOp], error: Exception) -> None:
+        """线程的写操作执行失败：未超过重试次数时放回队首，否则丢弃并记录，交给该线程的调用方"""
+        attempts = self._attempts.get(thread_id, 0) + 1
+        if attempts <= self.max_retries:
+            self._attempts[thread_id] = attempts
+            self._pending += len(ops)
+            self._requeue({thread_id: ops})
+            logger.warning(f"Checkpoint writes for thread {thread_id} failed (attempt {attempts}), will retry: {error!r}")
+            return
+        self._attempts.pop(thread_id, None)
+        # 之后入队的写操作依赖被丢弃的写入，一并丢弃
+        later = self._queues.pop(thread_id, ())
+        self._pending -= len(later)
+        self.dropped += len(ops) + len(later)
+        self._failed[thread_id] = error
+        logger.error(
+            f"Dropped {len(ops) + len(later)} checkpoint writes for thread {thread_id} after {attempts} attempts: {error!r}"
+        )
+
+    def _raise_if_failed(self, thread_id: str) -> None:
+        error = self._failed.pop(thread_id, None)
+        if error is not None:
+            raise WriteBehindError(thread_id, error) from error
+
+    async def _release(self) -> None:
+        async with self._space:
+            self._space.notify_all()
+
+    async def _run(self) -> None:
+        while True:
+            await self._not_empty.wait()
+            # 在 max_lag 内积攒写操作，合并到同一个事务中提交
+            await asyncio.sleep(self.max_lag)
+            self._not_empty.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Checkpoint write-behind flush error: {e}", exc_info=True)
+                self._not_empty.set()
+                await asyncio.sleep(self.max_lag)
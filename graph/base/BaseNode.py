@@ -1,17 +1,110 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from langgraph.types import Command
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, message_chunk_to_message
 from langchain_core.runnables import RunnableConfig
+from config.env import HISTORY_TOKEN_BUDGET
+from graph.base.history import split_for_budget, unsummarized_messages
 from schema.graph.graph import State
-from utils.LLMSelector import LLMSelector
+from utils.LLMSelector import llm_selector
+from utils.prompt_cache import prompt_cache_stats
 
-llm_selector = LLMSelector()
+SUMMARY_PROMPT = """你负责维护一段对话的滚动摘要。请把已有摘要和新增的对话合并为一段新的摘要，
+保留用户的目标、关键事实、已做出的决定和尚未解决的问题，省略寒暄和重复内容，只输出摘要本身。
+
+已有摘要：
+{summary}
+
+新增对话：
+{conversation}"""
 
 
 class BaseNode(ABC):
+    # 节点的系统提示词，作为每次请求的第一条消息；保持逐字节不变，便于命中提供方的 prompt 缓存
+    system_prompt: str = ""
+
     def __init__(self):
         self.gemini_2 = llm_selector.get_llm_by_name("gemini-2.5-flash")
 
     @abstractmethod
     async def __call__(self, state: State, config: RunnableConfig) -> Command:
-        pass
\ No newline at end of file
+        pass
+
+    async def stream_llm(
+        self,
+        messages: Sequence[BaseMessage],
+        config: RunnableConfig,
+        llm: Optional[BaseChatModel] = None,
+    ) -> AIMessage:
+        """流式调用模型并返回合并后的完整消息
+
+        通过 astream 逐块生成，astream_events 会在首个 token 到达时就产出
+        on_chat_model_stream 事件；所有 chunk 合并为一条 AIMessage 返回，
+        由节点一次性写入 State.messages。
+
+        Args:
+            messages: 发送给模型的消息。
+            config: 节点收到的 RunnableConfig，用于传递回调，保证流式事件能被捕获。
+            llm: 使用的模型，默认为 self.gemini_2。
+        """
+        llm = llm or self.gemini_2
+        response = None
+        async for chunk in llm.astream(messages, config=config):
+            response = chunk if response is None else response + chunk
+        if response is None:
+            return AIMessage(content="")
+        message = message_chunk_to_message(response)
+        # 记录提供方 prompt 缓存命中的 token 数
+        prompt_cache_stats.record((config.get("configurable") or {}).get("thread_id"), message)
+        return message
+
+    async def build_prompt(self, state: State) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+        """组装发送给模型的消息，返回 (消息, 需要写回 State 的更新)
+
+        顺序固定为：系统提示词 → 历史摘要 → 最近的消息（按写入 State 的顺序）。
+        两次压缩之间，前一轮的请求是后一轮请求的前缀，提供方可以复用前缀的 prompt 缓存。
+        """
+        messages, update = await self.compact_history(state)
+        if self.system_prompt:
+            messages = [SystemMessage(content=self.system_prompt), *messages]
+        return messages, update
+
+    async def compact_history(
+        self,
+        state: State,
+        budget: int = HISTORY_TOKEN_BUDGET,
+        llm: Optional[BaseChatModel] = None,
+    ) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+        """按 token 预算压缩历史，返回 (发送给模型的消息, 需要写回 State 的更新)
+
+        summarized_until 之后的消息超出预算时，把较早的部分与已有摘要合并为新摘要，
+        只对新折叠的消息调用一次模型，不会重新摘要整个历史。摘要以 SystemMessage
+        放在最近消息之前。budget <= 0 时不压缩。
+        """
+        messages = list(state.get("messages", []))
+        summary = state.get("summary")
+        update: Dict[str, Any] = {}
+        if budget > 0:
+            recent = unsummarized_messages(messages, state.get("summarized_until"))
+            to_fold, recent = split_for_budget(recent, budget)
+            if to_fold:
+                summary = await self._summarize(summary, to_fold, llm)
+                update = {"summary": summary, "summarized_until": to_fold[-1].id}
+            messages = recent
+        if summary:
+            messages = [SystemMessage(content=f"对话早期内容摘要：\n{summary}"), *messages]
+        return messages, update
+
+    async def _summarize(
+        self,
+        summary: Optional[str],
+        messages: Sequence[BaseMessage],
+        llm: Optional[BaseChatModel] = None,
+    ) -> str:
+        llm = llm or self.gemini_2
+        conversation = "\n".join(f"{m.type}: {m.content}" for m in messages)
+        prompt = SUMMARY_PROMPT.format(summary=summary or "（无）", conversation=conversation)
+        # 不挂回调：摘要是内部调用，不应作为 token 事件推送给客户端
+        response = await llm.ainvoke([HumanMessage(content=prompt)], config={"callbacks": [], "run_name": "history_summary"})
+        return response.content if isinstance(response.content, str) else str(response.content)
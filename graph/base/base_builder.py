@@ -1,8 +1,29 @@
+import asyncio
+import logging
 from langgraph.graph import StateGraph, START, END
-from typing import Optional, Dict, List
-from psycopg_pool import AsyncConnectionPool
-from db.pg.pg_checkpointer import AsyncCompatiblePostgresSaver
-from config.env import POSTGRES_CONN_STRING
+from langgraph.types import Send
+from typing import Any, Callable, Optional, Dict, List
+from config.env import (
+    POSTGRES_CONN_STRING,
+    POSTGRES_POOL_MIN_SIZE,
+    POSTGRES_POOL_MAX_SIZE,
+    POSTGRES_POOL_TIMEOUT,
+    POSTGRES_POOL_MAX_LIFETIME,
+    POSTGRES_POOL_MAX_IDLE,
+    POSTGRES_STATEMENT_TIMEOUT_MS,
+    CHECKPOINT_CACHE_SIZE,
+    CHECKPOINT_CACHE_TTL,
+    CHECKPOINT_DELTA_STORAGE,
+    CHECKPOINT_CODEC,
+    CHECKPOINT_COMPRESS_THRESHOLD,
+    CHECKPOINT_WRITE_BEHIND,
+    CHECKPOINT_WRITE_BEHIND_MAX_LAG,
+    CHECKPOINT_WRITE_BEHIND_MAX_QUEUE,
+    CHECKPOINT_WRITE_BEHIND_MAX_RETRIES,
+)
+from graph.base.reducers import CLEAR
+
+logger = logging.getLogger(__name__)
 
 
 class GraphBuilder:
@@ -15,18 +36,45 @@ class GraphBuilder:
         self._nodes = {}
         self._edges = []
 
-    async def setup_checkpointer(self,):
+    @staticmethod
+    async def setup_checkpointer():
+        """创建连接池和 checkpointer；多个图应通过 GraphRegistry 共用同一个实例"""
+        # psycopg 和 checkpointer 只在创建连接池时导入，图的定义和编译不依赖它们
+        from psycopg_pool import AsyncConnectionPool
+        from db.pg.pg_checkpointer import AsyncCompatiblePostgresSaver
+
         # 使用新的 API 创建连接池，避免弃用警告
         # 使用 open=False 阻止构造函数自动打开，然后显式调用 open()
+        # autocommit：单条语句的读写（aget_tuple、批量 writes）只需一次往返，不再额外发送 BEGIN / COMMIT；
+        # 多条语句的操作都显式使用 conn.transaction()
+        connection_kwargs = {"autocommit": True}
+        if POSTGRES_STATEMENT_TIMEOUT_MS > 0:
+            connection_kwargs["options"] = f"-c statement_timeout={POSTGRES_STATEMENT_TIMEOUT_MS}"
         pool = AsyncConnectionPool(
             conninfo=POSTGRES_CONN_STRING, 
-            min_size=1, 
-            max_size=30, 
-            timeout=30,
+            min_size=POSTGRES_POOL_MIN_SIZE, 
+            max_size=POSTGRES_POOL_MAX_SIZE, 
+            timeout=POSTGRES_POOL_TIMEOUT,
+            max_lifetime=POSTGRES_POOL_MAX_LIFETIME,
+            max_idle=POSTGRES_POOL_MAX_IDLE,
+            kwargs=connection_kwargs,
+            name="checkpointer",
             open=False  # 阻止自动打开
         )
-        await pool.open()  # 显式打开连接池
-        checkpointer = AsyncCompatiblePostgresSaver(pool)
+        # 显式打开连接池，并等待 min_size 个连接建立完成（预热），避免首批请求承担建连开销
+        await pool.open(wait=True, timeout=POSTGRES_POOL_TIMEOUT)
+        checkpointer = AsyncCompatiblePostgresSaver(
+            pool,
+            cache_size=CHECKPOINT_CACHE_SIZE,
+            cache_ttl=CHECKPOINT_CACHE_TTL,
+            delta_storage=CHECKPOINT_DELTA_STORAGE,
+            codec=CHECKPOINT_CODEC,
+            compress_threshold=CHECKPOINT_COMPRESS_THRESHOLD,
+            write_behind=CHECKPOINT_WRITE_BEHIND,
+            write_behind_max_lag=CHECKPOINT_WRITE_BEHIND_MAX_LAG,
+            write_behind_max_queue=CHECKPOINT_WRITE_BEHIND_MAX_QUEUE,
+            write_behind_max_retries=CHECKPOINT_WRITE_BEHIND_MAX_RETRIES,
+        )
         await checkpointer.setup()
         print("\033[92m✨ Checkpointer setup completed successfully! ✨\033[0m")
         return checkpointer
@@ -55,4 +103,85 @@ class GraphBuilder:
         """批量添加终止边"""
         for node in nodes:
             self.builder.add_edge(node, END)
-        return self
\ No newline at end of file
+        return self
+
+    def add_parallel_branches(
+        self,
+        source: str,
+        branches: Dict[str, Callable],
+        join: str,
+        timeout: Optional[float] = None,
+        branch_timeouts: Optional[Dict[str, float]] = None,
+        select: Optional[Callable[[Any], List[str]]] = None,
+        reset: Optional[List[str]] = None,
+    ):
+        """声明从 source 扇出、在 join 汇合的并行分支
+
+        所有分支在同一个 superstep 中并发执行，join 在全部分支结束后运行一次。
+        多个分支写入的 State 字段需要声明 reducer（见 graph/base/reducers.py），
+        否则同一 superstep 内的并发写入会报错。
+
+        分支结果保存在 checkpoint 中，续聊时 join 会看到上一轮的结果，因此 source 之后
+        插入一个 "<join>_fanout" 节点，每次扇出前把 reset 中的字段写为 CLEAR。
+
+        Args:
+            source: 扇出的起点节点，可以是 START。
+            branches: 分支节点名 -> 节点函数 (state, config)。
+            join: 汇合节点名，需要单独通过 add_node 添加。
+            timeout: 每个分支的默认超时（秒），None 表示不限制。
+            branch_timeouts: 按分支覆盖超时。超时的分支不写入结果，
+                而是在 State.branch_errors 中记录原因，其他分支和 join 照常运行；
+                设置超时时 State 必须声明 branch_errors: BranchErrors。
+            select: 可选，根据 state 返回本次要运行的分支名列表，通过 Send 动态扇出；
+                为 None 时每次运行全部分支。
+            reset: 每次扇出前清空的字段，reducer 需要支持 CLEAR（如 BranchResults / BranchErrors）；
+                为 None 时清空 State 中声明的 branch_results 和 branch_errors。
+        """
+        branch_timeouts = branch_timeouts or {}
+        channels = self.builder.channels
+        uses_timeout = timeout is not None or any(t is not None for t in branch_timeouts.values())
+        if uses_timeout and "branch_errors" not in channels:
+            raise ValueError(
+                f"{self.state_class.__name__} must declare `branch_errors: BranchErrors` "
+                "to record branch timeouts"
+            )
+        if reset is None:
+            reset = [field for field in ("branch_results", "branch_errors") if field in channels]
+        undeclared = [field for field in reset if field not in channels]
+        if undeclared:
+            raise ValueError(f"{self.state_class.__name__} does not declare reset fields: {undeclared}")
+
+        for name, node_func in branches.items():
+            branch_timeout = branch_timeouts.get(name, timeout)
+            if branch_timeout is not None:
+                node_func = self._with_timeout(name, node_func, branch_timeout)
+            self.add_node(name, node_func)
+
+        fanout = f"{join}_fanout"
+        self.add_node(fanout, lambda state: {field: CLEAR for field in reset})
+        self.builder.add_edge(source, fanout)
+        if select is None:
+            for name in branches:
+                self.builder.add_edge(fanout, name)
+            # 等待所有分支完成后再进入 join
+            self.builder.add_edge(list(branches), join)
+        else:
+            self.builder.add_conditional_edges(
+                fanout,
+                lambda state: [Send(name, state) for name in select(state)],
+                list(branches),
+            )
+            # Send 触发的分支在同一个 superstep 中执行，join 在下一步运行一次
+            for name in branches:
+                self.builder.add_edge(name, join)
+        self._edges.append((source, tuple(branches), join))
+        return self
+
+    def _with_timeout(self, name: str, node_func: Callable, timeout: float) -> Callable:
+        async def run_with_timeout(state, config):
+            try:
+                return await asyncio.wait_for(node_func(state, config), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Branch {name} timed out after {timeout}s")
+                return {"branch_errors": {name: f"timeout after {timeout}s"}}
+        return run_with_timeout
@@ -0,0 +1,75 @@
+"""
+对话历史压缩
+
+按 token 预算保留最近的消息，更早的消息折叠进 State 中的滚动摘要。
+token 数用本地启发式估算（CJK 字符约 1 token，其他文本约 4 字符 1 token），
+按消息 id 缓存，长线程每轮只需要估算新增的消息。
+"""
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, ToolMessage
+
+# 每条消息的固定开销（角色、分隔符等）
+MESSAGE_OVERHEAD_TOKENS = 4
+# 超出预算触发压缩时，保留的最近消息压到预算的该比例以下，避免之后每一轮都重新摘要
+COMPACT_TARGET_RATIO = 0.6
+
+_TOKEN_CACHE_SIZE = 10000
+_token_cache: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+
+
+def estimate_text_tokens(text: str) -> int:
+    cjk = sum(1 for ch in text if "\u2e80" <= ch <= "\u9fff" or "\uac00" <= ch <= "\ud7af" or "\uf900" <= ch <= "\ufaff")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_message_tokens(message: BaseMessage) -> int:
+    """估算单条消息的 token 数，有 id 的消息按 (id, 内容长度) 缓存"""
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    key = (message.id, len(content)) if message.id else None
+    if key is not None and key in _token_cache:
+        _token_cache.move_to_end(key)
+        return _token_cache[key]
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_text_tokens(content)
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        tokens += estimate_text_tokens(str(tool_calls))
+    if key is not None:
+        _token_cache[key] = tokens
+        if len(_token_cache) > _TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return tokens
+
+
+def unsummarized_messages(messages: Sequence[BaseMessage], summarized_until: Optional[str]) -> List[BaseMessage]:
+    """返回 summarized_until（已折叠进摘要的最后一条消息 id）之后的消息"""
+    if summarized_until:
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == summarized_until:
+                return list(messages[i + 1:])
+    return list(messages)
+
+
+def split_for_budget(messages: Sequence[BaseMessage], budget: int) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """按预算把消息分为 (需要折叠的较早消息, 保留的最近消息)
+
+    未超出预算时不折叠；超出时保留的消息压到 budget * COMPACT_TARGET_RATIO 以内，
+    且至少保留最后一条消息。保留部分不会以 ToolMessage 开头，避免工具结果与其调用分离。
+    """
+    total = sum(estimate_message_tokens(m) for m in messages)
+    if total <= budget:
+        return [], list(messages)
+
+    target = budget * COMPACT_TARGET_RATIO
+    kept_tokens = 0
+    cut = len(messages)
+    while cut > 0:
+        tokens = estimate_message_tokens(messages[cut - 1])
+        if cut < len(messages) and kept_tokens + tokens > target:
+            break
+        kept_tokens += tokens
+        cut -= 1
+    while cut < len(messages) - 1 and isinstance(messages[cut], ToolMessage):
+        cut += 1
+    return list(messages[:cut]), list(messages[cut:])
@@ -0,0 +1,23 @@
+"""
+State 字段的合并函数
+
+并行分支在同一个 superstep 中写入同一个字段时，LangGraph 使用字段上声明的 reducer
+合并各分支的更新；没有 reducer 的字段被多个分支同时写入会报 InvalidUpdateError。
+"""
+from typing import Annotated, Any, Dict, Optional, Union
+
+# 写入该值时清空字段；字段保存在 checkpoint 中，续聊时需要在每次扇出前清空上一轮的结果
+# （与 langgraph 的 REMOVE_ALL_MESSAGES 一样使用字符串，写入可以正常序列化）
+CLEAR = "__clear__"
+
+
+def merge_dicts(left: Optional[Dict[str, Any]], right: Union[Dict[str, Any], str, None]) -> Dict[str, Any]:
+    """按 key 合并，同名 key 以后写入的为准；right 为 CLEAR 时清空"""
+    if right == CLEAR:
+        return {}
+    return {**(left or {}), **(right or {})}
+
+
+# 每个分支以自己的节点名为 key 写入结果 / 错误
+BranchResults = Annotated[Dict[str, Any], merge_dicts]
+BranchErrors = Annotated[Dict[str, str], merge_dicts]
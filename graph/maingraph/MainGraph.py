@@ -2,7 +2,7 @@ from graph.base.base_builder import GraphBuilder
 from typing import Optional, Dict
 from schema.graph.graph import State
 from langgraph.graph import START, END
-from graph.maingraph.TriageNode import triage_node
+from graph.maingraph.TriageNode import TriageNode
 class MainGraphBuilder(GraphBuilder):
 
     def __init__(self, config:Optional[Dict] = None):
@@ -10,8 +10,10 @@ class MainGraphBuilder(GraphBuilder):
         self._setup_nodes()
         self._setup_edges()
 
-    async def build_graph(self, recursion_limit: Optional[int] = None):
-        checkpointer = await self.setup_checkpointer()
+    async def build_graph(self, recursion_limit: Optional[int] = None, checkpointer=None):
+        # 未传入共享的 checkpointer 时单独创建（会新建一个连接池）
+        if checkpointer is None:
+            checkpointer = await self.setup_checkpointer()
         graph = self.builder.compile(checkpointer=checkpointer)
         if recursion_limit:
             graph.config = graph.config or {}
@@ -22,7 +24,9 @@ class MainGraphBuilder(GraphBuilder):
     # -------inner method--------
 
     def _setup_nodes(self):
-        self.builder.add_node("triage", triage_node)
+        # 节点实例（及其 LLM 客户端）在构建图时创建，图由 GraphRegistry 在应用启动时构建，
+        # 导入模块本身不会创建客户端或检查模型相关的环境变量
+        self.builder.add_node("triage", TriageNode())
 
     def _setup_edges(self):
         self.builder.add_edge(START, "triage")
@@ -10,28 +10,27 @@ from langgraph.graph import END
 logger = logging.getLogger(__name__)
 
 class TriageNode(BaseNode):
+    system_prompt = "你是一个乐于助人的智能助手，请用与用户相同的语言简洁、准确地回答问题。"
+
     def __init__(self):
         super().__init__()
 
     async def __call__(self, state: State, config: RunnableConfig) -> Command:
         # 使用异步流式调用，让 LangGraph 的 astream_events 能够实时捕获流式事件
-        messages = state.get("messages", [])
-        if messages:
-            # 使用 ainvoke 异步调用，不会阻塞流式事件
-            response = await self.gemini_2.ainvoke(messages)
-            logger.info(f"Triage response: {response.content}")
-        return Command(goto=END)
-
-_triage_node_instance = TriageNode()
-
-async def triage_node(state: State, config: RunnableConfig) -> Command:
-    return await _triage_node_instance(state, config)
+        if not state.get("messages"):
+            return Command(goto=END)
+        # 系统提示词 + 历史摘要 + 最近的消息；超出 token 预算时较早的历史折叠为摘要
+        messages, history_update = await self.build_prompt(state)
+        response = await self.stream_llm(messages, config)
+        logger.info(f"Triage response: {response.content}")
+        # 将完整回复写回 State.messages，供后续轮次从 checkpoint 中读取
+        return Command(goto=END, update={"messages": [response], **history_update})
 
 if __name__ == "__main__":
     async def main():
         state = State()
         config = RunnableConfig()
-        result = await triage_node(state, config)
+        result = await TriageNode()(state, config)
         return result
     
     asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+并行分支示例图
+
+classify / retrieve / safety_check 三个互不依赖的步骤从 START 并行扇出，
+各自把结果写入 branch_results，由 respond 汇合；每次扇出前清空上一轮的 branch_results / branch_errors。节点用 asyncio.sleep 模拟模型和检索的 I/O 延迟，
+parallel=False 时按顺序串联同样的节点，用于对比（见 benchmarks/bench_parallel_graph.py）。
+"""
+import asyncio
+from typing import Dict, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import START
+from typing_extensions import NotRequired
+
+from graph.base.base_builder import GraphBuilder
+from graph.base.reducers import BranchErrors, BranchResults
+from schema.graph.graph import State
+
+# 各步骤模拟的耗时（秒）
+DEFAULT_LATENCIES = {"classify": 0.3, "retrieve": 0.5, "safety_check": 0.2}
+
+
+class ParallelState(State):
+    branch_results: NotRequired[BranchResults]
+    branch_errors: NotRequired[BranchErrors]
+
+
+def _last_user_text(state: ParallelState) -> str:
+    messages = state.get("messages", [])
+    return messages[-1].content if messages else ""
+
+
+class ParallelGraphBuilder(GraphBuilder):
+
+    def __init__(
+        self,
+        parallel: bool = True,
+        latencies: Optional[Dict[str, float]] = None,
+        timeout: Optional[float] = None,
+        config: Optional[Dict] = None,
+    ):
+        super().__init__(ParallelState, config)
+        self.latencies = {**DEFAULT_LATENCIES, **(latencies or {})}
+        self._setup_graph(parallel, timeout)
+
+    def compile(self, checkpointer=None):
+        return self.builder.compile(checkpointer=checkpointer)
+
+    # -------inner method--------
+
+    def _setup_graph(self, parallel: bool, timeout: Optional[float]):
+        branches = {
+            "classify": self._classify,
+            "retrieve": self._retrieve,
+            "safety_check": self._safety_check,
+        }
+        self.add_node("respond", self._respond)
+        if parallel:
+            self.add_parallel_branches(START, branches, join="respond", timeout=timeout)
+        else:
+            for name, node_func in branches.items():
+                self.add_node(name, node_func)
+            self.set_entry_point("classify")
+            self.add_edge("classify", "retrieve")
+            self.add_edge("retrieve", "safety_check")
+            self.add_edge("safety_check", "respond")
+        self.add_termination_edges(["respond"])
+
+    async def _classify(self, state: ParallelState, config: RunnableConfig):
+        await asyncio.sleep(self.latencies["classify"])
+        text = _last_user_text(state)
+        intent = "question" if text.rstrip().endswith(("?", "？")) else "chat"
+        return {"branch_results": {"classify": intent}}
+
+    async def _retrieve(self, state: ParallelState, config: RunnableConfig):
+        await asyncio.sleep(self.latencies["retrieve"])
+        return {"branch_results": {"retrieve": [f"doc about {_last_user_text(state)[:20]}"]}}
+
+    async def _safety_check(self, state: ParallelState, config: RunnableConfig):
+        await asyncio.sleep(self.latencies["safety_check"])
+        return {"branch_results": {"safety_check": "ok"}}
+
+    async def _respond(self, state: ParallelState, config: RunnableConfig):
+        results = state.get("branch_results", {})
+        errors = state.get("branch_errors", {})
+        content = f"intent={results.get('classify')}, docs={len(results.get('retrieve') or [])}, safety={results.get('safety_check')}"
+        if errors:
+            content += f", errors={errors}"
+        return {"messages": [AIMessage(content=content)]}
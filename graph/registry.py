@@ -0,0 +1,99 @@
+"""
+图注册表
+
+每个命名的图只编译一次，所有图共用同一个 checkpointer 和连接池。
+注册时 eager=True 的图在启动时编译，其他图在第一次被请求时才编译，
+一个 worker 可以托管多个图而不会成倍增加连接池和启动时间。
+"""
+import asyncio
+import inspect
+import logging
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Union
+
+from langgraph.graph.state import CompiledStateGraph
+
+from utils.startup_timing import startup_timer
+
+if TYPE_CHECKING:
+    from db.pg.pg_checkpointer import AsyncCompatiblePostgresSaver
+
+logger = logging.getLogger(__name__)
+
+# 接收共享的 checkpointer，返回编译好的图
+GraphFactory = Callable[["AsyncCompatiblePostgresSaver"], Union[CompiledStateGraph, Awaitable[CompiledStateGraph]]]
+
+
+class GraphRegistry:
+    """按名称管理编译好的图"""
+
+    def __init__(self, default: str):
+        self.default = default
+        self.checkpointer: Optional["AsyncCompatiblePostgresSaver"] = None
+        self._factories: Dict[str, GraphFactory] = {}
+        self._eager: List[str] = []
+        self._graphs: Dict[str, CompiledStateGraph] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def register(self, name: str, factory: GraphFactory, eager: bool = False) -> None:
+        self._factories[name] = factory
+        if eager:
+            self._eager.append(name)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    @property
+    def compiled(self) -> List[str]:
+        return list(self._graphs)
+
+    async def setup(self) -> None:
+        """创建共享的 checkpointer，并编译 eager 的图"""
+        if self.checkpointer is None:
+            # 连接池、checkpointer 及其依赖（psycopg 等）在启动时才导入
+            from graph.base.base_builder import GraphBuilder
+            with startup_timer.phase("checkpointer"):
+                self.checkpointer = await GraphBuilder.setup_checkpointer()
+        for name in self._eager:
+            with startup_timer.phase(f"compile_graph:{name}"):
+                await self.get(name)
+
+    async def get(self, name: Optional[str] = None) -> CompiledStateGraph:
+        """获取编译好的图，name 为空时返回默认图；未注册的名称抛出 KeyError"""
+        name = name or self.default
+        graph = self._graphs.get(name)
+        if graph is not None:
+            return graph
+        if name not in self._factories:
+            raise KeyError(f"Unknown graph: {name}")
+        # 同一个图的并发首次请求只编译一次
+        async with self._locks.setdefault(name, asyncio.Lock()):
+            if name not in self._graphs:
+                graph = self._factories[name](self.checkpointer)
+                if inspect.isawaitable(graph):
+                    graph = await graph
+                self._graphs[name] = graph
+                logger.info(f"Compiled graph: {name}")
+        return self._graphs[name]
+
+    async def aclose(self) -> None:
+        """提交 write-behind 缓冲中尚未落库的 checkpoint，并关闭连接池"""
+        if self.checkpointer is not None:
+            await self.checkpointer.aclose()
+            self.checkpointer = None
+        self._graphs.clear()
+
+
+async def _build_main_graph(checkpointer: "AsyncCompatiblePostgresSaver") -> CompiledStateGraph:
+    from graph.maingraph.MainGraph import MainGraphBuilder
+    return await MainGraphBuilder().build_graph(checkpointer=checkpointer)
+
+
+def _build_parallel_graph(checkpointer: "AsyncCompatiblePostgresSaver") -> CompiledStateGraph:
+    from graph.parallelgraph.ParallelGraph import ParallelGraphBuilder
+    return ParallelGraphBuilder().compile(checkpointer=checkpointer)
+
+
+graph_registry = GraphRegistry(default="main")
+graph_registry.register("main", _build_main_graph, eager=True)
+graph_registry.register("parallel", _build_parallel_graph)
@@ -1,20 +1,73 @@
 """
 FastAPI应用主入口文件
 """
+# 最先导入，作为启动耗时统计中导入阶段的起点
+from utils.startup_timing import startup_timer
+import asyncio
+import sys
 from contextlib import asynccontextmanager
+from datetime import timedelta
 from fastapi import FastAPI
 from app.api import router
-from graph.maingraph.MainGraph import MainGraphBuilder
+from graph.registry import graph_registry
+from db.pg.retention import RetentionEngine, RetentionPolicy, RetentionWorker
+from utils.llm_cache import llm_response_cache
+from utils.LLMSelector import llm_selector
+from config.env import (
+    CHECKPOINT_RETENTION_KEEP_LAST,
+    CHECKPOINT_RETENTION_MAX_IDLE_HOURS,
+    CHECKPOINT_RETENTION_INTERVAL,
+    CHECKPOINT_RETENTION_BATCH_SIZE,
+    LLM_CACHE_PERSIST,
+)
+
+# Windows事件循环策略设置 - 解决psycopg兼容性问题；checkpointer 模块改为在启动时才导入，需要在这里提前设置
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时执行
-    main_graph_builder = MainGraphBuilder()
-    app.state.graph = await main_graph_builder.build_graph()
+    # 创建所有图共用的 checkpointer，编译默认图；其他图在第一次请求时编译
+    # 节点实例和 LLM 客户端在编译图时创建，而不是在导入模块时
+    await graph_registry.setup()
+    app.state.graph_registry = graph_registry
+    app.state.graph = await graph_registry.get()
+    checkpointer = graph_registry.checkpointer
+
+    # LLM 响应缓存的 PostgreSQL 层复用 checkpointer 连接池，llm_cache 表由 checkpointer 迁移创建
+    if llm_response_cache is not None and LLM_CACHE_PERSIST:
+        llm_response_cache.attach_pool(checkpointer.pool)
+    # 语义缓存层的 embedding 模型在启动时加载，而不是在导入模块时或首个请求中
+    if llm_response_cache is not None and llm_response_cache.semantic is not None:
+        with startup_timer.phase("llm_cache_embeddings"):
+            await llm_response_cache.semantic.load()
+
+    # checkpoint 保留策略后台任务
+    retention_policy = RetentionPolicy(
+        keep_last=CHECKPOINT_RETENTION_KEEP_LAST or None,
+        max_idle=timedelta(hours=CHECKPOINT_RETENTION_MAX_IDLE_HOURS) if CHECKPOINT_RETENTION_MAX_IDLE_HOURS else None,
+        batch_size=CHECKPOINT_RETENTION_BATCH_SIZE,
+    )
+    app.state.retention_worker = None
+    if retention_policy.enabled:
+        with startup_timer.phase("retention_worker"):
+            app.state.retention_worker = RetentionWorker(
+                RetentionEngine(checkpointer.pool, retention_policy),
+                interval=CHECKPOINT_RETENTION_INTERVAL,
+            )
+            app.state.retention_worker.start()
+    startup_timer.ready()
     yield
-    # 关闭时执行（如果需要清理资源，在这里添加）
+    # 关闭时执行
+    if app.state.retention_worker is not None:
+        await app.state.retention_worker.stop()
+    # 提交 write-behind 缓冲中尚未落库的 checkpoint，并关闭连接池
+    await graph_registry.aclose()
+    # 关闭模型共用的 HTTP 客户端
+    await llm_selector.aclose()
 
 
 app = FastAPI(
@@ -26,6 +79,7 @@ app = FastAPI(
 
 # 注册路由
 app.include_router(router, prefix="/api/v1")
+startup_timer.mark("import")
 
 
 @app.get("/")
@@ -38,4 +92,3 @@ async def root():
 async def health_check():
     """健康检查端点"""
     return {"status": "healthy"}
-
@@ -1,4 +1,7 @@
+from typing_extensions import NotRequired
 from langgraph.prebuilt.chat_agent_executor import AgentState
 
 class State(AgentState):
-    pass
\ No newline at end of file
+    # 滚动摘要：较早的对话折叠为一段摘要，summarized_until 为已折叠的最后一条消息 id
+    summary: NotRequired[str]
+    summarized_until: NotRequired[str]
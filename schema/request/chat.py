@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Literal, Optional
+
+from config.env import CHAT_BATCH_MAX_REQUESTS
 
 class ChatMessage(BaseModel):
     role: str = Field(..., description="The role of the message sender(user or ...)")
@@ -7,4 +9,62 @@ class ChatMessage(BaseModel):
 
 
 class ChatRequest(BaseModel):
-    messages: List[ChatMessage]
\ No newline at end of file
+    messages: List[ChatMessage] = Field(
+        ...,
+        description="本轮的新消息；携带 thread_id 续聊时只需发送新消息，历史从 checkpoint 中恢复",
+    )
+    thread_id: Optional[str] = Field(
+        None,
+        description="会话 ID，为空时创建新会话；服务端会在 thread 事件中返回该 ID",
+    )
+    graph: Optional[str] = Field(
+        None,
+        description="使用的图名称，为空时使用默认图；同一个 thread_id 应始终使用同一个图",
+    )
+    stream_mode: Literal["full", "compact"] = Field(
+        "full",
+        description="full 发送完整事件数据；compact 的 token 事件只发送 {id, d} 增量，其他事件不变",
+    )
+    include_types: Optional[List[str]] = Field(
+        None,
+        description="只推送这些运行类型的事件（chat_model / chain / tool 等），下推到 astream_events",
+    )
+    exclude_types: Optional[List[str]] = Field(None, description="不推送这些运行类型的事件")
+    include_names: Optional[List[str]] = Field(
+        None,
+        description=(
+            "只推送这些运行名称（如 ChatOpenAI、节点自身的运行）的事件，下推到 astream_events；"
+            "只匹配运行本身，不包含其子运行，按节点过滤请使用 include_nodes"
+        ),
+    )
+    exclude_names: Optional[List[str]] = Field(None, description="不推送这些运行名称的事件")
+    include_nodes: Optional[List[str]] = Field(
+        None,
+        description="只推送这些图节点内产生的事件（包括节点内模型的 token），按事件的 langgraph_node 元数据匹配",
+    )
+    exclude_nodes: Optional[List[str]] = Field(None, description="不推送这些图节点内产生的事件")
+    projection: Literal["tokens", "summary", "full"] = Field(
+        "full",
+        description="tokens 只推送模型 token；summary 只推送模型 token、输出中含消息的结束事件（只保留消息）和自定义事件；full 推送完整事件数据",
+    )
+    coalesce_ms: Optional[int] = Field(
+        None,
+        ge=0,
+        description="token 合并发送的间隔（毫秒），0 表示每个 chunk 单独成帧；为空时使用服务端默认值",
+    )
+    coalesce_max_chars: Optional[int] = Field(
+        None,
+        ge=1,
+        description="合并中的 token 累计达到该字符数时立即发送；为空时使用服务端默认值",
+    )
+
+
+class ChatBatchRequest(BaseModel):
+    requests: List[ChatRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=CHAT_BATCH_MAX_REQUESTS,
+        description="要执行的对话，每个对话独立运行，只返回最终输出",
+    )
+    concurrency: Optional[int] = Field(None, ge=1, description="同时运行的对话数量，为空时使用服务端默认值")
+    stream: bool = Field(False, description="为 true 时以 NDJSON 按完成顺序逐行返回结果")
@@ -0,0 +1,162 @@
+"""
+对话运行的准入控制
+
+限制同时运行的 workflow 数量（全局和每个客户端），避免流量突增时同时耗尽
+PostgreSQL 连接池和上游 LLM 的限流额度。超过限制的请求进入一个短等待队列，
+队列已满或等待超时时立即拒绝，由接口层返回 429 和 Retry-After。
+
+准入名额在 workflow 任务结束时释放，释放时直接把名额交给队列中最早的可运行请求，
+新到达的请求不会插队。
+"""
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Optional
+
+from fastapi import Request
+
+from config.env import (
+    CHAT_MAX_CONCURRENT_RUNS,
+    CHAT_MAX_RUNS_PER_CLIENT,
+    CHAT_ADMISSION_QUEUE_SIZE,
+    CHAT_ADMISSION_QUEUE_TIMEOUT,
+    CHAT_ADMISSION_RETRY_AFTER,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """请求未获准运行"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """全局并发上限 + 每客户端配额 + 有界等待队列"""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        per_client_limit: int = 0,
+        max_queue_size: int = 0,
+        queue_timeout: float = 5.0,
+        retry_after: int = 1,
+    ):
+        """
+        Args:
+            max_concurrency: 同时运行的最大数量，0 表示不限制。
+            per_client_limit: 每个客户端同时运行的最大数量，0 表示不限制。
+            max_queue_size: 等待队列长度，0 表示超过限制时直接拒绝。
+            queue_timeout: 在队列中最多等待的时间（秒）。
+            retry_after: 拒绝时建议客户端重试的间隔（秒）。
+        """
+        self.max_concurrency = max_concurrency
+        self.per_client_limit = per_client_limit
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._per_client: Counter = Counter()
+        self._waiters: deque[tuple[str, asyncio.Future]] = deque()
+        self.admitted = 0
+        self.rejected = 0
+
+    def _can_admit(self, client_id: str) -> bool:
+        if self.max_concurrency and self._in_flight >= self.max_concurrency:
+            return False
+        if self.per_client_limit and self._per_client[client_id] >= self.per_client_limit:
+            return False
+        return True
+
+    def _admit(self, client_id: str) -> None:
+        self._in_flight += 1
+        self._per_client[client_id] += 1
+        self.admitted += 1
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected += 1
+        logger.warning(f"Chat run rejected: {reason}")
+        return AdmissionRejected(reason, self.retry_after)
+
+    async def acquire(self, client_id: str) -> None:
+        """获取一个运行名额，无法在等待时间内获得时抛出 AdmissionRejected"""
+        if self._can_admit(client_id):
+            self._admit(client_id)
+            return
+        if len(self._waiters) >= self.max_queue_size:
+            raise self._reject("admission queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (client_id, future)
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # 超时的同时名额已经转交给本请求，按已准入处理，否则名额会泄漏
+                return
+            self._discard(waiter)
+            raise self._reject("timed out waiting for admission") from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已经转交给本请求，但调用方被取消，归还名额
+                self.release(client_id)
+            else:
+                self._discard(waiter)
+            raise
+
+    def _discard(self, waiter: tuple[str, asyncio.Future]) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, client_id: str) -> None:
+        """归还名额，并按先后顺序唤醒队列中可以运行的请求"""
+        self._in_flight -= 1
+        self._per_client[client_id] -= 1
+        if self._per_client[client_id] <= 0:
+            del self._per_client[client_id]
+        for waiter in list(self._waiters):
+            waiting_client, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+                continue
+            if self._can_admit(waiting_client):
+                self._waiters.remove(waiter)
+                self._admit(waiting_client)
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "per_client_limit": self.per_client_limit,
+            "max_queue_size": self.max_queue_size,
+            "clients": dict(self._per_client),
+        }
+
+
+def get_client_id(request: Optional[Request]) -> str:
+    """客户端标识：优先使用 X-Client-ID 请求头，否则使用客户端地址"""
+    if request is None:
+        return "anonymous"
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
+admission_controller = AdmissionController(
+    max_concurrency=CHAT_MAX_CONCURRENT_RUNS,
+    per_client_limit=CHAT_MAX_RUNS_PER_CLIENT,
+    max_queue_size=CHAT_ADMISSION_QUEUE_SIZE,
+    queue_timeout=CHAT_ADMISSION_QUEUE_TIMEOUT,
+    retry_after=CHAT_ADMISSION_RETRY_AFTER,
+)
@@ -1,32 +1,130 @@
 import asyncio
 import uuid
-from typing import Any, List, AsyncIterator
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, AsyncIterator, Optional
 
+from fastapi import Request
 from fastapi.exceptions import HTTPException
-from schema.request.chat import ChatRequest
+from fastapi.responses import StreamingResponse
+from schema.request.chat import ChatBatchRequest, ChatRequest
 from langgraph.graph.state import CompiledStateGraph
-from langgraph.types import Command
+from graph.registry import GraphRegistry
 from langchain_core.messages.human import HumanMessage
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langgraph.types import Command
 from sse_starlette.sse import EventSourceResponse
 
-import json
 import logging
 
+from config.env import (
+    CHAT_EVENT_QUEUE_MAXSIZE,
+    CHAT_DISCONNECT_POLL_INTERVAL,
+    CHAT_COALESCE_INTERVAL_MS,
+    CHAT_COALESCE_MAX_CHARS,
+    CHAT_BATCH_CONCURRENCY,
+    CHAT_BATCH_MAX_CONCURRENCY,
+)
+from service.chat.admission import AdmissionRejected, admission_controller, get_client_id
+from service.chat.serialization import (
+    EVENT_ENCODERS,
+    dumps,
+    encode_compact_chunk,
+    encode_event_data,
+    serialize_message,
+)
+
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ChatMetrics:
+    """进程内的对话运行统计"""
+    runs_started: int = 0
+    runs_completed: int = 0
+    runs_failed: int = 0
+    runs_cancelled: int = 0
+    chunks_coalesced: int = 0
+    chunks_batched: int = 0
+    frames_sent: int = 0
+
+
+chat_metrics = ChatMetrics()
+
+
+class WorkflowRun:
+    """一次流式对话运行：持有准入名额，workflow 任务由 event_generator 开始消费时启动
+
+    名额在 workflow 任务结束时归还；任务从未启动（客户端在响应体开始迭代前就断开）时，
+    由响应关闭时的 close() 归还，保证每个名额只归还一次。
+    """
+
+    def __init__(self, client_id: str, workflow: Callable[[], Awaitable[None]]):
+        self.client_id = client_id
+        self._workflow = workflow
+        self.task: Optional[asyncio.Task] = None
+        self._released = False
+
+    def start(self) -> asyncio.Task:
+        if self.task is None:
+            self.task = asyncio.create_task(self._workflow())
+            # workflow 结束（完成、失败或被取消）时归还名额
+            self.task.add_done_callback(lambda _: self.release())
+        return self.task
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            admission_controller.release(self.client_id)
+
+    def close(self) -> None:
+        """响应结束：取消仍在运行的 workflow，未启动时直接归还名额"""
+        if self.task is None:
+            self.release()
+        elif not self.task.done():
+            self.task.cancel()
+
+
+class ChatEventSourceResponse(EventSourceResponse):
+    """响应结束（包括客户端在响应体开始迭代前断开）时关闭对话运行"""
+
+    def __init__(self, *args, run: WorkflowRun, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.run = run
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.run.close()
+
+
 class ChatService:
 
-    async def chat(self, req: ChatRequest, graph: CompiledStateGraph) -> Any:
+    async def chat(self, req: ChatRequest, graph: CompiledStateGraph, request: Optional[Request] = None) -> Any:
+        # 准入控制：超过并发上限时短暂排队，队列已满或等待超时返回 429
+        client_id = get_client_id(request)
+        try:
+            await admission_controller.acquire(client_id)
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+        run = None
         try:
-            # 生成唯一的 thread_id 用于 checkpointer
-            thread_id = str(uuid.uuid4())
+            # 续聊时沿用客户端传入的 thread_id，从最新 checkpoint 恢复历史；否则创建新会话
+            thread_id = req.thread_id or str(uuid.uuid4())
             
             messages = []
-            user_message_events = []
-            event_index = 0
-            event_queue = asyncio.Queue()
+            # 首个事件返回 thread_id，客户端后续轮次携带它即可只发送新消息
+            user_message_events = [
+                {
+                    "event": "thread",
+                    "index": 0,
+                    "data": {"thread_id": thread_id, "resumed": req.thread_id is not None}
+                }
+            ]
+            event_index = 1
+            # 有界队列：达到上限后 token chunk 会被合并，其他事件等待消费，从而对 graph 形成背压
+            event_queue = asyncio.Queue(maxsize=CHAT_EVENT_QUEUE_MAXSIZE)
             workflow_done = asyncio.Event()  # 用于标记 workflow 完成，避免 event_generator 无限等待
 
             for message in req.messages:
@@ -46,22 +144,38 @@ class ChatService:
                 )
                 event_index += 1
         
-            # 在后台任务中运行 workflow，同时立即返回 SSE 响应
-            _task = asyncio.create_task(self.workflow(
+            # workflow 在 event_generator 开始消费时才作为后台任务启动，由生成器负责取消；
+            # 否则客户端在响应体迭代前断开时，生产者会永远阻塞在有界队列上并占住名额
+            run = WorkflowRun(client_id, lambda: self.workflow(
                 graph=graph, 
                 thread_id=thread_id,
                 event_index=event_index, 
                 messages=messages, 
                 user_message_event=user_message_events, 
                 event_queue=event_queue,
-                workflow_done=workflow_done
+                workflow_done=workflow_done,
+                event_filters=self._event_filters(req),
+                projection=req.projection
             ))
-            return EventSourceResponse(
-                self.event_generator(event_queue, workflow_done), 
+            return ChatEventSourceResponse(
+                self.event_generator(
+                    event_queue,
+                    workflow_done,
+                    run.start,
+                    request,
+                    stream_mode=req.stream_mode,
+                    coalesce_ms=CHAT_COALESCE_INTERVAL_MS if req.coalesce_ms is None else req.coalesce_ms,
+                    coalesce_max_chars=req.coalesce_max_chars or CHAT_COALESCE_MAX_CHARS,
+                ),
                 media_type="text/event-stream", 
-                sep="\n"
+                sep="\n",
+                run=run,
             )
         except Exception as e:
+            if run is None:
+                admission_controller.release(client_id)
+            else:
+                run.close()
             raise HTTPException(status_code=500, detail=str(e))
 
     async def workflow(
@@ -72,8 +186,11 @@ class ChatService:
         messages: List,
         user_message_event: List,
         event_queue: asyncio.Queue,
-        workflow_done: asyncio.Event
+        workflow_done: asyncio.Event,
+        event_filters: Optional[dict] = None,
+        projection: str = "full"
         ):
+        chat_metrics.runs_started += 1
         try:
             # 先发送用户消息事件，确保客户端能立即看到用户输入
             for event in user_message_event:
@@ -81,10 +198,33 @@ class ChatService:
                 logger.debug(f"Put user message event: {event.get('event')}")
             
             event_count = 0
-            async for event in self.run_agent(graph, thread_id=thread_id, user_input_mesages=messages):
-                await event_queue.put(event)
+            pending_chunk = None  # 队列已满时暂存并合并的 token chunk 事件
+            async for event in self.run_agent(
+                graph,
+                thread_id=thread_id,
+                user_input_mesages=messages,
+                event_filters=event_filters,
+                projection=projection
+            ):
                 event_count += 1
                 logger.debug(f"Put agent event {event_count}: {event.get('event', 'unknown')}")
+                if event.get("kind") == "on_chat_model_stream":
+                    if pending_chunk is not None and self._merge_chunk_event(pending_chunk, event):
+                        chat_metrics.chunks_coalesced += 1
+                    else:
+                        if pending_chunk is not None:
+                            await event_queue.put(pending_chunk)
+                        pending_chunk = event
+                    if not event_queue.full():
+                        event_queue.put_nowait(pending_chunk)
+                        pending_chunk = None
+                    continue
+                if pending_chunk is not None:
+                    await event_queue.put(pending_chunk)
+                    pending_chunk = None
+                await event_queue.put(event)
+            if pending_chunk is not None:
+                await event_queue.put(pending_chunk)
             
             # 发送完成事件
             await event_queue.put({
@@ -92,53 +232,108 @@ class ChatService:
                 "event": "completed",
                 "data": {"message": "Stream completed", "event_count": event_count}
             })
+            chat_metrics.runs_completed += 1
             logger.info(f"Workflow completed, total events: {event_count}")
-            # 发送 None 作为结束信号，参考其他项目的实现
-            await event_queue.put(None)
+        except asyncio.CancelledError:
+            chat_metrics.runs_cancelled += 1
+            logger.info(f"Workflow cancelled, thread_id: {thread_id}")
+            raise
         except Exception as e:
+            chat_metrics.runs_failed += 1
             logger.error(f"Workflow error: {e}", exc_info=True)
             await event_queue.put({
                 "kind": "end",
                 "event": "error",
                 "data": str(e)
             })
-            # 发送 None 作为结束信号
-            await event_queue.put(None)
         finally:
             # 标记 workflow 完成，通知 event_generator 可以安全退出
             workflow_done.set()
-            # 确保发送 None 作为结束信号（防止异常情况下没有发送）
+            # 发送 None 作为结束信号；队列已满说明消费方仍在读取，之后会读到 end 事件
             try:
-                await event_queue.put(None)
-            except:
+                event_queue.put_nowait(None)
+            except asyncio.QueueFull:
                 pass
 
+    def _merge_chunk_event(self, target: dict, event: dict) -> bool:
+        """将同一次模型调用的 token chunk 合并到 target 中，无法合并时返回 False"""
+        target_chunk = (target.get("data") or {}).get("chunk")
+        chunk = (event.get("data") or {}).get("chunk")
+        if not isinstance(target_chunk, dict) or not isinstance(chunk, dict):
+            return False
+        if target_chunk.get("id") != chunk.get("id"):
+            return False
+        if not isinstance(target_chunk.get("content"), str) or not isinstance(chunk.get("content"), str):
+            return False
+        target_chunk["content"] += chunk["content"]
+        return True
+
+    def _event_filters(self, req: ChatRequest) -> dict:
+        """把请求中的事件过滤条件转换为 astream_events 的参数，被过滤的运行不会生成事件
+
+        astream_events 的 names 只匹配运行名称本身，节点内模型的运行名称是 ChatOpenAI 等，
+        因此节点过滤（include_nodes / exclude_nodes）不下推，由 run_agent 按 langgraph_node 元数据过滤。
+        """
+        filters = {
+            "include_types": req.include_types,
+            "exclude_types": req.exclude_types,
+            "include_names": req.include_names,
+            "exclude_names": req.exclude_names,
+            "include_nodes": req.include_nodes,
+            "exclude_nodes": req.exclude_nodes,
+        }
+        # tokens 投影只需要模型事件，未指定 include 条件时默认只订阅 chat_model
+        if req.projection == "tokens" and req.include_types is None and req.include_names is None:
+            filters["include_types"] = ["chat_model"]
+        return {key: value for key, value in filters.items() if value is not None}
+
+    def _graph_input(self, user_input_mesages: List) -> dict:
+        """按角色构造消息；同一段对话每次都生成相同的消息，保证请求前缀稳定"""
+        input_messages = []
+        for message in user_input_mesages:
+            role = message.get("role", "user")
+            content = message.get("content", "")
+            if role in ("assistant", "ai"):
+                input_messages.append(AIMessage(content=content))
+            elif role == "system":
+                input_messages.append(SystemMessage(content=content))
+            else:
+                input_messages.append(HumanMessage(content=content, name="user_query"))
+        return {"messages": input_messages}
+
+    def _graph_config(self, thread_id: str) -> dict:
+        # 配置 checkpointer，用于持久化对话状态
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": ""
+            }
+        }
+
     async def run_agent(
         self,
         graph: CompiledStateGraph,
         thread_id: str,
-        user_input_mesages: List
+        user_input_mesages: List,
+        event_filters: Optional[dict] = None,
+        projection: str = "full"
         ) -> AsyncIterator[dict]:
+        event_filters = dict(event_filters or {})
+        include_nodes = event_filters.pop("include_nodes", None)
+        exclude_nodes = event_filters.pop("exclude_nodes", None)
         try:
-            human_messages = []
-            for message in user_input_mesages:
-                human_messages.append(HumanMessage(content=message.get("content", ""), name="user_query"))
-
-            # 配置 checkpointer，用于持久化对话状态
-            config = {
-                "configurable": {
-                    "thread_id": thread_id,
-                    "checkpoint_ns": ""
-                }
-            }
-
             async for event in graph.astream_events(
-                {"messages": human_messages},
+                self._graph_input(user_input_mesages),
                 version="v2",
-                config=config
+                config=self._graph_config(thread_id),
+                **event_filters
             ):
+                if (include_nodes is not None or exclude_nodes is not None) and not self._node_matches(
+                    event, include_nodes, exclude_nodes
+                ):
+                    continue
                 try:
-                    async for handler_result in self.event_handler(event):
+                    async for handler_result in self.event_handler(event, projection):
                         yield handler_result
                 except Exception as e:
                     logger.error(f"Event handler error: {e}", exc_info=True)
@@ -157,87 +352,78 @@ class ChatService:
                 "data": str(e)
             }
     
-    def _serialize_message(self, msg: Any) -> dict:
-        """将消息对象序列化为可 JSON 序列化的字典"""
-        if isinstance(msg, BaseMessage):
-            return {
-                "type": msg.__class__.__name__,
-                "content": msg.content,
-                "name": getattr(msg, "name", None),
-                "id": getattr(msg, "id", None),
-            }
-        elif isinstance(msg, dict):
-            return msg
-        elif hasattr(msg, "__dict__"):
-            return str(msg)
-        else:
-            return {"value": str(msg)}
-    
-    def _serialize_command(self, cmd: Command) -> dict:
-        """将 Command 对象序列化为可 JSON 序列化的字典"""
-        result = {
-            "type": "Command",
-        }
-        if hasattr(cmd, "goto"):
-            goto_value = getattr(cmd, "goto", None)
-            result["goto"] = str(goto_value) if goto_value is not None else None
-        if hasattr(cmd, "update"):
-            update_value = getattr(cmd, "update", None)
-            result["update"] = self._serialize_data(update_value) if update_value is not None else None
-        if hasattr(cmd, "skip"):
-            skip_value = getattr(cmd, "skip", None)
-            result["skip"] = skip_value if skip_value is not None else None
-        if hasattr(cmd, "__dict__"):
-            for key, value in cmd.__dict__.items():
-                if key not in result:
-                    result[key] = self._serialize_data(value)
-        return result
-    
-    def _serialize_data(self, data: Any) -> Any:
-        """递归序列化数据，处理消息对象和 Command 对象"""
-        if isinstance(data, BaseMessage):
-            return self._serialize_message(data)
-        elif isinstance(data, Command):
-            return self._serialize_command(data)
-        elif isinstance(data, list):
-            return [self._serialize_data(item) for item in data]
-        elif isinstance(data, dict):
-            return {k: self._serialize_data(v) for k, v in data.items()}
-        else:
-            return data
+    def _node_matches(self, event: dict, include_nodes: Optional[List[str]], exclude_nodes: Optional[List[str]]) -> bool:
+        """按事件所在的图节点过滤，节点内的子运行（模型、工具）继承节点的 langgraph_node 元数据"""
+        node = (event.get("metadata") or {}).get("langgraph_node")
+        if include_nodes is not None and node not in include_nodes:
+            return False
+        if exclude_nodes is not None and node in exclude_nodes:
+            return False
+        return True
 
-    def _is_empty_chunk(self, data: Any) -> bool:
+    def _is_empty_chunk(self, kind: str, data: Any) -> bool:
         """检查是否是空 chunk 事件"""
-        if not isinstance(data, dict):
+        if kind != "on_chat_model_stream" or not isinstance(data, dict):
             return False
         
         chunk = data.get("chunk")
-        if chunk and isinstance(chunk, dict):
-            content = chunk.get("content", "")
-            if not content or content == "":
-                # 即使 content 为空，如果有 tool_calls 或 metadata，仍然是有意义的事件
-                has_tool_calls = bool(chunk.get("tool_calls") or chunk.get("tool_call_chunks"))
-                has_metadata = bool(chunk.get("response_metadata") or chunk.get("usage_metadata"))
-                if not has_tool_calls and not has_metadata:
-                    logger.debug(f"Detected empty chunk: content='{content}', has_tool_calls={has_tool_calls}, has_metadata={has_metadata}")
-                    return True
+        if isinstance(chunk, BaseMessage) and not chunk.content:
+            # 即使 content 为空，如果有 tool_calls 或 metadata，仍然是有意义的事件
+            has_tool_calls = bool(getattr(chunk, "tool_call_chunks", None) or getattr(chunk, "tool_calls", None))
+            has_metadata = bool(chunk.response_metadata or getattr(chunk, "usage_metadata", None))
+            if not has_tool_calls and not has_metadata:
+                return True
         
         return False
     
-    async def event_handler(self, event) -> AsyncIterator[dict]:
+    def _summarize_output(self, output: Any) -> Any:
+        """summary 投影：只保留输出中的消息，完整 state 只保留最后一条消息"""
+        if isinstance(output, BaseMessage):
+            return output
+        if isinstance(output, Command):
+            update = output.update if isinstance(output.update, dict) else {}
+            return {"goto": str(output.goto) if output.goto is not None else None, "messages": update.get("messages")}
+        if isinstance(output, dict) and "messages" in output:
+            messages = output["messages"]
+            if isinstance(messages, list):
+                messages = messages[-1:]
+            return {"messages": messages}
+        return None
+
+    def _project(self, kind: str, data: Any, projection: str) -> Any:
+        """按投影设置裁剪事件数据，返回 None 表示丢弃该事件"""
+        if projection == "full" or kind == "on_chat_model_stream":
+            return data
+        if projection == "tokens":
+            return None
+        # summary：自定义事件是应用主动发送的，原样保留
+        if kind == "on_custom_event":
+            return data
+        # 其余事件不回传输入，只推送输出中含消息的结束事件；开始 / 中间事件裁剪后没有内容，不发送空帧
+        if kind.endswith("_end") and isinstance(data, dict):
+            output = self._summarize_output(data.get("output"))
+            if output is not None:
+                return {"output": output}
+        return None
+
+    async def event_handler(self, event, projection: str = "full") -> AsyncIterator[dict]:
         try:
             kind = event.get("event")
             data = event.get("data")
             name = event.get("name")
             
             # 过滤空 chunk 事件，减少不必要的网络传输
-            if self._is_empty_chunk(data):
+            if self._is_empty_chunk(kind, data):
                 logger.debug(f"Filtered empty chunk event: {name}")
                 return
             
+            data = self._project(kind, data, projection)
+            if data is None:
+                return
+            
             logger.debug(f"Processing event: kind={kind}, name={name}")
-            # 序列化数据，确保 BaseMessage 和 Command 对象可以 JSON 序列化
-            serialized_data = self._serialize_data(data)
+            # 按事件类型选择编码器：token chunk 只提取必要字段，其他事件一次编码为 JSON 字符串
+            serialized_data = EVENT_ENCODERS.get(kind, encode_event_data)(data)
 
             yield {
                 "kind": kind,
@@ -253,34 +439,96 @@ class ChatService:
                 "data": str(e)
             }
 
-    async def event_generator(self, event_queue: asyncio.Queue, workflow_done: asyncio.Event) -> AsyncIterator[dict]:
+    def _to_sse(self, event: dict, stream_mode: str) -> dict:
+        """将队列中的事件转换为 EventSourceResponse 需要的 {"event", "data"} 字典"""
+        event_name = event.get('event', 'message')
+        event_data = event.get('data', {})
+        
+        # 确保 data 是 JSON 字符串格式；event_handler 已编码的事件直接发送
+        if stream_mode == "compact" and event.get("kind") == "on_chat_model_stream":
+            event_name = "token"
+            data_str = encode_compact_chunk(event_data)
+        elif isinstance(event_data, str):
+            data_str = event_data
+        else:
+            data_str = dumps(event_data)
+        
+        chat_metrics.frames_sent += 1
+        logger.debug(f"Yielding SSE event: {event_name}")
+        return {
+            "event": event_name,
+            "data": data_str
+        }
+
+    def _chunk_length(self, event: dict) -> int:
+        content = ((event.get("data") or {}).get("chunk") or {}).get("content")
+        return len(content) if isinstance(content, str) else 0
+
+    async def event_generator(
+        self,
+        event_queue: asyncio.Queue,
+        workflow_done: asyncio.Event,
+        start_workflow: Optional[Callable[[], asyncio.Task]] = None,
+        request: Optional[Request] = None,
+        stream_mode: str = "full",
+        coalesce_ms: int = 0,
+        coalesce_max_chars: int = CHAT_COALESCE_MAX_CHARS,
+    ) -> AsyncIterator[dict]:
         """生成 SSE 格式的事件流
         
         EventSourceResponse 期望接收字典格式：{"event": "event_name", "data": "json_string"}
-        参考其他项目的实现，直接等待队列，不使用超时，确保事件能够流式输出
+        compact 模式下 token chunk 以 "token" 事件发送，data 只包含 {"id": 调用 ID, "d": 增量文本}。
+        coalesce_ms > 0 时，同一次模型调用的连续 token chunk 会被合并为一帧，
+        在首个 chunk 到达 coalesce_ms 毫秒后或累计达到 coalesce_max_chars 个字符时发送；
+        其他事件到达时先发送已合并的 token，再立即发送该事件。
+        start_workflow 在生成器开始迭代时启动 workflow 任务（生产者）。
+        等待队列时定期检查客户端是否已断开；生成器结束（包括被取消）时，
+        若 workflow 仍在运行则取消它，避免继续消耗 LLM token 和 checkpoint 写入。
         """
+        loop = asyncio.get_running_loop()
+        pending = None  # 正在合并的 token chunk 事件
+        deadline = 0.0
+        workflow_task = None
         try:
+            if start_workflow is not None:
+                workflow_task = start_workflow()
             while True:
-                event = await event_queue.get()
+                timeout = CHAT_DISCONNECT_POLL_INTERVAL if pending is None else max(deadline - loop.time(), 0)
+                try:
+                    event = await asyncio.wait_for(event_queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    if pending is not None:
+                        yield self._to_sse(pending, stream_mode)
+                        pending = None
+                        continue
+                    if request is not None and await request.is_disconnected():
+                        logger.info("Client disconnected, stopping stream")
+                        break
+                    continue
                 
                 # 使用 None 作为结束信号，参考其他项目的实现
                 if event is None:
+                    if pending is not None:
+                        yield self._to_sse(pending, stream_mode)
                     break
                 
-                event_name = event.get('event', 'message')
-                event_data = event.get('data', {})
+                if coalesce_ms > 0 and event.get("kind") == "on_chat_model_stream":
+                    if pending is not None and self._merge_chunk_event(pending, event):
+                        chat_metrics.chunks_batched += 1
+                    else:
+                        if pending is not None:
+                            yield self._to_sse(pending, stream_mode)
+                        pending = event
+                        deadline = loop.time() + coalesce_ms / 1000
+                    if self._chunk_length(pending) >= coalesce_max_chars:
+                        yield self._to_sse(pending, stream_mode)
+                        pending = None
+                    continue
                 
-                # 确保 data 是 JSON 字符串格式
-                if isinstance(event_data, str):
-                    data_str = event_data
-                else:
-                    data_str = json.dumps(event_data, ensure_ascii=False)
-                
-                logger.debug(f"Yielding SSE event: {event_name}")
-                yield {
-                    "event": event_name,
-                    "data": data_str
-                }
+                if pending is not None:
+                    yield self._to_sse(pending, stream_mode)
+                    pending = None
+                yield self._to_sse(event, stream_mode)
                 
                 # 如果事件标记为结束，也退出循环
                 if event.get('kind') == 'end':
@@ -294,8 +542,75 @@ class ChatService:
             logger.error(f"Event generator error: {e}", exc_info=True)
             yield {
                 "event": "error",
-                "data": json.dumps({"error": str(e)}, ensure_ascii=False)
+                "data": dumps({"error": str(e)})
             }
+        finally:
+            if workflow_task is not None and not workflow_task.done():
+                workflow_task.cancel()
+
+    async def batch(self, batch_req: ChatBatchRequest, graphs: GraphRegistry, client_id: str = "anonymous") -> Any:
+        """并发执行多个对话，只返回每个对话的最终输出
+
+        每个对话按 ChatRequest.graph 从注册表中选择图。
+        并发数受 batch_req.concurrency（不超过 CHAT_BATCH_MAX_CONCURRENCY）限制；
+        每个对话运行前和 /chat/stream 一样经过准入控制，未获准的对话结果为 rejected。
+        stream=True 时以 NDJSON 按完成顺序逐行返回结果，否则按请求顺序一次性返回。
+        单个对话失败只影响它自己的结果。
+        """
+        concurrency = min(batch_req.concurrency or CHAT_BATCH_CONCURRENCY, CHAT_BATCH_MAX_CONCURRENCY)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(index: int, req: ChatRequest) -> dict:
+            async with semaphore:
+                try:
+                    await admission_controller.acquire(client_id)
+                except AdmissionRejected as e:
+                    return {
+                        "index": index,
+                        "thread_id": req.thread_id,
+                        "status": "rejected",
+                        "error": str(e),
+                        "retry_after": e.retry_after,
+                    }
+                try:
+                    return await self._run_to_completion(graphs, index, req)
+                finally:
+                    admission_controller.release(client_id)
+
+        if not batch_req.stream:
+            results = await asyncio.gather(*(run(i, req) for i, req in enumerate(batch_req.requests)))
+            return {"results": results}
+
+        async def ndjson_generator() -> AsyncIterator[str]:
+            tasks = [asyncio.create_task(run(i, req)) for i, req in enumerate(batch_req.requests)]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield dumps(await next_done) + "\n"
+            finally:
+                # 客户端断开时取消尚未完成的对话
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(ndjson_generator(), media_type="application/x-ndjson")
+
+    async def _run_to_completion(self, graphs: GraphRegistry, index: int, req: ChatRequest) -> dict:
+        thread_id = req.thread_id or str(uuid.uuid4())
+        messages = [{"role": message.role, "content": message.content} for message in req.messages]
+        try:
+            graph = await graphs.get(req.graph)
+        except KeyError as e:
+            return {"index": index, "thread_id": thread_id, "status": "error", "error": str(e.args[0])}
+        chat_metrics.runs_started += 1
+        try:
+            state = await graph.ainvoke(self._graph_input(messages), config=self._graph_config(thread_id))
+        except Exception as e:
+            chat_metrics.runs_failed += 1
+            logger.error(f"Batch run {index} error: {e}", exc_info=True)
+            return {"index": index, "thread_id": thread_id, "status": "error", "error": str(e)}
+        chat_metrics.runs_completed += 1
+        messages = state.get("messages")
+        output = serialize_message(messages[-1]) if messages else None
+        return {"index": index, "thread_id": thread_id, "status": "ok", "output": output}
 
 
 def get_chat_service():
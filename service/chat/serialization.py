@@ -0,0 +1,112 @@
+"""
+SSE 事件序列化
+
+astream_events 的事件数据只做一次序列化：普通事件直接交给 JSON 编码器，
+消息和 Command 等非原生类型通过 default 回调按类型分发处理，不再预先递归遍历整个数据结构；
+token chunk 事件走专门的快速路径，只提取需要的字段。
+
+安装了 orjson 时默认使用 orjson 编码，可通过 CHAT_JSON_BACKEND=json 强制使用标准库。
+"""
+import json
+from typing import Any, Callable, Dict
+
+from langchain_core.messages import BaseMessage
+from langgraph.types import Command
+
+from config.env import CHAT_JSON_BACKEND
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖
+    orjson = None
+
+
+def serialize_message(msg: BaseMessage) -> dict:
+    """将消息对象序列化为可 JSON 序列化的字典"""
+    return {
+        "type": msg.__class__.__name__,
+        "content": msg.content,
+        "name": getattr(msg, "name", None),
+        "id": getattr(msg, "id", None),
+    }
+
+
+def serialize_command(cmd: Command) -> dict:
+    """将 Command 对象序列化为可 JSON 序列化的字典，嵌套的消息由编码器的 default 回调处理"""
+    return {
+        "type": "Command",
+        "goto": str(cmd.goto) if cmd.goto is not None else None,
+        "update": cmd.update,
+        "graph": cmd.graph,
+        "resume": cmd.resume,
+    }
+
+
+# 按类型分发的序列化函数；子类在第一次遇到时沿 MRO 查找并缓存
+_TYPE_SERIALIZERS: Dict[type, Callable[[Any], Any]] = {
+    BaseMessage: serialize_message,
+    Command: serialize_command,
+}
+
+
+def _default(obj: Any) -> Any:
+    serializer = _TYPE_SERIALIZERS.get(type(obj))
+    if serializer is None:
+        for base in type(obj).__mro__[1:]:
+            if base in _TYPE_SERIALIZERS:
+                serializer = _TYPE_SERIALIZERS[base]
+                break
+        else:
+            serializer = str
+        _TYPE_SERIALIZERS[type(obj)] = serializer
+    return serializer(obj)
+
+
+if orjson is not None and CHAT_JSON_BACKEND != "json":
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(obj: Any) -> str:
+        """序列化为 JSON 字符串（orjson）"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode()
+else:
+    def dumps(obj: Any) -> str:
+        """序列化为 JSON 字符串（标准库 json）"""
+        return json.dumps(obj, ensure_ascii=False, default=_default)
+
+
+def encode_chunk_event(data: dict) -> dict:
+    """on_chat_model_stream 快速路径：只保留 chunk 的必要字段
+
+    返回的仍是字典，便于 ChatService 在队列积压时合并同一次调用的 token。
+    """
+    chunk = data.get("chunk")
+    if isinstance(chunk, BaseMessage):
+        return {"chunk": serialize_message(chunk)}
+    return data
+
+
+def encode_event_data(data: Any) -> str:
+    """其他事件：一次编码为 JSON 字符串"""
+    return dumps(data)
+
+
+# 事件类型 -> 编码函数。只有 token chunk 需要保留字典以便合并；其他事件的消息和 Command
+# 由编码器的 default 回调按类型分发（分发结果按类型缓存），已经是一次编码完成，
+# 逐个字段预先转换消息反而更慢，因此显式登记为通用编码
+EVENT_ENCODERS: Dict[str, Callable[[Any], Any]] = {
+    "on_chat_model_stream": encode_chunk_event,
+    "on_chat_model_start": encode_event_data,
+    "on_chat_model_end": encode_event_data,
+    "on_chain_start": encode_event_data,
+    "on_chain_stream": encode_event_data,
+    "on_chain_end": encode_event_data,
+    "on_tool_start": encode_event_data,
+    "on_tool_end": encode_event_data,
+    "on_custom_event": encode_event_data,
+}
+
+
+def encode_compact_chunk(data: dict) -> str:
+    """compact 模式下 token 事件的最小信封：{"id": 调用 ID, "d": 增量文本}"""
+    chunk = data.get("chunk") or {}
+    return dumps({"id": chunk.get("id"), "d": chunk.get("content", "")})
@@ -0,0 +1,30 @@
+"""
+测试公共 fixture
+
+需要 PostgreSQL 的测试通过 TEST_POSTGRES_CONN_STRING 指定测试库，未设置时跳过。
+每个测试使用独立的临时 schema（通过 search_path），结束后删除。
+"""
+import os
+import uuid
+
+import pytest
+
+TEST_POSTGRES_CONN_STRING = os.getenv("TEST_POSTGRES_CONN_STRING")
+
+
+@pytest.fixture
+def pg_conninfo():
+    """指向临时 schema 的连接串"""
+    if not TEST_POSTGRES_CONN_STRING:
+        pytest.skip("TEST_POSTGRES_CONN_STRING 未设置")
+    import psycopg
+    from psycopg.conninfo import make_conninfo
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(TEST_POSTGRES_CONN_STRING, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+    try:
+        yield make_conninfo(TEST_POSTGRES_CONN_STRING, options=f"-c search_path={schema}")
+    finally:
+        with psycopg.connect(TEST_POSTGRES_CONN_STRING, autocommit=True) as conn:
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
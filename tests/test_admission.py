@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from service.chat import chat_service as chat_service_module
+from service.chat.admission import AdmissionController
+from service.chat.chat_service import ChatService
+from schema.request.chat import ChatBatchRequest, ChatRequest
+
+
+class FakeGraph:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def ainvoke(self, graph_input, config):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return {"messages": []}
+
+
+class FakeRegistry:
+    def __init__(self, graph):
+        self.graph = graph
+
+    async def get(self, name=None):
+        return self.graph
+
+
+def batch_request(count: int, concurrency: int) -> ChatBatchRequest:
+    return ChatBatchRequest(
+        requests=[{"messages": [{"role": "user", "content": str(i)}]} for i in range(count)],
+        concurrency=concurrency,
+    )
+
+
+def test_batch_runs_go_through_admission(monkeypatch):
+    controller = AdmissionController(max_concurrency=2, max_queue_size=10, queue_timeout=5)
+    monkeypatch.setattr(chat_service_module, "admission_controller", controller)
+    graph = FakeGraph()
+
+    async def run():
+        return await ChatService().batch(batch_request(6, concurrency=6), FakeRegistry(graph), client_id="c")
+
+    response = asyncio.run(run())
+    assert [r["status"] for r in response["results"]] == ["ok"] * 6
+    assert graph.max_running == 2
+    assert controller.admitted == 6
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_batch_reports_rejected_runs(monkeypatch):
+    controller = AdmissionController(max_concurrency=1, max_queue_size=0)
+    monkeypatch.setattr(chat_service_module, "admission_controller", controller)
+
+    async def run():
+        return await ChatService().batch(batch_request(2, concurrency=2), FakeRegistry(FakeGraph()), client_id="c")
+
+    results = asyncio.run(run())["results"]
+    assert sorted(r["status"] for r in results) == ["ok", "rejected"]
+    rejected = next(r for r in results if r["status"] == "rejected")
+    assert rejected["retry_after"] == controller.retry_after
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_batch_request_size_is_bounded():
+    from pydantic import ValidationError
+    from config.env import CHAT_BATCH_MAX_REQUESTS
+
+    with pytest.raises(ValidationError):
+        batch_request(CHAT_BATCH_MAX_REQUESTS + 1, concurrency=1)
+
+
+def test_acquire_timeout_after_grant_keeps_the_slot(monkeypatch):
+    controller = AdmissionController(max_concurrency=1, max_queue_size=1, queue_timeout=5)
+
+    async def granted_then_timed_out(future, timeout):
+        # 名额在 wait_for 超时的同一时刻转交给等待者
+        controller.release("a")
+        assert future.done()
+        raise asyncio.TimeoutError
+
+    async def run():
+        await controller.acquire("a")
+        monkeypatch.setattr(asyncio, "wait_for", granted_then_timed_out)
+        await controller.acquire("b")
+        monkeypatch.undo()
+        assert controller.stats()["clients"] == {"b": 1}
+        controller.release("b")
+        # 名额没有泄漏：可以再次获取
+        await asyncio.wait_for(controller.acquire("c"), timeout=1)
+
+    asyncio.run(run())
+    assert controller.rejected == 0
+    assert controller.stats()["in_flight"] == 1
+
+
+class EndlessGraph:
+    """不停产生事件的图，消费方不读取时生产者会阻塞在有界队列上"""
+
+    async def astream_events(self, graph_input, **kwargs):
+        while True:
+            yield {"event": "on_custom_event", "name": "tick", "data": {}}
+            await asyncio.sleep(0)
+
+
+def test_stream_slot_is_released_when_body_is_never_iterated(monkeypatch):
+    controller = AdmissionController(max_concurrency=1)
+    monkeypatch.setattr(chat_service_module, "admission_controller", controller)
+    req = ChatRequest(messages=[{"role": "user", "content": "hi"}])
+
+    async def disconnected():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        await asyncio.sleep(0)
+
+    async def run():
+        response = await ChatService().chat(req, EndlessGraph())
+        assert controller.stats()["in_flight"] == 1
+        # 客户端在响应体开始迭代前就已断开
+        await response({"type": "http", "headers": []}, disconnected, send)
+        await asyncio.sleep(0)
+        assert controller.stats()["in_flight"] == 0
+        assert not [task for task in asyncio.all_tasks() if task.get_coro().__qualname__ == "ChatService.workflow"]
+
+    asyncio.run(run())
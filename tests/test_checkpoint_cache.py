@@ -0,0 +1,122 @@
+import asyncio
+
+from langgraph.checkpoint.base import CheckpointTuple, empty_checkpoint
+
+from db.pg import checkpoint_cache as checkpoint_cache_module
+from db.pg.checkpoint_cache import CheckpointCache
+from tests.test_pg_checkpointer import put_checkpoint, saver
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_tuple(thread_id: str, checkpoint_id: str, checkpoint_ns: str = "") -> CheckpointTuple:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": [checkpoint_id]}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+    return CheckpointTuple(config, checkpoint, {"step": 1}, None, [])
+
+
+def cached_id(cache: CheckpointCache, thread_id: str, checkpoint_ns: str = ""):
+    cached = cache.get(thread_id, checkpoint_ns)
+    return cached.config["configurable"]["checkpoint_id"] if cached is not None else None
+
+
+def test_least_recently_used_thread_is_evicted():
+    cache = CheckpointCache(max_size=2, ttl=0)
+    cache.put(make_tuple("a", "a1"))
+    cache.put(make_tuple("b", "b1"))
+    # 读取 a 之后 b 成为最久未使用的条目
+    assert cached_id(cache, "a") == "a1"
+    cache.put(make_tuple("c", "c1"))
+    assert cached_id(cache, "b") is None
+    assert cached_id(cache, "a") == "a1"
+    assert cached_id(cache, "c") == "c1"
+    # 替换已有线程的 checkpoint 不淘汰其他条目
+    cache.put(make_tuple("a", "a2"))
+    assert cached_id(cache, "a") == "a2"
+    assert cached_id(cache, "c") == "c1"
+    stats = cache.stats
+    assert (stats.evictions, stats.size) == (1, 2)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(checkpoint_cache_module.time, "monotonic", clock)
+    cache = CheckpointCache(max_size=10, ttl=5)
+    cache.put(make_tuple("a", "a1"))
+    clock.now += 5
+    assert cached_id(cache, "a") == "a1"
+    clock.now += 0.1
+    assert cached_id(cache, "a") is None
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.expirations, stats.size) == (1, 1, 1, 0)
+
+
+def test_checkpoint_id_must_match_the_cached_latest():
+    cache = CheckpointCache(max_size=10, ttl=0)
+    cache.put(make_tuple("a", "a2"))
+    assert cache.get("a", "", "a2") is not None
+    assert cache.get("a", "", "a1") is None
+    assert cache.get("a", "sub") is None
+
+
+def test_callers_cannot_modify_the_cached_checkpoint():
+    cache = CheckpointCache(max_size=10, ttl=0)
+    original = make_tuple("a", "a1")
+    cache.put(original)
+    original.checkpoint["channel_values"]["messages"] = ["changed"]
+    cached = cache.get("a", "")
+    cached.checkpoint["channel_values"]["messages"] = ["changed"]
+    cached.pending_writes.append(("task", "messages", "x"))
+    again = cache.get("a", "")
+    assert again.checkpoint["channel_values"] == {"messages": ["a1"]}
+    assert again.pending_writes == []
+
+
+def test_invalidate_without_namespace_clears_every_namespace():
+    cache = CheckpointCache(max_size=10, ttl=0)
+    cache.put(make_tuple("a", "a1"))
+    cache.put(make_tuple("a", "a1-sub", checkpoint_ns="sub"))
+    cache.put(make_tuple("b", "b1"))
+    cache.invalidate("a", "sub")
+    assert cached_id(cache, "a", "sub") is None
+    assert cached_id(cache, "a") == "a1"
+    cache.invalidate("a")
+    assert cached_id(cache, "a") is None
+    assert cached_id(cache, "b") == "b1"
+    assert cache.stats.invalidations == 2
+
+
+def test_saver_writes_through_and_invalidates(pg_conninfo):
+    latest_config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+
+    async def run():
+        async with saver(pg_conninfo, cache_size=10) as checkpointer:
+            config = await put_checkpoint(checkpointer)
+            # aput 写入的 checkpoint 直接进入缓存，读取不查询数据库
+            latest = await checkpointer.aget_tuple(latest_config)
+            assert latest.config["configurable"]["checkpoint_id"] == config["configurable"]["checkpoint_id"]
+            assert latest.checkpoint["channel_values"] == {"messages": ["你好", "hello"]}
+            assert (checkpointer.cache_stats().hits, checkpointer.cache_stats().misses) == (1, 0)
+
+            # pending writes 改变了最新 checkpoint 的内容，缓存失效后从数据库读取
+            await checkpointer.aput_writes(config, [("messages", "pending")], task_id="task-1")
+            assert checkpointer.cache_stats().size == 0
+            latest = await checkpointer.aget_tuple(latest_config)
+            assert latest.pending_writes == [("task-1", "messages", "pending")]
+            assert (checkpointer.cache_stats().hits, checkpointer.cache_stats().misses) == (1, 1)
+            # 从数据库读取的结果重新进入缓存
+            assert (await checkpointer.aget_tuple(latest_config)).pending_writes == [("task-1", "messages", "pending")]
+            assert checkpointer.cache_stats().hits == 2
+
+            await checkpointer.adelete_thread("t1")
+            assert checkpointer.cache_stats().size == 0
+            assert await checkpointer.aget_tuple(latest_config) is None
+
+    asyncio.run(run())
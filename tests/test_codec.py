@@ -0,0 +1,14 @@
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from db.pg.codec import CompressedSerializer
+
+
+def test_decode_only_serializer_reads_compressed_payloads():
+    payload = {"messages": ["你好"] * 500}
+    typ, data = CompressedSerializer(JsonPlusSerializer(), "zlib", threshold=0).dumps_typed(payload)
+    assert typ.endswith("+zlib")
+
+    decode_only = CompressedSerializer(JsonPlusSerializer(), None, threshold=0)
+    assert decode_only.loads_typed((typ, data)) == payload
+    # 未设置 codec 时写入不压缩
+    assert "+" not in decode_only.dumps_typed(payload)[0]
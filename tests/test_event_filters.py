@@ -0,0 +1,84 @@
+import asyncio
+from typing import Annotated, TypedDict
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from schema.request.chat import ChatRequest
+from service.chat.chat_service import ChatService
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def build_graph():
+    def make_node(reply: str):
+        async def node(state: State):
+            model = GenericFakeChatModel(messages=iter([AIMessage(content=reply)]))
+            return {"messages": [await model.ainvoke(state["messages"])]}
+        return node
+
+    builder = StateGraph(State)
+    builder.add_node("triage", make_node("triage says hi"))
+    builder.add_node("answer", make_node("final answer"))
+    builder.add_edge(START, "triage")
+    builder.add_edge("triage", "answer")
+    builder.add_edge("answer", END)
+    return builder.compile()
+
+
+def collect(**filters) -> list[dict]:
+    service = ChatService()
+    req = ChatRequest(messages=[{"role": "user", "content": "hi"}], **filters)
+
+    async def run():
+        return [
+            event
+            async for event in service.run_agent(
+                build_graph(),
+                thread_id="t",
+                user_input_mesages=[{"role": "user", "content": "hi"}],
+                event_filters=service._event_filters(req),
+                projection=req.projection,
+            )
+        ]
+
+    return asyncio.run(run())
+
+
+def streamed_text(events: list[dict]) -> str:
+    return "".join(
+        event["data"]["chunk"]["content"]
+        for event in events
+        if event["kind"] == "on_chat_model_stream"
+    )
+
+
+def test_include_nodes_keeps_model_tokens_of_the_node():
+    events = collect(include_nodes=["triage"], projection="tokens")
+    assert streamed_text(events) == "triage says hi"
+
+
+def test_exclude_nodes_drops_the_node():
+    events = collect(exclude_nodes=["triage"])
+    assert streamed_text(events) == "final answer"
+    assert all(event["event"] != "triage" for event in events)
+
+
+def test_include_names_matches_run_names():
+    events = collect(include_names=["triage"])
+    assert {event["event"] for event in events} == {"triage"}
+    assert streamed_text(events) == ""
+
+
+def test_summary_projection_sends_no_empty_frames():
+    events = collect(projection="summary")
+    assert streamed_text(events) == "triage says hi" + "final answer"
+    others = [event for event in events if event["kind"] != "on_chat_model_stream"]
+    assert others
+    assert all(event["kind"].endswith("_end") for event in others)
+    assert all(event["data"] not in ("{}", '{"output":null}', '{"output": null}') for event in others)
+    assert {"triage", "answer"} <= {event["event"] for event in others}
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from graph.registry import GraphRegistry
+
+
+class StubBuilder:
+    """记录每次编译收到的 checkpointer，返回一个占位的图"""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.checkpointers = []
+
+    async def __call__(self, checkpointer):
+        self.checkpointers.append(checkpointer)
+        await asyncio.sleep(self.delay)
+        return object()
+
+
+def test_concurrent_first_requests_compile_once():
+    builder = StubBuilder(delay=0.01)
+    registry = GraphRegistry(default="main")
+    registry.register("main", builder)
+
+    async def run():
+        return await asyncio.gather(*(registry.get("main") for _ in range(10)))
+
+    graphs = asyncio.run(run())
+    assert len(builder.checkpointers) == 1
+    assert all(graph is graphs[0] for graph in graphs)
+    assert registry.compiled == ["main"]
+
+
+def test_sync_factories_and_default_name():
+    compiled = []
+
+    def build(checkpointer):
+        compiled.append(checkpointer)
+        return "graph"
+
+    registry = GraphRegistry(default="main")
+    registry.register("main", build)
+    assert asyncio.run(registry.get()) == "graph"
+    assert asyncio.run(registry.get("main")) == "graph"
+    assert len(compiled) == 1
+
+
+def test_graphs_share_the_checkpointer_and_lazy_graphs_compile_on_first_use():
+    main, parallel = StubBuilder(), StubBuilder()
+    registry = GraphRegistry(default="main")
+    registry.register("main", main, eager=True)
+    registry.register("parallel", parallel)
+    # 预先设置 checkpointer，setup 不再创建连接池
+    checkpointer = registry.checkpointer = object()
+
+    async def run():
+        await registry.setup()
+        assert registry.compiled == ["main"]
+        assert parallel.checkpointers == []
+        await registry.get("parallel")
+
+    asyncio.run(run())
+    assert registry.compiled == ["main", "parallel"]
+    assert main.checkpointers == [checkpointer]
+    assert parallel.checkpointers == [checkpointer]
+
+
+def test_unknown_graph_raises_key_error():
+    registry = GraphRegistry(default="main")
+    registry.register("main", StubBuilder())
+    with pytest.raises(KeyError):
+        asyncio.run(registry.get("missing"))
+    assert registry.compiled == []
+
+
+def test_unknown_graph_returns_404():
+    import httpx
+    from fastapi import FastAPI
+
+    from app.api import router
+
+    registry = GraphRegistry(default="main")
+    registry.register("main", StubBuilder())
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    app.state.graph_registry = registry
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/v1/chat/stream",
+                json={"graph": "missing", "messages": [{"role": "user", "content": "hi"}]},
+            )
+
+    response = asyncio.run(run())
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Unknown graph: missing"
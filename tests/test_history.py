@@ -0,0 +1,132 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from graph.base.BaseNode import BaseNode
+from graph.base.history import (
+    COMPACT_TARGET_RATIO,
+    estimate_message_tokens,
+    split_for_budget,
+    unsummarized_messages,
+)
+
+
+class RecordingChatModel(GenericFakeChatModel):
+    """按顺序返回预设回复，并记录每次收到的提示词"""
+    prompts: list = []
+
+    def _generate(self, messages, *args, **kwargs):
+        self.prompts.append(messages[-1].content)
+        return super()._generate(messages, *args, **kwargs)
+
+
+class HistoryNode(BaseNode):
+    def __init__(self, llm):
+        self.gemini_2 = llm
+
+    async def __call__(self, state, config):
+        pass
+
+
+def conversation(count: int, start: int = 0) -> list:
+    """每条消息 4 + 40 / 4 = 14 token"""
+    messages = []
+    for i in range(start, start + count):
+        message_cls = HumanMessage if i % 2 == 0 else AIMessage
+        messages.append(message_cls(content=f"{i:02d}" + "x" * 38, id=f"m{i}"))
+    return messages
+
+
+def tokens(messages) -> int:
+    return sum(estimate_message_tokens(m) for m in messages)
+
+
+def test_messages_within_budget_are_not_folded():
+    messages = conversation(10)
+    assert split_for_budget(messages, tokens(messages)) == ([], messages)
+
+
+def test_split_keeps_recent_messages_under_the_target_ratio():
+    messages = conversation(20)
+    budget = 140
+    to_fold, kept = split_for_budget(messages, budget)
+    # 不丢失也不重复：折叠部分与保留部分按原顺序拼接后等于原消息
+    assert to_fold + kept == messages
+    assert tokens(kept) <= budget * COMPACT_TARGET_RATIO
+    # 在目标以内尽量多保留：再多保留一条就会超出目标
+    assert tokens([to_fold[-1], *kept]) > budget * COMPACT_TARGET_RATIO
+    assert [m.id for m in kept] == [f"m{i}" for i in range(14, 20)]
+
+
+def test_split_keeps_at_least_the_last_message():
+    messages = [*conversation(3), HumanMessage(content="y" * 400, id="long")]
+    to_fold, kept = split_for_budget(messages, 50)
+    assert [m.id for m in kept] == ["long"]
+    assert to_fold == messages[:3]
+
+
+def test_kept_messages_do_not_start_with_a_tool_result():
+    call = AIMessage(content="", id="call", tool_calls=[{"name": "search", "args": {}, "id": "c1"}])
+    result = ToolMessage(content="r" * 40, id="result", tool_call_id="c1")
+    messages = [*conversation(6), call, result, *conversation(2, start=6)]
+    budget = 84
+    target = budget * COMPACT_TARGET_RATIO
+    # 按预算本应从工具结果开始保留
+    assert tokens(messages[7:]) <= target < tokens(messages[6:])
+    to_fold, kept = split_for_budget(messages, budget)
+    assert to_fold + kept == messages
+    assert not isinstance(kept[0], ToolMessage)
+    assert [m.id for m in kept] == ["m6", "m7"]
+
+
+def test_unsummarized_messages_start_after_summarized_until():
+    messages = conversation(5)
+    assert unsummarized_messages(messages, "m2") == messages[3:]
+    assert unsummarized_messages(messages, "m4") == []
+    # 找不到时（例如消息被删除）视为没有摘要
+    assert unsummarized_messages(messages, "missing") == messages
+    assert unsummarized_messages(messages, None) == messages
+
+
+def test_compact_history_only_summarizes_newly_folded_messages():
+    llm = RecordingChatModel(messages=iter([AIMessage(content="摘要一"), AIMessage(content="摘要二")]), prompts=[])
+    node = HistoryNode(llm)
+    budget = 140
+
+    async def run():
+        state = {"messages": conversation(20)}
+        prompt, update = await node.compact_history(state, budget=budget)
+        assert update == {"summary": "摘要一", "summarized_until": "m13"}
+        assert isinstance(prompt[0], SystemMessage) and "摘要一" in prompt[0].content
+        assert [m.id for m in prompt[1:]] == [f"m{i}" for i in range(14, 20)]
+        assert all(f"{i:02d}" + "x" * 38 in llm.prompts[0] for i in range(14))
+        assert "14" + "x" * 38 not in llm.prompts[0]
+
+        # 下一轮：未超出预算时不调用模型，摘要之后的消息全部发送
+        state = {**state, **update, "messages": state["messages"] + conversation(2, start=20)}
+        prompt, update = await node.compact_history(state, budget=budget)
+        assert update == {}
+        assert [m.id for m in prompt[1:]] == [f"m{i}" for i in range(14, 22)]
+        assert len(llm.prompts) == 1
+
+        # 再次超出预算：只把 summarized_until 之后新折叠的消息与已有摘要合并
+        state = {**state, "messages": state["messages"] + conversation(4, start=22)}
+        prompt, update = await node.compact_history(state, budget=budget)
+        assert update == {"summary": "摘要二", "summarized_until": "m19"}
+        assert [m.id for m in prompt[1:]] == [f"m{i}" for i in range(20, 26)]
+        second = llm.prompts[1]
+        assert "摘要一" in second
+        assert "13" + "x" * 38 not in second
+        assert all(f"{i}" + "x" * 38 in second for i in range(14, 20))
+
+    asyncio.run(run())
+
+
+def test_compact_history_is_disabled_without_budget():
+    node = HistoryNode(RecordingChatModel(messages=iter([]), prompts=[]))
+    state = {"messages": conversation(20), "summary": "旧摘要", "summarized_until": "m3"}
+    prompt, update = asyncio.run(node.compact_history(state, budget=0))
+    assert update == {}
+    assert prompt[0].content.endswith("旧摘要")
+    assert prompt[1:] == state["messages"]
@@ -0,0 +1,33 @@
+import asyncio
+
+from langchain_core.embeddings import Embeddings
+
+from utils.llm_cache import SemanticCacheTier
+
+
+class CharEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.count(ch)) for ch in "你好世界"]
+
+
+def test_semantic_tier_loads_embeddings_on_first_use():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return CharEmbeddings()
+
+    tier = SemanticCacheTier(factory, threshold=0.99)
+    assert calls == []
+
+    async def run():
+        assert await tier.lookup("你好", "llm", ttl=0) is None
+        assert calls == []
+        await asyncio.gather(*(tier.update("你好", "llm", [f"v{i}"]) for i in range(3)))
+        assert await tier.lookup("你好", "llm", ttl=0) is not None
+
+    asyncio.run(run())
+    assert calls == [1]
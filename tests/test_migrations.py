@@ -0,0 +1,88 @@
+import asyncio
+import re
+
+from db.pg import migrations
+from db.pg.migrations import MIGRATIONS, SCHEMA_VERSION, run_migrations
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*)\)", re.S)
+_ADD_COLUMN = re.compile(r"ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+)")
+_CREATE_INDEX = re.compile(r"CREATE (?:UNIQUE )?INDEX IF NOT EXISTS \w+ ON (\w+) \((.*)\)")
+
+
+# 引入迁移之前 create_all 建出的基线库中已有的表和列
+BASELINE_COLUMNS = {
+    "checkpoints": {"thread_id", "checkpoint_ns", "checkpoint_id", "parent_checkpoint_id", "type", "checkpoint", "metadata"},
+    "writes": {"thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx", "channel", "type", "value"},
+}
+
+
+def _apply(columns):
+    """按版本顺序模拟执行迁移，检查每个索引引用的列在执行时已经存在"""
+    for version, migration in enumerate(MIGRATIONS):
+        for statement in migration():
+            statement = statement.strip()
+            if match := _CREATE_TABLE.match(statement):
+                table, body = match.groups()
+                # IF NOT EXISTS：表已存在时不会补充新列
+                if table not in columns:
+                    columns[table] = {
+                        line.split()[0] for line in body.splitlines()
+                        if line.strip() and not line.strip().startswith(("PRIMARY KEY", "UNIQUE", "CONSTRAINT"))
+                    }
+            elif match := _ADD_COLUMN.match(statement):
+                columns[match.group(1)].add(match.group(2))
+            elif match := _CREATE_INDEX.match(statement):
+                table, indexed = match.groups()
+                missing = {c.strip() for c in indexed.split(",")} - columns.get(table, set())
+                assert not missing, f"v{version} indexes {table}.{missing} before it exists"
+    return columns
+
+
+def test_migrations_apply_to_empty_schema():
+    assert "created_at" in _apply({})["checkpoints"]
+
+
+def test_migrations_apply_to_baseline_schema():
+    columns = _apply({table: set(cols) for table, cols in BASELINE_COLUMNS.items()})
+    assert {"created_at", "channel_versions"} <= columns["checkpoints"]
+
+
+def test_v0_is_the_baseline_schema():
+    statements = "\n".join(MIGRATIONS[0]())
+    assert "created_at" not in statements
+    assert "channel_versions" not in statements
+
+
+def test_upgrade_baseline_database(pg_conninfo):
+    """引入迁移之前建出的基线库（只有 v0 的表，没有 checkpoint_migrations）可以升级到最新版本"""
+    import psycopg
+
+    async def run():
+        async with await psycopg.AsyncConnection.connect(pg_conninfo, autocommit=True) as conn:
+            for statement in migrations._BASELINE_DDL:
+                await conn.execute(statement)
+            await conn.execute(
+                "INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id) VALUES ('t', '', 'c1')"
+            )
+
+            assert await run_migrations(conn) == SCHEMA_VERSION
+            cur = await conn.execute("SELECT thread_id, created_at IS NOT NULL, channel_versions FROM checkpoints")
+            assert await cur.fetchall() == [("t", True, None)]
+            cur = await conn.execute("SELECT v FROM checkpoint_migrations ORDER BY v")
+            assert [row[0] for row in await cur.fetchall()] == list(range(SCHEMA_VERSION + 1))
+            # 再次执行是幂等的
+            assert await run_migrations(conn) == SCHEMA_VERSION
+
+    asyncio.run(run())
+
+
+def test_migrate_empty_database(pg_conninfo):
+    import psycopg
+
+    async def run():
+        async with await psycopg.AsyncConnection.connect(pg_conninfo, autocommit=True) as conn:
+            assert await run_migrations(conn) == SCHEMA_VERSION
+            cur = await conn.execute("SELECT to_regclass('idx_checkpoints_thread_created_at') IS NOT NULL")
+            assert (await cur.fetchone())[0]
+
+    asyncio.run(run())
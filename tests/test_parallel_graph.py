@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import START
+
+from graph.base.base_builder import GraphBuilder
+from graph.parallelgraph.ParallelGraph import ParallelGraphBuilder
+from schema.graph.graph import State
+
+FAST = {"classify": 0, "retrieve": 0, "safety_check": 0}
+
+
+def test_branch_fields_are_reset_on_each_turn():
+    builder = ParallelGraphBuilder(latencies={**FAST, "retrieve": 0.5}, timeout=0.05)
+    graph = builder.compile(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "t1"}}
+
+    async def run():
+        first = await graph.ainvoke({"messages": [HumanMessage(content="hi")]}, config)
+        assert set(first["branch_errors"]) == {"retrieve"}
+        assert "errors=" in first["messages"][-1].content
+
+        builder.latencies["retrieve"] = 0
+        second = await graph.ainvoke({"messages": [HumanMessage(content="again?")]}, config)
+        assert second["branch_errors"] == {}
+        assert second["branch_results"]["classify"] == "question"
+        assert "errors=" not in second["messages"][-1].content
+
+    asyncio.run(run())
+
+
+def test_timeouts_require_branch_errors_field():
+    async def branch(state, config):
+        return {}
+
+    builder = GraphBuilder(State)
+    builder.add_node("join", branch)
+    with pytest.raises(ValueError, match="branch_errors"):
+        builder.add_parallel_branches(START, {"a": branch, "b": branch}, join="join", timeout=1.0)
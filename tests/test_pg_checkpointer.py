@@ -0,0 +1,150 @@
+import asyncio
+import tempfile
+from contextlib import asynccontextmanager
+
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from db.pg.pg_checkpointer import AsyncCompatiblePostgresSaver
+
+
+@asynccontextmanager
+async def saver(conninfo: str, **kwargs):
+    from psycopg_pool import AsyncConnectionPool
+
+    # 与 GraphBuilder.setup_checkpointer 一致，连接开启 autocommit
+    async with AsyncConnectionPool(conninfo, min_size=1, max_size=1, kwargs={"autocommit": True}, open=False) as pool:
+        checkpointer = AsyncCompatiblePostgresSaver(pool, **kwargs)
+        await checkpointer.setup()
+        yield checkpointer
+
+
+async def put_checkpoint(checkpointer: AsyncCompatiblePostgresSaver, thread_id: str = "t1") -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": ["你好", "hello"]}
+    checkpoint["channel_versions"] = {"messages": checkpointer.get_next_version(None, None)}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    return await checkpointer.aput(
+        config, checkpoint, {"source": "loop", "step": 1, "note": "中文"}, checkpoint["channel_versions"]
+    )
+
+
+def test_put_get_list_round_trip(pg_conninfo):
+    async def run():
+        async with saver(pg_conninfo) as checkpointer:
+            config = await put_checkpoint(checkpointer)
+            await checkpointer.aput_writes(config, [("messages", "pending")], task_id="task-1")
+
+            latest = await checkpointer.aget_tuple({"configurable": {"thread_id": "t1", "checkpoint_ns": ""}})
+            assert latest.checkpoint["channel_values"] == {"messages": ["你好", "hello"]}
+            assert latest.metadata["note"] == "中文"
+            assert latest.pending_writes == [("task-1", "messages", "pending")]
+
+            listed = [item async for item in checkpointer.alist({"configurable": {"thread_id": "t1"}})]
+            assert [item.config["configurable"]["checkpoint_id"] for item in listed] == [
+                config["configurable"]["checkpoint_id"]
+            ]
+            assert listed[0].metadata["step"] == 1
+
+    asyncio.run(run())
+
+
+def test_single_query_get_and_bulk_writes_take_one_round_trip(pg_conninfo):
+    """按协议消息统计往返次数：服务端每完成一次请求回复一条 ReadyForQuery"""
+
+    async def run():
+        async with saver(pg_conninfo) as checkpointer:
+            config = await put_checkpoint(checkpointer)
+            latest_config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+            # 预热：预编译语句在第一次执行时准备
+            await checkpointer.aget_tuple(latest_config)
+            await checkpointer.aput_writes(config, [("a", 1), ("b", 2)], task_id="warmup")
+
+            with tempfile.TemporaryFile(mode="w+") as trace:
+                async with checkpointer.pool.connection() as conn:
+                    conn.pgconn.trace(trace.fileno())
+                await checkpointer.aget_tuple(latest_config)
+                await checkpointer.aput_writes(config, [("a", 1), ("b", 2), ("c", 3)], task_id="task-2")
+                async with checkpointer.pool.connection() as conn:
+                    conn.pgconn.untrace()
+                trace.seek(0)
+                round_trips = sum(1 for line in trace if "\tB\t" in line and "ReadyForQuery" in line)
+            assert round_trips == 2
+
+    asyncio.run(run())
+
+
+def test_compressed_rows_are_readable_after_disabling_codec(pg_conninfo):
+    async def run():
+        async with saver(pg_conninfo, codec="zlib", compress_threshold=0) as checkpointer:
+            config = await put_checkpoint(checkpointer)
+            await checkpointer.aput_writes(config, [("messages", "pending" * 100)], task_id="task-1")
+
+        async with saver(pg_conninfo) as checkpointer:
+            latest = await checkpointer.aget_tuple({"configurable": {"thread_id": "t1", "checkpoint_ns": ""}})
+            assert latest.checkpoint["channel_values"] == {"messages": ["你好", "hello"]}
+            assert latest.pending_writes == [("task-1", "messages", "pending" * 100)]
+
+    asyncio.run(run())
+
+
+async def put_step(checkpointer: AsyncCompatiblePostgresSaver, parent: dict, previous: dict, changes: dict) -> tuple[dict, dict]:
+    """在 previous 之上修改部分 channel 并写入，new_versions 只包含变化的 channel"""
+    checkpoint = create_checkpoint(previous, None, 1)
+    new_versions = {}
+    for channel, value in changes.items():
+        checkpoint["channel_values"][channel] = value
+        new_versions[channel] = checkpointer.get_next_version(checkpoint["channel_versions"].get(channel), None)
+    checkpoint["channel_versions"].update(new_versions)
+    config = await checkpointer.aput(parent, checkpoint, {"source": "loop", "step": 1}, new_versions)
+    return config, checkpoint
+
+
+async def read_all_paths(checkpointer: AsyncCompatiblePostgresSaver, config: dict) -> list[dict]:
+    latest_config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+    values = [(await checkpointer.aget_tuple(latest_config)).checkpoint["channel_values"]]
+    values.append((await checkpointer.aget_tuple(config)).checkpoint["channel_values"])
+    checkpointer.single_query_get = False
+    values.append((await checkpointer.aget_tuple(latest_config)).checkpoint["channel_values"])
+    checkpointer.single_query_get = True
+    values.append(
+        [item async for item in checkpointer.alist({"configurable": {"thread_id": "t1"}}, limit=1)][0]
+        .checkpoint["channel_values"]
+    )
+    return values
+
+
+def test_delta_storage_round_trip(pg_conninfo):
+    async def run():
+        async with saver(pg_conninfo, delta_storage=True) as checkpointer:
+            root = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+            config, checkpoint = await put_step(
+                checkpointer, root, empty_checkpoint(), {"messages": ["你好"], "summary": "", "summarized_until": 0}
+            )
+            config, checkpoint = await put_step(checkpointer, config, checkpoint, {"messages": ["你好", "hello"]})
+            config, checkpoint = await put_step(checkpointer, config, checkpoint, {"summary": "打招呼"})
+            expected = {"messages": ["你好", "hello"], "summary": "打招呼", "summarized_until": 0}
+            assert await read_all_paths(checkpointer, config) == [expected] * 4
+
+    asyncio.run(run())
+
+
+def test_delta_storage_keeps_channels_written_before_it_was_enabled(pg_conninfo):
+    """父 checkpoint 在开启增量存储前写入，channel_values 只保存在 checkpoints 行内"""
+
+    async def run():
+        root = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+        async with saver(pg_conninfo) as checkpointer:
+            config, checkpoint = await put_step(
+                checkpointer, root, empty_checkpoint(), {"messages": ["你好"], "summary": "s", "summarized_until": 1}
+            )
+
+        async with saver(pg_conninfo, delta_storage=True) as checkpointer:
+            config, checkpoint = await put_step(checkpointer, config, checkpoint, {"summary": "s2"})
+            expected = {"messages": ["你好"], "summary": "s2", "summarized_until": 1}
+            assert await read_all_paths(checkpointer, config) == [expected] * 4
+
+            config, checkpoint = await put_step(checkpointer, config, checkpoint, {"messages": ["你好", "hello"]})
+            expected = {"messages": ["你好", "hello"], "summary": "s2", "summarized_until": 1}
+            assert await read_all_paths(checkpointer, config) == [expected] * 4
+
+    asyncio.run(run())
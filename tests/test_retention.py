@@ -0,0 +1,118 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from psycopg.types.json import Jsonb
+
+from db.pg.migrations import run_migrations
+from db.pg.retention import RetentionEngine, RetentionPolicy
+
+
+@asynccontextmanager
+async def migrated_pool(conninfo: str):
+    from psycopg_pool import AsyncConnectionPool
+
+    async with AsyncConnectionPool(conninfo, min_size=1, max_size=2, kwargs={"autocommit": True}, open=False) as pool:
+        async with pool.connection() as conn:
+            await run_migrations(conn)
+        yield pool
+
+
+async def insert_thread(conn, thread_id: str, count: int, age: timedelta = timedelta(0)) -> None:
+    """写入 count 个 checkpoint，每个都有一条 write，并且各自引用一个版本的 blob"""
+    for i in range(count):
+        checkpoint_id = f"{i:04d}"
+        await conn.execute(
+            "INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, channel_versions, created_at) "
+            "VALUES (%s, '', %s, %s, now() - %s)",
+            (thread_id, checkpoint_id, Jsonb({"messages": checkpoint_id}), age),
+        )
+        await conn.execute(
+            "INSERT INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel) "
+            "VALUES (%s, '', %s, 'task', 0, 'messages')",
+            (thread_id, checkpoint_id),
+        )
+        await conn.execute(
+            "INSERT INTO checkpoint_blobs (thread_id, checkpoint_ns, channel, version, type) VALUES (%s, '', 'messages', %s, 'empty')",
+            (thread_id, checkpoint_id),
+        )
+
+
+async def count_by_thread(conn, table: str) -> dict[str, int]:
+    cur = await conn.execute(f"SELECT thread_id, count(*) FROM {table} GROUP BY thread_id")
+    return dict(await cur.fetchall())
+
+
+def test_keep_last_prunes_every_thread_in_batches(pg_conninfo):
+    async def run():
+        async with migrated_pool(pg_conninfo) as pool:
+            async with pool.connection() as conn:
+                for n in range(5):
+                    await insert_thread(conn, f"t{n}", 7)
+                await insert_thread(conn, "short", 2)
+
+            engine = RetentionEngine(pool, RetentionPolicy(keep_last=3, batch_size=2))
+            stats = await engine.run_once()
+
+            async with pool.connection() as conn:
+                expected = {**{f"t{n}": 3 for n in range(5)}, "short": 2}
+                assert await count_by_thread(conn, "checkpoints") == expected
+                assert await count_by_thread(conn, "writes") == expected
+                assert await count_by_thread(conn, "checkpoint_blobs") == expected
+                cur = await conn.execute("SELECT checkpoint_id FROM checkpoints WHERE thread_id = 't0' ORDER BY 1")
+                assert [row[0] for row in await cur.fetchall()] == ["0004", "0005", "0006"]
+            assert stats.checkpoints_deleted == 20
+            assert stats.writes_deleted == 20
+            assert stats.blobs_deleted == 20
+            # batch_size=2：每页 2 个线程，每批删除 2 个 checkpoint，共 20 个超出的 checkpoint
+            assert stats.batches == 10
+
+    asyncio.run(run())
+
+
+def test_max_idle_deletes_idle_threads_across_pages(pg_conninfo):
+    async def run():
+        async with migrated_pool(pg_conninfo) as pool:
+            async with pool.connection() as conn:
+                for n in range(5):
+                    await insert_thread(conn, f"idle{n}", 2, age=timedelta(days=10))
+                await insert_thread(conn, "active", 2)
+
+            engine = RetentionEngine(pool, RetentionPolicy(max_idle=timedelta(days=1), batch_size=2))
+            stats = await engine.run_once()
+
+            async with pool.connection() as conn:
+                assert await count_by_thread(conn, "checkpoints") == {"active": 2}
+                assert await count_by_thread(conn, "checkpoint_blobs") == {"active": 2}
+            assert stats.threads_deleted == 5
+            assert stats.batches == 3
+
+    asyncio.run(run())
+
+
+def test_pass_is_skipped_while_another_worker_holds_the_lock(pg_conninfo):
+    import psycopg
+
+    from db.pg.retention import RETENTION_LOCK_KEY
+
+    async def run():
+        async with migrated_pool(pg_conninfo) as pool:
+            async with pool.connection() as conn:
+                await insert_thread(conn, "t0", 5)
+            engine = RetentionEngine(pool, RetentionPolicy(keep_last=1))
+
+            async with await psycopg.AsyncConnection.connect(pg_conninfo, autocommit=True) as other:
+                await other.execute("SELECT pg_advisory_lock(%s)", (RETENTION_LOCK_KEY,))
+                stats = await engine.run_once()
+                assert (stats.skipped, stats.runs, stats.checkpoints_deleted) == (1, 0, 0)
+                await other.execute("SELECT pg_advisory_unlock(%s)", (RETENTION_LOCK_KEY,))
+
+            stats = await engine.run_once()
+            assert (stats.skipped, stats.runs, stats.checkpoints_deleted) == (1, 1, 4)
+            # 清理结束后释放锁，其他 worker 可以获取
+            async with pool.connection() as conn:
+                cur = await conn.execute("SELECT pg_try_advisory_lock(%s)", (RETENTION_LOCK_KEY,))
+                assert (await cur.fetchone())[0]
+                await conn.execute("SELECT pg_advisory_unlock(%s)", (RETENTION_LOCK_KEY,))
+
+    asyncio.run(run())
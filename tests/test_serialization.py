@@ -0,0 +1,24 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.types import Command
+
+from service.chat.serialization import EVENT_ENCODERS
+
+
+def test_every_emitted_event_kind_has_an_encoder():
+    samples = {
+        "on_chat_model_start": {"input": {"messages": [[HumanMessage(content="你好")]]}},
+        "on_chat_model_end": {"output": AIMessage(content="hi", id="run-1")},
+        "on_chain_start": {"input": {"messages": [HumanMessage(content="你好")]}},
+        "on_chain_stream": {"chunk": {"messages": [AIMessage(content="ok")]}},
+        "on_chain_end": {"output": Command(goto="answer", update={"messages": [AIMessage(content="ok")]})},
+        "on_tool_start": {"input": {"query": "weather"}},
+        "on_tool_end": {"output": ToolMessage(content="sunny", tool_call_id="call-1")},
+        "on_custom_event": {"progress": 0.5},
+    }
+    for kind, data in samples.items():
+        assert isinstance(json.loads(EVENT_ENCODERS[kind](data)), dict), kind
+
+    assert json.loads(EVENT_ENCODERS["on_tool_end"](samples["on_tool_end"]))["output"]["type"] == "ToolMessage"
+    assert json.loads(EVENT_ENCODERS["on_chain_end"](samples["on_chain_end"]))["output"]["goto"] == "answer"
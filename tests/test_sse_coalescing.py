@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+from service.chat import chat_service as chat_service_module
+from service.chat.chat_service import ChatService
+
+
+def chunk(content: str, run_id: str = "run-1") -> dict:
+    return {
+        "kind": "on_chat_model_stream",
+        "event": "ChatOpenAI",
+        "data": {"chunk": {"type": "AIMessageChunk", "content": content, "id": run_id}},
+    }
+
+
+def custom(name: str) -> dict:
+    return {"kind": "on_custom_event", "event": name, "data": {"name": name}}
+
+
+def frame_text(frame: dict) -> str:
+    """token 帧返回合并后的文本，其他帧返回事件名"""
+    data = json.loads(frame["data"])
+    if "chunk" in data:
+        return data["chunk"]["content"]
+    return frame["event"]
+
+
+def collect(events: list, **kwargs) -> list[str]:
+    async def run():
+        event_queue = asyncio.Queue()
+        for event in [*events, None]:
+            event_queue.put_nowait(event)
+        generator = ChatService().event_generator(event_queue, asyncio.Event(), **kwargs)
+        return [frame_text(frame) async for frame in generator]
+
+    return asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+
+def test_chunks_are_sent_one_per_frame_without_coalescing():
+    assert collect([chunk("a"), chunk("b")]) == ["a", "b"]
+
+
+def test_pending_chunks_are_flushed_after_coalesce_ms():
+    async def run():
+        event_queue = asyncio.Queue()
+        generator = ChatService().event_generator(event_queue, asyncio.Event(), coalesce_ms=20)
+        for content in ("你", "好"):
+            event_queue.put_nowait(chunk(content))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        # 队列中没有后续事件，也没有结束信号，合并的帧在 coalesce_ms 后发送
+        first = await asyncio.wait_for(anext(generator), timeout=1)
+        assert frame_text(first) == "你好"
+        assert loop.time() - started >= 0.015
+
+        event_queue.put_nowait(chunk("！"))
+        second = await asyncio.wait_for(anext(generator), timeout=1)
+        assert frame_text(second) == "！"
+        event_queue.put_nowait(None)
+        assert [frame async for frame in generator] == []
+
+    asyncio.run(run())
+
+
+def test_pending_chunks_are_flushed_at_coalesce_max_chars(monkeypatch):
+    monkeypatch.setattr(chat_service_module.chat_metrics, "chunks_batched", 0)
+
+    async def run():
+        event_queue = asyncio.Queue()
+        generator = ChatService().event_generator(
+            event_queue, asyncio.Event(), coalesce_ms=60_000, coalesce_max_chars=4
+        )
+        for content in ("ab", "cd", "ef"):
+            event_queue.put_nowait(chunk(content))
+        # 累计达到 4 个字符时立即发送，不等待 coalesce_ms
+        first = await asyncio.wait_for(anext(generator), timeout=1)
+        assert frame_text(first) == "abcd"
+        event_queue.put_nowait(None)
+        assert [frame_text(frame) async for frame in generator] == ["ef"]
+
+    asyncio.run(run())
+    assert chat_service_module.chat_metrics.chunks_batched == 1
+
+
+def test_other_events_flush_pending_chunks_first():
+    frames = collect(
+        [chunk("a"), chunk("b"), custom("tool_start"), chunk("c"), chunk("d"), chunk("x", run_id="run-2")],
+        coalesce_ms=60_000,
+    )
+    # 非 token 事件与其他模型调用的 chunk 都会先发送已合并的 token，且不改变事件顺序
+    assert frames == ["ab", "tool_start", "cd", "x"]
+
+
+def test_end_event_flushes_pending_chunks_and_closes_the_stream():
+    end = {"kind": "end", "event": "completed", "data": {"message": "Stream completed"}}
+    frames = collect([chunk("a"), chunk("b"), end, chunk("late")], coalesce_ms=60_000)
+    assert frames == ["ab", "completed"]
@@ -0,0 +1,122 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from db.pg.write_behind import WriteBehindBuffer, WriteBehindError
+
+
+class FakeConnection:
+    """按 psycopg 的语义模拟事务：最外层 transaction() 提交，嵌套的为 savepoint，异常时回滚该层"""
+
+    def __init__(self, committed: list):
+        self.committed = committed
+        self._scopes: list[list] = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        self._scopes.append([])
+        try:
+            yield
+        except BaseException:
+            self._scopes.pop()
+            raise
+        rows = self._scopes.pop()
+        if self._scopes:
+            self._scopes[-1].extend(rows)
+        else:
+            self.committed.extend(rows)
+
+    def write(self, row):
+        self._scopes[-1].append(row)
+
+
+class FakePool:
+    def __init__(self):
+        self.committed = []
+
+    @asynccontextmanager
+    async def connection(self):
+        yield FakeConnection(self.committed)
+
+
+def write(row):
+    async def op(conn):
+        conn.write(row)
+    return op
+
+
+def failing(error=ValueError("constraint violated")):
+    async def op(conn):
+        raise error
+    return op
+
+
+def test_failing_thread_does_not_block_other_threads():
+    async def run():
+        pool = FakePool()
+        buffer = WriteBehindBuffer(pool, max_lag=60, max_retries=2)
+        await buffer.enqueue("bad", write("bad-1"))
+        await buffer.enqueue("bad", failing())
+        await buffer.enqueue("good", write("good-1"))
+        await buffer.flush()
+        # 失败线程的整批写入在 savepoint 中回滚，其他线程照常提交
+        assert pool.committed == ["good-1"]
+        assert buffer.pending == 2
+        await buffer.aclose()
+
+    asyncio.run(run())
+
+
+def test_failing_writes_are_dropped_after_max_retries_and_reported_to_thread():
+    async def run():
+        pool = FakePool()
+        buffer = WriteBehindBuffer(pool, max_lag=60, max_retries=2)
+        await buffer.enqueue("bad", failing())
+        for _ in range(3):
+            await buffer.flush()
+        assert buffer.pending == 0
+        assert buffer.dropped == 1
+        # 队列不再被失败的写入占满，其他线程的写入可以继续提交
+        await buffer.enqueue("good", write("good-1"))
+        await buffer.flush("good")
+        assert pool.committed == ["good-1"]
+        # 失败只报告给所属线程一次
+        with pytest.raises(WriteBehindError) as exc_info:
+            await buffer.enqueue("bad", write("bad-2"))
+        assert exc_info.value.thread_id == "bad"
+        await buffer.enqueue("bad", write("bad-2"))
+        await buffer.flush("bad")
+        assert pool.committed == ["good-1", "bad-2"]
+        await buffer.aclose()
+
+    asyncio.run(run())
+
+
+def test_thread_flush_raises_the_thread_error():
+    async def run():
+        buffer = WriteBehindBuffer(FakePool(), max_lag=60, max_retries=0)
+        await buffer.enqueue("bad", failing())
+        with pytest.raises(WriteBehindError):
+            await buffer.flush("bad")
+        await buffer.aclose()
+
+    asyncio.run(run())
+
+
+def test_background_worker_retries_then_drops():
+    async def run():
+        pool = FakePool()
+        buffer = WriteBehindBuffer(pool, max_lag=0.001, max_retries=3)
+        await buffer.enqueue("bad", failing())
+        await buffer.enqueue("good", write("good-1"))
+        for _ in range(200):
+            if buffer.pending == 0:
+                break
+            await asyncio.sleep(0.005)
+        assert buffer.pending == 0
+        assert buffer.dropped == 1
+        assert pool.committed == ["good-1"]
+        await buffer.aclose()
+
+    asyncio.run(run())
@@ -1,9 +1,50 @@
-from langchain_openai import ChatOpenAI
-from config.env import GEMINI_2_5_FLASH_API_KEY, GEMINI_2_5_FLASH_BASE_URL, GEMINI_2_5_FLASH_MODEL
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import httpx
+from config.env import (
+    GEMINI_2_5_FLASH_API_KEY,
+    GEMINI_2_5_FLASH_BASE_URL,
+    GEMINI_2_5_FLASH_MODEL,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE,
+    LLM_HTTP_KEEPALIVE_EXPIRY,
+    LLM_HTTP_TIMEOUT,
+    LLM_HTTP2,
+)
+from utils.llm_cache import ResponseCacheMixin, llm_response_cache
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+@lru_cache(maxsize=None)
+def _chat_openai_class(cached: bool) -> type:
+    """按需导入 langchain_openai（连带 openai SDK，导入耗时较长），只在第一次创建客户端时执行
+
+    cached 为 True 时返回流式调用也会查询响应缓存的 ChatOpenAI 子类。
+    """
+    from langchain_openai import ChatOpenAI
+
+    if not cached:
+        return ChatOpenAI
+
+    class CachedChatOpenAI(ResponseCacheMixin, ChatOpenAI):
+        """流式调用也会查询响应缓存的 ChatOpenAI"""
+
+    return CachedChatOpenAI
+
 
 class LLMSelector:
+    """模型客户端注册表
+
+    同一组 (model, base_url, 参数) 只创建一个 ChatOpenAI 实例，所有实例共用一个
+    httpx.AsyncClient，新增节点不会再各自建立连接池和 TLS 连接。
+    """
+
     def __init__(self, ):
-        pass
+        self._clients: Dict[Tuple, "ChatOpenAI"] = {}
+        self._http_async_client: Optional[httpx.AsyncClient] = None
 
     def get_llm_by_name(self, name: str):
         if name == "gemini-2.5-flash":
@@ -13,22 +54,62 @@ class LLMSelector:
                 raise ValueError("GEMINI_2_5_FLASH_BASE_URL 未设置，请检查 .env 文件")
             if not GEMINI_2_5_FLASH_MODEL:
                 raise ValueError("GEMINI_2_5_FLASH_MODEL 未设置，请检查 .env 文件")
-            
+
             return self.create_openai_llm(GEMINI_2_5_FLASH_MODEL, GEMINI_2_5_FLASH_BASE_URL, GEMINI_2_5_FLASH_API_KEY)
         else:
             raise ValueError(f"Unsupported LLM: {name}")
 
     def create_openai_llm(self, model: str, base_url: str, api_key: str, temperature: float = 0.0, **kwargs):
+        key = (model, base_url, api_key, temperature, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+        if key in self._clients:
+            return self._clients[key]
+
         llm_kwargs = {
             "model": model,
             "temperature": temperature,
+            "http_async_client": self.http_async_client,
+            # openai SDK 会用自己的默认超时（600s）覆盖 http 客户端上的超时，这里显式传入
+            "timeout": LLM_HTTP_TIMEOUT,
+            # 流式响应也返回 usage_metadata，用于统计 prompt 缓存命中
+            "stream_usage": True,
             **kwargs
         }
-        
+
         # 确保 base_url 和 api_key 被正确设置
         if base_url:
             llm_kwargs["base_url"] = base_url
         if api_key:
             llm_kwargs["api_key"] = api_key
 
-        return ChatOpenAI(**llm_kwargs)
\ No newline at end of file
+        # 启用响应缓存时，相同消息和模型参数的调用直接返回缓存的回复
+        if llm_response_cache is not None:
+            llm = _chat_openai_class(cached=True)(cache=llm_response_cache, **llm_kwargs)
+        else:
+            llm = _chat_openai_class(cached=False)(**llm_kwargs)
+        self._clients[key] = llm
+        return llm
+
+    @property
+    def http_async_client(self) -> httpx.AsyncClient:
+        """所有模型共用的 HTTP 客户端，按配置的连接数和 keep-alive 复用连接"""
+        if self._http_async_client is None or self._http_async_client.is_closed:
+            self._http_async_client = httpx.AsyncClient(
+                http2=LLM_HTTP2,
+                timeout=httpx.Timeout(LLM_HTTP_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._http_async_client
+
+    async def aclose(self) -> None:
+        """关闭共享的 HTTP 客户端并清空注册表，在应用关闭时调用"""
+        self._clients.clear()
+        if self._http_async_client is not None:
+            await self._http_async_client.aclose()
+            self._http_async_client = None
+
+
+llm_selector = LLMSelector()
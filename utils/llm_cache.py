@@ -0,0 +1,363 @@
+"""
+LLM 响应缓存
+
+LLMResponseCache 实现 langchain 的 BaseCache 接口，挂在 LLMSelector 创建的模型上。
+缓存 key 与 langchain 自带缓存一致：去掉 id 的消息序列化结果 + 模型参数（llm_string），
+即只有消息和模型参数完全相同时才命中。查找顺序：
+
+1. 进程内 LRU（带 TTL）
+2. PostgreSQL llm_cache 表（复用 checkpointer 的连接池，由 attach_pool 挂载）
+3. 可选的语义相似度层：同一模型参数下，消息文本的 embedding 余弦相似度超过阈值即命中
+
+langchain 的 astream 不会查询缓存，因此 ResponseCacheMixin 在 _astream 中查询缓存，
+命中时把缓存的回复切分为 chunk 逐个产出，astream_events 仍会生成 on_chat_model_stream 事件，
+SSE 客户端看到的与实时生成一致。
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, List, Optional, Sequence, Union
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessageChunk, BaseMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk
+
+from config.env import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_TTL,
+    LLM_CACHE_SEMANTIC_THRESHOLD,
+    LLM_CACHE_EMBEDDING_MODEL,
+)
+
+if TYPE_CHECKING:
+    from psycopg_pool import AsyncConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# 缓存命中时每个回放 chunk 的字符数
+REPLAY_CHUNK_CHARS = 32
+
+_SELECT_SQL = "SELECT response FROM llm_cache WHERE key = %s AND (expires_at IS NULL OR expires_at > now())"
+
+_UPSERT_SQL = """INSERT INTO llm_cache (key, llm_string, response, expires_at)
+VALUES (%s, %s, %s, %s)
+ON CONFLICT (key) DO UPDATE SET
+    llm_string = EXCLUDED.llm_string,
+    response = EXCLUDED.response,
+    created_at = now(),
+    expires_at = EXCLUDED.expires_at"""
+
+
+@dataclass
+class LLMCacheStats:
+    """各层的命中统计"""
+    memory_hits: int = 0
+    postgres_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    updates: int = 0
+    errors: int = 0
+
+
+class SemanticCacheTier:
+    """基于 embedding 余弦相似度的近似匹配层，只在进程内保存最近的 max_size 条"""
+
+    def __init__(
+        self,
+        embeddings: Union[Embeddings, Callable[[], Embeddings]],
+        threshold: float,
+        max_size: int = 1000,
+    ):
+        """
+        Args:
+            embeddings: Embeddings 实例，或返回实例的构造函数；加载 embedding 模型较慢，
+                构造函数在 load() 或第一次使用时才调用，不在导入模块时执行。
+            threshold: 余弦相似度阈值。
+            max_size: 最多保存的条目数。
+        """
+        if isinstance(embeddings, Embeddings):
+            self.embeddings: Optional[Embeddings] = embeddings
+            self._embeddings_factory = None
+        else:
+            self.embeddings = None
+            self._embeddings_factory = embeddings
+        self.threshold = threshold
+        self._entries: deque[tuple[str, List[float], float, RETURN_VAL_TYPE]] = deque(maxlen=max_size)
+        self._load_lock = asyncio.Lock()
+
+    async def load(self) -> Embeddings:
+        """加载 embedding 模型（在线程中执行，不阻塞事件循环），lifespan 中提前调用以免首个请求等待"""
+        if self.embeddings is None:
+            async with self._load_lock:
+                if self.embeddings is None:
+                    self.embeddings = await asyncio.to_thread(self._embeddings_factory)
+        return self.embeddings
+
+    async def lookup(self, text: str, llm_string: str, ttl: float) -> Optional[RETURN_VAL_TYPE]:
+        if not self._entries:
+            return None
+        embeddings = await self.load()
+        vector = _normalize(await embeddings.aembed_query(text))
+        now = time.monotonic()
+        best, best_score = None, self.threshold
+        for entry_llm_string, entry_vector, stored_at, value in self._entries:
+            if entry_llm_string != llm_string or (ttl > 0 and now - stored_at > ttl):
+                continue
+            score = sum(a * b for a, b in zip(vector, entry_vector))
+            if score >= best_score:
+                best, best_score = value, score
+        return best
+
+    async def update(self, text: str, llm_string: str, value: RETURN_VAL_TYPE) -> None:
+        embeddings = await self.load()
+        vector = _normalize(await embeddings.aembed_query(text))
+        self._entries.append((llm_string, vector, time.monotonic(), value))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class LLMResponseCache(BaseCache):
+    """内存 LRU + PostgreSQL + 可选语义层的多级响应缓存"""
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: float = 3600,
+        pool: Optional["AsyncConnectionPool"] = None,
+        semantic: Optional[SemanticCacheTier] = None,
+    ):
+        """
+        Args:
+            max_size: 内存中最多缓存的响应数量。
+            ttl: 响应的有效期（秒），<= 0 表示不过期。
+            pool: PostgreSQL 连接池，为 None 时只使用内存缓存，可稍后通过 attach_pool 挂载。
+            semantic: 语义相似度层，为 None 时只做精确匹配。
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.pool = pool
+        self.semantic = semantic
+        self.stats = LLMCacheStats()
+        self._entries: OrderedDict[str, tuple[float, RETURN_VAL_TYPE]] = OrderedDict()
+
+    def attach_pool(self, pool: "AsyncConnectionPool") -> None:
+        self.pool = pool
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    # ---- 内存层，同时实现 BaseCache 的同步接口 ----
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = _cache_key(prompt, llm_string)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self._put(_cache_key(prompt, llm_string), return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self._entries.clear()
+        if self.semantic is not None:
+            self.semantic.clear()
+
+    def _put(self, key: str, value: RETURN_VAL_TYPE) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    # ---- 异步接口：依次查询内存、PostgreSQL、语义层 ----
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self.lookup(prompt, llm_string)
+        if value is not None:
+            self.stats.memory_hits += 1
+            return value
+        key = _cache_key(prompt, llm_string)
+        if self.pool is not None:
+            try:
+                value = await self._pg_lookup(key)
+            except Exception as e:
+                # 缓存不可用时退化为直接调用模型
+                self.stats.errors += 1
+                logger.warning(f"LLM cache lookup failed: {e}")
+            if value is not None:
+                self.stats.postgres_hits += 1
+                self._put(key, value)
+                return value
+        if self.semantic is not None:
+            value = await self.semantic.lookup(_prompt_text(prompt), llm_string, self.ttl)
+            if value is not None:
+                self.stats.semantic_hits += 1
+                return value
+        self.stats.misses += 1
+        return None
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = _cache_key(prompt, llm_string)
+        self._put(key, return_val)
+        self.stats.updates += 1
+        if self.pool is not None:
+            try:
+                await self._pg_update(key, llm_string, return_val)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.warning(f"LLM cache update failed: {e}")
+        if self.semantic is not None:
+            await self.semantic.update(_prompt_text(prompt), llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear()
+        if self.pool is not None:
+            async with self.pool.connection() as conn:
+                await conn.execute("DELETE FROM llm_cache")
+
+    async def _pg_lookup(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        async with self.pool.connection() as conn:
+            cur = await conn.execute(_SELECT_SQL, (key,), prepare=True)
+            row = await cur.fetchone()
+        if row is None:
+            return None
+        return loads(row[0], allowed_objects="core")
+
+    async def _pg_update(self, key: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl) if self.ttl > 0 else None
+        async with self.pool.connection() as conn:
+            await conn.execute(_UPSERT_SQL, (key, llm_string, dumps(return_val), expires_at), prepare=True)
+
+
+# ainvoke 走 langchain 自带的缓存流程（内部可能再调用 _astream），此时 _astream 不再重复查询
+_in_generate: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_in_generate", default=False)
+
+
+class ResponseCacheMixin:
+    """为 BaseChatModel 子类的流式调用接入 self.cache"""
+
+    async def ainvoke(self, *args: Any, **kwargs: Any) -> BaseMessage:
+        token = _in_generate.set(True)
+        try:
+            return await super().ainvoke(*args, **kwargs)
+        finally:
+            _in_generate.reset(token)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        cache = self.cache if isinstance(self.cache, BaseCache) else None
+        if cache is None or _in_generate.get():
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+
+        prompt = dumps([
+            msg.model_copy(update={"id": None}) if getattr(msg, "id", None) is not None else msg
+            for msg in messages
+        ])
+        llm_string = self._get_llm_string(stop=stop, **kwargs)
+        cached = await cache.alookup(prompt, llm_string)
+        if cached:
+            for chunk in _replay_chunks(cached[0]):
+                yield chunk
+            return
+
+        response = None
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        # 只缓存完整生成的回复，流式中途被取消时不会执行到这里
+        if response is not None:
+            await cache.aupdate(prompt, llm_string, [ChatGeneration(message=message_chunk_to_message(response.message))])
+
+
+def _replay_chunks(generation: Any) -> List[ChatGenerationChunk]:
+    """把缓存的回复切分为流式 chunk，最后一个 chunk 携带 metadata 并标记 llm_cache 命中"""
+    message = getattr(generation, "message", None)
+    content = message.content if message is not None else generation.text
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+    pieces = [content[i:i + REPLAY_CHUNK_CHARS] for i in range(0, len(content), REPLAY_CHUNK_CHARS)] or [""]
+    chunks = [ChatGenerationChunk(message=AIMessageChunk(content=piece)) for piece in pieces[:-1]]
+    last = AIMessageChunk(
+        content=pieces[-1],
+        tool_call_chunks=[
+            {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+            for i, call in enumerate(getattr(message, "tool_calls", None) or [])
+        ],
+        response_metadata={**(getattr(message, "response_metadata", None) or {}), "llm_cache_hit": True},
+    )
+    chunks.append(ChatGenerationChunk(message=last))
+    return chunks
+
+
+def _cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+
+def _prompt_text(prompt: str) -> str:
+    """从序列化的消息中提取文本，用于语义匹配"""
+    try:
+        messages = json.loads(prompt)
+        return "\n".join(
+            m["kwargs"]["content"] for m in messages
+            if isinstance(m, dict) and isinstance(m.get("kwargs", {}).get("content"), str)
+        )
+    except (ValueError, TypeError, KeyError):
+        return prompt
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _load_embeddings(model_name: str) -> Embeddings:
+    try:
+        from langchain_community.embeddings import FastEmbedEmbeddings
+    except ImportError:
+        raise ImportError(
+            "langchain-community / fastembed is not installed. "
+            "Please install it with `uv add langchain-community fastembed`."
+        ) from None
+    return FastEmbedEmbeddings(model_name=model_name)
+
+
+def create_llm_cache() -> Optional[LLMResponseCache]:
+    """按配置创建响应缓存，未启用时返回 None；语义层的 embedding 模型延迟到 lifespan 或首次使用时加载"""
+    if not LLM_CACHE_ENABLED:
+        return None
+    semantic = None
+    if LLM_CACHE_SEMANTIC_THRESHOLD > 0:
+        semantic = SemanticCacheTier(
+            partial(_load_embeddings, LLM_CACHE_EMBEDDING_MODEL),
+            threshold=LLM_CACHE_SEMANTIC_THRESHOLD,
+            max_size=LLM_CACHE_SIZE,
+        )
+    return LLMResponseCache(max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, semantic=semantic)
+
+
+llm_response_cache = create_llm_cache()
@@ -0,0 +1,68 @@
+"""
+提供方 prompt 缓存统计
+
+记录每次模型调用返回的 usage_metadata 中的输入 token 数和命中缓存的 token 数
+（input_token_details.cache_read），按线程汇总命中率，用于确认稳定的消息前缀确实命中了
+OpenAI 兼容网关的 prompt 缓存。只在进程内统计，最多保留 max_threads 个最近活跃的线程。
+"""
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+
+
+@dataclass
+class PromptCacheUsage:
+    calls: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "hit_ratio": round(self.hit_ratio, 4)}
+
+
+class PromptCacheStats:
+    """按线程汇总的 prompt 缓存命中统计"""
+
+    def __init__(self, max_threads: int = 10000):
+        self.max_threads = max_threads
+        self.total = PromptCacheUsage()
+        self._threads: OrderedDict[str, PromptCacheUsage] = OrderedDict()
+
+    def record(self, thread_id: Optional[str], message: AIMessage) -> None:
+        usage = message.usage_metadata
+        if not usage:
+            return
+        input_tokens = usage.get("input_tokens", 0)
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        targets = [self.total]
+        if thread_id:
+            if thread_id not in self._threads:
+                self._threads[thread_id] = PromptCacheUsage()
+                if len(self._threads) > self.max_threads:
+                    self._threads.popitem(last=False)
+            self._threads.move_to_end(thread_id)
+            targets.append(self._threads[thread_id])
+        for target in targets:
+            target.calls += 1
+            target.input_tokens += input_tokens
+            target.cached_tokens += cached_tokens
+
+    def get(self, thread_id: str) -> Optional[PromptCacheUsage]:
+        return self._threads.get(thread_id)
+
+    def snapshot(self, top: int = 20) -> dict:
+        """总体命中率，以及输入 token 最多的 top 个线程"""
+        threads = sorted(self._threads.items(), key=lambda item: item[1].input_tokens, reverse=True)[:top]
+        return {
+            "total": self.total.to_dict(),
+            "threads": {thread_id: usage.to_dict() for thread_id, usage in threads},
+        }
+
+
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,57 @@
+"""
+启动耗时统计
+
+记录 worker 从导入 main 到开始接收请求的各阶段耗时：模块导入，以及 lifespan 中的
+创建连接池 / 迁移、编译图、启动后台任务等阶段。启动完成后写一条日志，并通过
+/api/v1/metrics/startup 暴露，便于发现冷启动变慢。
+
+按模块的导入耗时用 benchmarks/bench_startup.py 查看（基于 python -X importtime）。
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """按顺序记录启动阶段的耗时（毫秒）"""
+
+    def __init__(self):
+        # main 最先导入本模块，以此作为导入阶段的起点
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self._last = self.started
+
+    def mark(self, name: str) -> None:
+        """记录从上一个阶段结束到现在的耗时，用于没有明确起点的阶段（如模块导入）"""
+        now = time.perf_counter()
+        self.phases[name] = (now - self._last) * 1000
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last = time.perf_counter()
+            self.phases[name] = (self._last - start) * 1000
+
+    def ready(self) -> None:
+        """启动完成，记录总耗时并输出各阶段耗时"""
+        self.ready_ms = (time.perf_counter() - self.started) * 1000
+        breakdown = ", ".join(f"{name}={ms:.0f}ms" for name, ms in self.phases.items())
+        logger.info(f"Startup completed in {self.ready_ms:.0f}ms ({breakdown})")
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready_ms is not None,
+            "total_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+            "phases": {name: round(ms, 1) for name, ms in self.phases.items()},
+        }
+
+
+startup_timer = StartupTimer()